@@ -1,5 +1,16 @@
+import sys
+import os
+import itertools
+import argparse
+
+current = os.path.dirname(os.path.realpath(__file__))
+parent = os.path.dirname(current)
+sys.path.append(parent)
+
 import cv2
 import numpy as np
+from numpy.typing import NDArray
+from vision_tools import detect_blobs
 
 # --- CONFIGURATION ---
 CAM_A_ID = 0
@@ -10,11 +21,20 @@ FRAME_WIDTH = 640
 FRAME_HEIGHT = 360
 HORI_FOV = 55 # Degrees
 RES_PX = np.array([FRAME_WIDTH, FRAME_HEIGHT])
+# Lens distortion (k1, k2, p1, p2, k3) from cv2.calibrateCamera; pass the same
+# numbers to camera(..., dist=DIST_COEFFS) when tracking
+DIST_COEFFS = np.zeros(5)
 
 # Tuning for the "Snap" feature
 SNAP_THRESHOLD = 100  # Brightness threshold for finding dots
 SEARCH_WINDOW = 40    # Size of the box to search around your click (px)
 
+# Tuning for the headless ("--auto" / "--images") mode
+AUTO_MAX_BLOBS = 8    # Only the brightest this many blobs are tried as datums
+AUTO_MAX_RMS = 2.0    # Best ordering must reproject better than this (px)
+AUTO_MIN_MARGIN = 3.0 # ... and this many times better than the runner-up
+SETTLE_FRAMES = 30    # Frames to let exposure settle before grabbing
+
 # STEP 0: GROUND TRUTH (The "Goobagob" Datum)
 # Your arbitrary 3D points in METERS
 GROUND_TRUTH_POINTS = np.array([
@@ -25,6 +45,16 @@ GROUND_TRUTH_POINTS = np.array([
 ], dtype=np.float32)
 
 # --- GUI TOOLS ---
+def open_camera(cam_id):
+    cap = cv2.VideoCapture(cam_id, cv2.CAP_DSHOW)
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, FRAME_WIDTH)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, FRAME_HEIGHT)
+
+    # Force low exposure for calibration
+    cap.set(cv2.CAP_PROP_AUTO_EXPOSURE, 0.25)
+    cap.set(cv2.CAP_PROP_EXPOSURE, -6.0)
+    return cap
+
 clicked_points = []
 current_frozen_frame = None # Global to hold the frame for processing
 
@@ -91,23 +121,20 @@ def capture_and_click(cam_id, window_name):
     global clicked_points, current_frozen_frame
     clicked_points = []
     
-    cap = cv2.VideoCapture(cam_id, cv2.CAP_DSHOW)
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, FRAME_WIDTH)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, FRAME_HEIGHT)
-    
-    # Force low exposure for calibration
-    cap.set(cv2.CAP_PROP_AUTO_EXPOSURE, 0.25)
-    cap.set(cv2.CAP_PROP_EXPOSURE, -6.0) 
+    cap = open_camera(cam_id)
     
     print(f"\n--- {window_name} ---")
     print("Press SPACE to freeze frame and start clicking.")
     
+    # Preview reads into the same buffer every time; the last one read is the frozen frame
+    frame = None
     while True:
-        ret, frame = cap.read()
+        ret, img = cap.read(frame)
         if not ret: continue
+        frame = img
         cv2.imshow(window_name, frame)
         if cv2.waitKey(1) & 0xFF == ord(' '):
-            current_frozen_frame = frame.copy()
+            current_frozen_frame = frame
             break
             
     cap.release()
@@ -118,8 +145,9 @@ def capture_and_click(cam_id, window_name):
     
     print(f"Click points 1 through {len(GROUND_TRUTH_POINTS)}.")
     
+    display = np.empty_like(current_frozen_frame)
     while len(clicked_points) < len(GROUND_TRUTH_POINTS):
-        display = current_frozen_frame.copy()
+        np.copyto(display, current_frozen_frame) # redraw on a clean frame, same buffer
         
         # Draw search box around mouse (visual aid)
         # Note: We can't easily track mouse move in this simple loop without more callbacks
@@ -141,24 +169,99 @@ def capture_and_click(cam_id, window_name):
     cv2.destroyWindow("CLICKING_MODE")
     return np.array(clicked_points, dtype=np.float32)
 
+# --- HEADLESS MODE ---
+def capture_frames(cam_ids):
+    """
+    Grabs one frame from every camera at (nearly) the same instant: grab() all
+    first, then decode, so nobody has to hold still while a window is open.
+    """
+    caps = [open_camera(cam_id) for cam_id in cam_ids]
+    for _ in range(SETTLE_FRAMES):
+        for cap in caps:
+            cap.grab()
+    for cap in caps:
+        cap.grab()
+    frames = []
+    for cap in caps:
+        ret, frame = cap.retrieve()
+        cap.release()
+        if not ret:
+            return None
+        frames.append(frame)
+    return frames
+
+def find_datums(frame: NDArray, name: str = ""):
+    """
+    Click-free version of capture_and_click: finds which bright blob is which
+    GROUND_TRUTH_POINTS entry.
+
+    Every blob is a candidate; every ordered choice of len(GROUND_TRUTH_POINTS)
+    of them is run through PnP and scored by its reprojection RMS. The true
+    ordering reprojects to within the blob noise, wrong ones can't (4 points give
+    8 constraints on a 6 DOF pose).
+
+    Returns the (N, 2) float32 pixels in GROUND_TRUTH_POINTS order, or None if
+    there are too few blobs or no ordering is clearly right.
+    """
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    blobs = detect_blobs(gray, SNAP_THRESHOLD)
+    n_pts = len(GROUND_TRUTH_POINTS)
+    print(f"{name}: {len(blobs)} blobs")
+    if len(blobs) < n_pts:
+        print("!! NOT ENOUGH BLOBS !! Check the threshold / exposure.")
+        return None
+
+    # Keep the brightest few (the candidate count grows as N!/(N-4)!)
+    if len(blobs) > AUTO_MAX_BLOBS:
+        u = np.clip(np.round(blobs[:, 0]).astype(int), 0, gray.shape[1] - 1)
+        v = np.clip(np.round(blobs[:, 1]).astype(int), 0, gray.shape[0] - 1)
+        blobs = blobs[np.argsort(gray[v, u])[::-1][:AUTO_MAX_BLOBS]]
+
+    # Score every ordering
+    K = camera_matrix()
+    scores = []
+    for perm in itertools.permutations(range(len(blobs)), n_pts):
+        px = blobs[list(perm)]
+        success, rvec, tvec = cv2.solvePnP(GROUND_TRUTH_POINTS, px, K, DIST_COEFFS, flags=cv2.SOLVEPNP_SQPNP)
+        if not success or tvec[2, 0] <= 0:
+            continue
+        proj, _ = cv2.projectPoints(GROUND_TRUTH_POINTS, rvec, tvec, K, DIST_COEFFS)
+        rms = np.sqrt(np.mean(np.sum((proj.reshape(-1, 2) - px) ** 2, axis=1)))
+        scores.append((rms, perm))
+    if not scores:
+        print("!! NO ORDERING SOLVED !!")
+        return None
+
+    scores.sort(key=lambda s: s[0])
+    best_rms, best = scores[0]
+    runner_up = scores[1][0] if len(scores) > 1 else np.inf
+    print(f"{name}: best ordering {best} -> {best_rms:.2f} px (runner-up {runner_up:.2f} px)")
+    if best_rms > AUTO_MAX_RMS or runner_up < AUTO_MIN_MARGIN * max(best_rms, 0.1):
+        print("!! AMBIGUOUS DATUMS !! Try a cleaner view, or click them.")
+        return None
+    return blobs[list(best)].astype(np.float32)
+
 # --- THE MAGIC (OpenCV PnP) ---
-def get_camera_state(pixels, name):
-    print(f"\nSolving for {name}...")
-    
-    # 1. Build Camera Matrix (K)
+def camera_matrix():
     f_px = (FRAME_WIDTH / 2.0) / np.tan(np.deg2rad(HORI_FOV / 2.0))
-    K = np.array([
+    return np.array([
         [f_px, 0, FRAME_WIDTH/2],
         [0, f_px, FRAME_HEIGHT/2],
         [0, 0, 1]
     ], dtype=np.float32)
+
+def get_camera_state(pixels, name):
+    print(f"\nSolving for {name}...")
+    
+    # 1. Build Camera Matrix (K)
+    K = camera_matrix()
     
     # 2. Solve PnP
     success, rvec_w2c, tvec_w2c = cv2.solvePnP(
         GROUND_TRUTH_POINTS, 
         pixels, 
         K, 
-        np.zeros(5),
+        DIST_COEFFS,
         flags=cv2.SOLVEPNP_ITERATIVE
     )
     
@@ -175,10 +278,29 @@ def get_camera_state(pixels, name):
 
 # --- MAIN ---
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Camera poses from the datum points")
+    parser.add_argument("--auto", action="store_true",
+                        help="find the datums without clicking (grabs both cameras at once)")
+    parser.add_argument("--images", nargs=2, metavar=("IMG_A", "IMG_B"),
+                        help="find the datums in saved images instead of the cameras")
+    args = parser.parse_args()
     
     # 1. Capture Pixels
-    px_A = capture_and_click(CAM_A_ID, "Camera A")
-    px_B = capture_and_click(CAM_B_ID, "Camera B")
+    if args.auto or args.images:
+        if args.images:
+            frames = [cv2.imread(path) for path in args.images]
+        else:
+            frames = capture_frames([CAM_A_ID, CAM_B_ID])
+        if frames is None or any(f is None for f in frames):
+            print("Error: Could not read the frames.")
+            sys.exit(1)
+        px_A = find_datums(frames[0], "Camera A")
+        px_B = find_datums(frames[1], "Camera B")
+        if px_A is None or px_B is None:
+            sys.exit(1)
+    else:
+        px_A = capture_and_click(CAM_A_ID, "Camera A")
+        px_B = capture_and_click(CAM_B_ID, "Camera B")
     
     # 2. Solve Math
     pos_A, R_A = get_camera_state(px_A, "Camera A")
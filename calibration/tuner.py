@@ -1,5 +1,13 @@
+import sys
+import os
+
+current = os.path.dirname(os.path.realpath(__file__))
+parent = os.path.dirname(current)
+sys.path.append(parent)
+
 import cv2
 import numpy as np
+from vision_tools import auto_threshold
 
 CAM_ID = 0 # Check if this is your camera index
 
@@ -15,8 +23,12 @@ cap.set(cv2.CAP_PROP_EXPOSURE, -6.0)
 
 cv2.namedWindow('Bright Spot Tuner')
 cv2.createTrackbar('Threshold', 'Bright Spot Tuner', 40, 255, nothing)
+# Auto: 0 = manual (slider), 1 = contrast, 2 = hold 'Target blobs' (see vision_tools/auto_threshold.py)
+cv2.createTrackbar('Auto', 'Bright Spot Tuner', 0, 2, nothing)
+cv2.createTrackbar('Target blobs', 'Bright Spot Tuner', 4, 20, nothing)
+auto = auto_threshold(40)
 
-print("Adjust Threshold until only the dots remain.")
+print("Adjust Threshold until only the dots remain (or let Auto do it).")
 
 while True:
     ret, frame = cap.read()
@@ -25,8 +37,14 @@ while True:
     # 1. Convert to Grayscale (We don't care about color anymore)
     gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
     
-    # 2. Get Slider Value
-    thresh_val = cv2.getTrackbarPos('Threshold', 'Bright Spot Tuner')
+    # 2. Get Slider Value (in auto mode the slider follows auto_threshold instead)
+    auto_mode = cv2.getTrackbarPos('Auto', 'Bright Spot Tuner')
+    if auto_mode:
+        auto.target_blobs = cv2.getTrackbarPos('Target blobs', 'Bright Spot Tuner') if auto_mode == 2 else None
+        thresh_val = auto.threshold
+    else:
+        thresh_val = cv2.getTrackbarPos('Threshold', 'Bright Spot Tuner')
+        auto.reset(thresh_val) # pick up from here when switched on
     
     # 3. Apply Threshold
     # Any pixel brighter than 'thresh_val' becomes 255 (White). All others 0 (Black).
@@ -42,12 +60,18 @@ while True:
     
     display = frame.copy()
     
+    n_blobs = 0
     for cnt in contours:
         area = cv2.contourArea(cnt)
         # Filter for tiny noise (1 pixel) but keep your small markers (likely 2-10 pixels)
         if area > 2: 
             ((x, y), radius) = cv2.minEnclosingCircle(cnt)
             cv2.circle(display, (int(x), int(y)), int(radius)+2, (0, 255, 0), 1)
+            n_blobs += 1
+
+    if auto_mode:
+        auto.update(gray, n_blobs)
+        cv2.setTrackbarPos('Threshold', 'Bright Spot Tuner', auto.threshold)
 
     # Stack images
     mask_bgr = cv2.cvtColor(mask, cv2.COLOR_GRAY2BGR)
@@ -0,0 +1,133 @@
+import sys
+import os
+import time
+import argparse
+
+current = os.path.dirname(os.path.realpath(__file__))
+parent = os.path.dirname(current)
+sys.path.append(parent)
+
+import cv2
+import numpy as np
+from cam_math import camera, bundle_adjust, wand_observations
+from vision_tools import detect_blobs
+from pipeline import capture_pipeline, detlog_writer, detlog_reader
+
+# Automatic extrinsic calibration: wave a single marker (or a wand) through the
+# shared view for a while, then every camera pose is refined jointly so the rays
+# agree. Start from a rough guess (localize.py output is plenty).
+#
+#   python calibration/wand.py                       # record live, then solve
+#   python calibration/wand.py --save wand.det       # ... and keep the recording
+#   python calibration/wand.py --log wand.det        # re-solve a saved recording
+
+# --- CONFIGURATION ---
+CAM_IDS = [0, 1]
+RECORD_SECONDS = 60
+
+# Camera Intrinsics
+FRAME_WIDTH = 640
+FRAME_HEIGHT = 360
+HORI_FOV = 55 # Degrees
+RES_PX = np.array([FRAME_WIDTH, FRAME_HEIGHT])
+AR = FRAME_HEIGHT / FRAME_WIDTH
+DIST_COEFFS = np.zeros(5) # same (k1, k2, p1, p2, k3) as localize.py
+REFINE_FOV = False
+
+# What is being waved: 1 marker, or a wand with 2 markers WAND_LENGTH apart.
+# Only a wand fixes the scale; with a single marker the cam 1 - cam 2 distance
+# of the initial guess is kept.
+N_MARKERS = 2
+WAND_LENGTH = 0.5 # meters
+
+# Blob detector (pick THRESHOLD with calibration/tuner.py)
+THRESHOLD = 50
+MIN_AREA = 5
+MAX_AREA = 5000
+
+# Initial guess: paste the localize.py results here
+INITIAL_POSES = [
+    (np.array([ 0.5661,-2.3785, 2.5925]),
+     np.array([[-0.9917, 0.1237, 0.0359],
+               [ 0.1147, 0.7216, 0.6827],
+               [ 0.0585, 0.6812,-0.7298]])),
+    (np.array([ 2.1788,-1.201 , 2.9993]),
+     np.array([[-0.1162,-0.7595,-0.64  ],
+               [-0.9925, 0.065 , 0.1031],
+               [-0.0367, 0.6472,-0.7614]])),
+]
+
+def detect(frame):
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return detect_blobs(gray, THRESHOLD, MIN_AREA, MAX_AREA)
+
+def record(cams, save_path=None):
+    """Runs the capture pipeline for RECORD_SECONDS and returns every frame's detections."""
+    caps = []
+    for cam_id in CAM_IDS:
+        cap = cv2.VideoCapture(cam_id, cv2.CAP_DSHOW)
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, FRAME_WIDTH)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, FRAME_HEIGHT)
+        caps.append(cap)
+
+    # Nothing is triangulated while recording, only the detections are kept
+    pipe = capture_pipeline(caps, cams, detect=detect, solve=lambda pxs, cams: None)
+    log = detlog_writer(save_path, cams) if save_path else None
+    frames = []
+
+    print(f"Recording for {RECORD_SECONDS} s, wave the {'wand' if N_MARKERS > 1 else 'marker'} around...")
+    t_end = time.monotonic() + RECORD_SECONDS
+    with pipe:
+        while time.monotonic() < t_end:
+            result = pipe.get(timeout=1.0)
+            if result is None:
+                if not pipe.sources_alive:
+                    print("Frame capture failed")
+                    break
+                continue
+            frames.append(result.pxs)
+            if log is not None:
+                log.write(result.t, result.pxs)
+    if log is not None:
+        log.close()
+    print(f"Recorded {len(frames)} frames")
+    return frames
+
+# --- MAIN ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Wand / single-marker extrinsic calibration")
+    parser.add_argument("--log", help="solve a recorded detection log instead of the cameras")
+    parser.add_argument("--save", help="also write the live recording to this detection log")
+    args = parser.parse_args()
+
+    # 1. Detections (the log carries its own cameras)
+    if args.log:
+        with detlog_reader(args.log) as reader:
+            cams = reader.cams
+            frames = [[np.array(px) for px in pxs] for _, pxs in reader]
+    else:
+        cams = [camera(pos, R, HORI_FOV, RES_PX, AR, DIST_COEFFS) for pos, R in INITIAL_POSES]
+        frames = record(cams, args.save)
+
+    # 2. Solve
+    wand_length = WAND_LENGTH if N_MARKERS > 1 else None
+    obs = wand_observations(frames, cams, N_MARKERS, wand_length)
+    print(f"\nSolving with {obs.shape[1]} points...")
+    cams, pts_g, info = bundle_adjust(cams, obs, wand_length=wand_length, refine_fov=REFINE_FOV)
+    print(f"Reprojection RMS: {info['rms_before']:.3f} px -> {info['rms_after']:.3f} px "
+          f"({info['n_obs']} observations, {info['n_rejected']} rejected)")
+
+    # 3. Print Results
+    print("\n" + "="*30)
+    print("   CALIBRATION RESULTS")
+    print("="*30)
+
+    np.set_printoptions(precision=4, suppress=True)
+
+    for i, cam in enumerate(cams):
+        print(f"\n# --- CAMERA {i + 1} --- (RMS {info['rms_per_cam'][i]:.3f} px)")
+        print(f"r_o2cam{i + 1}_g = np.array({np.array2string(cam.r_o2cam_g, separator=',')})")
+        print(f"c_cam{i + 1}2g   = np.array({np.array2string(cam.c_cam2g, separator=',')})")
+        if REFINE_FOV:
+            print(f"fovh_deg{i + 1}  = {cam.fovh_deg:.3f}")
+    print("\n" + "="*30)
@@ -3,5 +3,15 @@ from .cam2px import cam2px
 from .offset_pixels import offset_pixels
 from .correlate import correlate
 from .locate import locate
-from .cam_class import camera
-from .multi_track import multi_track
\ No newline at end of file
+from .cam_class import camera, camera_pair
+from .multi_track import multi_track
+from .triangulate import triangulate
+from .rig_track import rig_track, triangulate_multi
+from .tracker import tracker
+from .synthetic import synth_rig, synth_detections, project_points, random_points, trajectory_points, look_at
+from .instrument import instrument, instrumentation, print_summary
+from .workspace import workspace
+from .bundle_adjust import bundle_adjust, wand_observations
+from .rigid_body import rigid_bodies, body_pose, kabsch
+from .extrinsic_refine import extrinsic_refiner, print_drift
+from .blink import blink_codes, blink_decoder, blink_tracker, id_track
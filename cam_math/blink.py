@@ -0,0 +1,256 @@
+import numpy as np
+from numpy.typing import NDArray
+from .offset_pixels import offset_pixels
+from .px2cam_unit import px2cam_unit
+from .correlate import correlate
+from .triangulate import triangulate
+from .epipolar_assign import gate_match
+from .cam_class import camera
+
+
+def _rotations(code: int, length: int):
+    mask = (1 << length) - 1
+    return [((code << r) | (code >> (length - r))) & mask for r in range(length)]
+
+
+def blink_codes(n_ids: int, length: int = 8, max_off: int = 2, min_distance: int = 2):
+    """
+    Picks n_ids blink patterns for active LED markers. LED i repeats the bits of
+    code i (1 = on, one bit per camera frame, most significant first), forever.
+
+    Cameras aren't synced to the LEDs, so a decoder sees the pattern at an
+    unknown phase: every code is distinct from every rotation of every other one
+    (and from its own, i.e. aperiodic). Also:
+      - no more than max_off dark frames in a row (cyclically), so a blob can be
+        followed through its off bits
+      - rotations of different codes differ in at least min_distance bits, so a
+        single missed detection reads as garbage instead of another ID
+      - brightest codes (most on bits) first
+
+    Returns an (n_ids,) int array; raises ValueError if not that many exist.
+    """
+    taken = [] # every rotation of every code picked so far
+    codes = []
+    cands = sorted(range(1, (1 << length) - 1), key=lambda c: (-bin(c).count('1'), c))
+    for c in cands:
+        rots = _rotations(c, length)
+        if min(rots) != c or len(set(rots)) != length:
+            continue # not the canonical rotation, or periodic
+        if '0' * (max_off + 1) in bin(c)[2:].zfill(length) * 2: # cyclic run of dark frames
+            continue
+        if any(bin(r ^ t).count('1') < min_distance for r in rots for t in taken):
+            continue
+        codes.append(c)
+        taken.extend(rots)
+        if len(codes) == n_ids:
+            return np.array(codes, dtype=np.int64)
+    raise ValueError(f"Only {len(codes)} codes of length {length} with max_off={max_off}, "
+                     f"min_distance={min_distance}; use longer codes")
+
+
+class blink_decoder:
+    """
+    Per-camera decoder for blink-coded LEDs: follows every blob through time in
+    the image and reads the on/off pattern it blinks.
+
+    Each frame:
+      1) predict every track (last position + velocity) and snap it to the
+         nearest detection within gate_px (gate_match)
+      2) shift one bit into its pattern register: 1 = seen, 0 = dark
+      3) once a track has a full window, look the register up in a table of every
+         rotation of every code (one array index, all tracks at once). A valid
+         code sets the track's ID; garbage (a missed detection, a reflection)
+         leaves it alone, and only `length` garbage windows in a row clear it
+      4) tracks dark for longer than max_off frames are dropped; unclaimed
+         detections start new tracks
+    Two blobs claiming the same ID are both reported undecoded.
+
+    The decoder expects every frame in order. Pass seq (frame number) to update()
+    and skipped frames just restart the windows instead of corrupting them.
+
+    Parameters:
+    - codes (np.array): from blink_codes
+    - length (int): code length (bits), as given to blink_codes
+    - max_off (int): longest dark run in the codes, as given to blink_codes
+    - gate_px (float): how far a blob may move between sightings (px)
+    """
+
+    def __init__(self, codes: NDArray, length: int = 8, max_off: int = 2, gate_px: float = 15.0):
+        self.length = length
+        self.max_off = max_off
+        self.gate_px = gate_px
+        self._mask = (1 << length) - 1
+
+        # Register value -> ID, for every phase of every code
+        self._lut = np.full(1 << length, -1, dtype=np.int64)
+        for i, c in enumerate(codes):
+            self._lut[_rotations(int(c), length)] = i
+        self.reset()
+
+    def reset(self):
+        self.pos = np.empty((0, 2)) # last seen pixel of every track
+        self.vel = np.empty((0, 2)) # px per frame
+        self.bits = np.empty(0, dtype=np.int64) # pattern register, newest bit lowest
+        self.n = np.empty(0, dtype=np.int64) # valid bits in the register
+        self.off = np.empty(0, dtype=np.int64) # frames dark in a row
+        self.ids = np.empty(0, dtype=np.int64) # decoded ID, -1 = not yet
+        self.bad = np.empty(0, dtype=np.int64) # garbage windows in a row
+        self._seq = None
+
+    def update(self, px: NDArray, seq: int = None):
+        """
+        Feeds one frame of OpenCV pixels (N, 2). Returns (N,) ID per detection,
+        -1 where undecoded.
+        """
+        px = np.asarray(px, dtype=np.float64).reshape(-1, 2)
+        if seq is not None and self._seq is not None and seq != self._seq + 1:
+            self.n[:] = 0 # frames went missing: the registers no longer line up
+        self._seq = seq
+
+        # 1) Predict and snap
+        pred = self.pos + self.vel * (self.off + 1)[:, None]
+        m = gate_match(pred.T, px.T, self.gate_px)
+        hit = m >= 0
+        seen = px[m[hit]]
+        self.vel[hit] = 0.5 * self.vel[hit] + 0.5 * (seen - self.pos[hit]) / (self.off[hit] + 1)[:, None]
+        self.pos[hit] = seen
+
+        # 2) One more bit each
+        self.bits = ((self.bits << 1) | hit) & self._mask
+        self.n = np.minimum(self.n + 1, self.length)
+        self.off = np.where(hit, 0, self.off + 1)
+
+        # 3) Decode full windows
+        full = self.n >= self.length
+        code = self._lut[self.bits]
+        valid = full & (code >= 0)
+        self.ids[valid] = code[valid]
+        self.bad = np.where(valid, 0, self.bad + (full & ~valid))
+        self.ids[self.bad > self.length] = -1
+
+        # 4) Drop lost tracks, start new ones
+        out = np.full(px.shape[0], -1, dtype=np.int64)
+        out[m[hit]] = self.ids[hit]
+        keep = self.off <= self.max_off
+        new = np.ones(px.shape[0], dtype=bool)
+        new[m[hit]] = False
+        k = int(new.sum())
+        self.pos = np.vstack((self.pos[keep], px[new]))
+        self.vel = np.vstack((self.vel[keep], np.zeros((k, 2))))
+        self.bits = np.concatenate((self.bits[keep], np.ones(k, dtype=np.int64)))
+        self.n = np.concatenate((self.n[keep], np.ones(k, dtype=np.int64)))
+        self.off = np.concatenate((self.off[keep], np.zeros(k, dtype=np.int64)))
+        self.ids = np.concatenate((self.ids[keep], np.full(k, -1, dtype=np.int64)))
+        self.bad = np.concatenate((self.bad[keep], np.zeros(k, dtype=np.int64)))
+
+        # 5) An ID seen twice is trusted nowhere
+        vals, counts = np.unique(out[out >= 0], return_counts=True)
+        out[np.isin(out, vals[counts > 1])] = -1
+        return out
+
+
+def id_track(px1: NDArray, ids1: NDArray, px2: NDArray, ids2: NDArray, cam1: camera, cam2: camera,
+             return_error: bool = False, max_dist: float = 15.0, method: str = "greedy", max_error: float = 0.01):
+    """
+    multi_track for decoded markers: blobs carrying the same ID in both cameras
+    are paired by a direct-address join (O(N), no epipolar search), and only the
+    rest (undecoded blobs, or an ID the other camera missed) go through correlate.
+
+    Inputs:
+      px1, px2:   (N, 2) OpenCV pixels
+      ids1, ids2: (N,) IDs from each camera's blink_decoder (-1 = undecoded)
+      max_error:  an ID pair whose ray-gap error is bigger (global units; a
+                  decoder slip) is handed to correlate instead
+
+    Returns pts_g (3, K), ids (K,) (-1 for points from correlate) and, if
+    return_error, the (K,) ray-gap error.
+    """
+    ids1 = np.asarray(ids1, dtype=np.int64).reshape(-1)
+    ids2 = np.asarray(ids2, dtype=np.int64).reshape(-1)
+
+    # 1) Rays
+    u1 = px2cam_unit(cam1, offset_pixels(cam1, px1))
+    u2 = px2cam_unit(cam2, offset_pixels(cam2, px2))
+
+    # 2) ID join through a table indexed by ID
+    top = max(ids1.max(initial=-1), ids2.max(initial=-1))
+    slot = np.full(top + 2, -1, dtype=np.int64) # the last entry catches ID -1
+    has1 = ids1 >= 0
+    slot[ids1[has1]] = np.flatnonzero(has1)
+    partner = slot[ids2] # (N2,) cam1 index per cam2 blob
+    j2 = np.flatnonzero(partner >= 0)
+    i1 = partner[j2]
+    pts_id, err_id = triangulate(u1[:, i1], u2[:, j2], cam1, cam2)
+    good = err_id <= max_error
+    i1, j2 = i1[good], j2[good]
+
+    # 3) Epipolar fallback for whatever is left
+    free1 = np.ones(u1.shape[1], dtype=bool)
+    free2 = np.ones(u2.shape[1], dtype=bool)
+    free1[i1] = False
+    free2[j2] = False
+    f1, f2 = np.flatnonzero(free1), np.flatnonzero(free2)
+    pts_new, err_new = np.empty((3, 0)), np.empty(0)
+    if f1.size and f2.size:
+        idx = correlate(cam1, cam2, u1[:, f1], u2[:, f2], max_dist, method)
+        ok = idx >= 0
+        pts_new, err_new = triangulate(u1[:, f1[idx[ok]]], u2[:, f2[ok]], cam1, cam2)
+
+    pts_g = np.hstack((pts_id[:, good], pts_new))
+    ids = np.concatenate((ids2[j2], np.full(pts_new.shape[1], -1, dtype=np.int64)))
+    if return_error:
+        return pts_g, ids, np.concatenate((err_id[good], err_new))
+    return pts_g, ids
+
+
+class blink_tracker:
+    """
+    Stereo tracking of blink-coded LEDs: a blink_decoder per camera plus id_track.
+    update() has the same outputs as tracker.update, the IDs being the LEDs' own
+    (-1 for points that had to be matched geometrically).
+
+    It has to see every frame, so in a capture_pipeline run it as (part of) the
+    solve, with solve_seqs so dropped frames show up as gaps:
+
+        def solve(pxs, cams, seqs):
+            pts_g, ids, _ = blink.update(pxs[0], pxs[1], seqs)
+            return pts_g, ids
+        pipe = capture_pipeline(sources, [cam1, cam2], solve=solve, solve_seqs=True)
+
+    Parameters:
+    - cam1, cam2 (camera): the pair
+    - codes (np.array): the LEDs' codes, from blink_codes(n_leds, length, max_off)
+    - length, max_off, gate_px: see blink_decoder
+    - max_dist, method: correlate settings for the fallback, as for multi_track
+    - max_error (float): see id_track
+    """
+
+    def __init__(self, cam1: camera, cam2: camera, codes: NDArray, length: int = 8, max_off: int = 2,
+                 gate_px: float = 15.0, max_dist: float = 15.0, method: str = "greedy", max_error: float = 0.01):
+        self.cam1 = cam1
+        self.cam2 = cam2
+        self.decoders = [blink_decoder(codes, length, max_off, gate_px) for _ in range(2)]
+        self.max_dist = max_dist
+        self.method = method
+        self.max_error = max_error
+
+    def reset(self):
+        for d in self.decoders:
+            d.reset()
+
+    def update(self, px1: NDArray, px2: NDArray, seq: int = None):
+        """
+        Feeds one frame of OpenCV pixels (N, 2) from each camera (every frame, in
+        order; seq optional, see blink_decoder). seq is one frame number for both,
+        or a pair (each camera's, like tracked_frame.seqs).
+
+        Returns:
+          pts_g: (3, K) points solved this frame
+          ids:   (K,) LED ID of each point, -1 = undecoded
+          error: (K,) ray-gap error of each point
+        """
+        seq1, seq2 = (seq, seq) if seq is None or np.ndim(seq) == 0 else seq
+        ids1 = self.decoders[0].update(px1, seq1)
+        ids2 = self.decoders[1].update(px2, seq2)
+        return id_track(px1, ids1, px2, ids2, self.cam1, self.cam2, return_error=True,
+                        max_dist=self.max_dist, method=self.method, max_error=self.max_error)
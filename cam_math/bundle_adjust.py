@@ -0,0 +1,356 @@
+import numpy as np
+from numpy.typing import NDArray
+from scipy.sparse import csr_matrix
+from scipy.spatial.transform import Rotation
+from .cam_class import camera
+from .offset_pixels import offset_pixels
+from .px2cam_unit import px2cam_unit
+from .distortion import distort
+from .rig_track import triangulate_multi
+
+def wand_observations(frames, cams: list, n_markers: int = 1, wand_length: float = None):
+    """
+    Turns recorded detection frames into bundle_adjust input.
+
+    frames:      iterable of per-frame pixel lists [px_cam0 (N0, 2), px_cam1, ...]
+                 (what multi_track / detlog_reader hand out)
+    n_markers:   1 for a single marker, 2 for a wand (two markers a fixed length apart)
+    wand_length: wand length (m), helps pick which end is which
+
+    Only frames where at least two cameras see exactly n_markers blobs are kept.
+    With a wand the ends are unlabeled, so every way of pairing them up across the
+    cameras (2^(C-1)) is triangulated from the initial cams, all frames at once, and
+    the pairing whose rays meet best (and whose length is closest) wins. This only
+    needs the cams roughly right (localize.py is plenty).
+
+    Returns (C, K, 2) top-left pixels, NaN where camera c did not see point k.
+    For a wand, points 2j and 2j+1 are the two ends seen in one frame.
+    """
+    n_cams = len(cams)
+
+    # 1) Usable frames as one (C, F, n_markers, 2) block, plus who saw them
+    px, good = [], []
+    for pxs in frames:
+        pxs = [np.asarray(p, dtype=np.float64).reshape(-1, 2) for p in pxs]
+        ok = np.array([p.shape[0] == n_markers for p in pxs])
+        if ok.sum() < 2:
+            continue
+        px.append([p if g else np.full((n_markers, 2), np.nan) for p, g in zip(pxs, ok)])
+        good.append(ok)
+    if not px:
+        return np.empty((n_cams, 0, 2))
+    px = np.array(px).transpose(1, 0, 2, 3)                              # (C, F, M, 2)
+    good = np.array(good).T                                              # (C, F)
+    n_frames = px.shape[1]
+    if n_markers == 1:
+        return px[:, :, 0]
+
+    # 2) Every pairing: swap[s, c] says whether camera c's blobs are taken in reverse
+    # order (camera 0 is the reference)
+    n_swap = 2 ** (n_cams - 1)
+    swap = np.zeros((n_swap, n_cams), dtype=np.intp)
+    swap[:, 1:] = (np.arange(n_swap)[:, np.newaxis] >> np.arange(n_cams - 1)) & 1
+
+    rays = np.zeros((n_cams, 3, n_frames, 2))
+    for c, cam in enumerate(cams):
+        seen = px[c][good[c]].reshape(-1, 2)
+        rays[c][:, good[c]] = px2cam_unit(cam, offset_pixels(cam, seen)).reshape(3, -1, 2)
+    end_a = np.stack([rays[c][:, :, swap[:, c]] for c in range(n_cams)])      # (C, 3, F, S)
+    end_b = np.stack([rays[c][:, :, 1 - swap[:, c]] for c in range(n_cams)])
+    obs = np.repeat(good[:, :, np.newaxis], n_swap, axis=2)
+
+    # 3) Triangulate both ends of every pairing in one go and score them
+    both = np.concatenate((end_a, end_b), axis=2).reshape(n_cams, 3, -1)
+    pts, err = triangulate_multi(cams, both, np.concatenate((obs, obs), axis=1).reshape(n_cams, -1))
+    err = err.reshape(2, n_frames, n_swap)
+    score = err[0] + err[1]
+    if wand_length is not None:
+        pts = pts.reshape(3, 2, n_frames, n_swap)
+        score += np.abs(np.linalg.norm(pts[:, 0] - pts[:, 1], axis=0) - wand_length)
+    best = swap[np.argmin(np.where(np.isfinite(score), score, np.inf), axis=1)]  # (F, C)
+
+    # 4) Ends in the winning order, interleaved: point 2f = end a, 2f + 1 = end b
+    out = np.empty((n_cams, n_frames, 2, 2))
+    f = np.arange(n_frames)
+    for c in range(n_cams):
+        out[c, :, 0] = px[c, f, best[:, c]]
+        out[c, :, 1] = px[c, f, 1 - best[:, c]]
+    return out.reshape(n_cams, 2 * n_frames, 2)
+
+
+# Robust losses on z = (error / f_scale)^2, same names and shapes as scipy's least_squares:
+# rho(z) for the cost and rho'(z) as the per-observation weight (IRLS)
+_LOSSES = {
+    'linear':  (lambda z: z, lambda z: np.ones_like(z)),
+    'huber':   (lambda z: np.where(z <= 1, z, 2 * np.sqrt(z) - 1), lambda z: 1 / np.sqrt(np.maximum(z, 1))),
+    'soft_l1': (lambda z: 2 * (np.sqrt(1 + z) - 1), lambda z: 1 / np.sqrt(1 + z)),
+    'cauchy':  (lambda z: np.log1p(z), lambda z: 1 / (1 + z)),
+}
+
+
+def _adjust(cams, obs_px, pts_g, wand_length, wand_sigma, refine_fov, loss, f_scale, max_iter, verbose):
+    """
+    One Levenberg-Marquardt run of the bundle adjustment (see bundle_adjust).
+    Returns (new cams, (3, K) points, (C, K) reprojection error in px before and
+    after (NaN = not seen), iterations used).
+    """
+    obs_px = np.asarray(obs_px, dtype=np.float64)
+    n_cams, n_pts = obs_px.shape[0], obs_px.shape[1]
+    seen = np.all(np.isfinite(obs_px), axis=2)                          # (C, K)
+    ci, ki = np.nonzero(seen)                                            # sorted by camera
+    target = obs_px[ci, ki].T                                            # (2, n_obs)
+    n_obs = ci.size
+    obs_of = [np.flatnonzero(ci == c) for c in range(n_cams)]
+    rho, weight = _LOSSES[loss]
+
+    # 1) Fixed per-camera data
+    R0 = np.stack([np.asarray(c.c_cam2g, dtype=np.float64) for c in cams])
+    o0 = np.stack([c.origin_g[:, 0] for c in cams])
+    fov0 = np.array([float(c.fovh_deg) for c in cams])
+    res = np.stack([np.asarray(c.res, dtype=np.float64) for c in cams])
+    ar = np.array([float(c.AR) for c in cams])
+    dist = np.stack([np.zeros(5) if c.dist is None else c.dist for c in cams])
+
+    # 2) Initial points: multi-ray triangulation from the initial cams
+    if pts_g is None:
+        rays = np.zeros((n_cams, 3, n_pts))
+        for c in range(n_cams):
+            rays[c][:, seen[c]] = px2cam_unit(cams[c], offset_pixels(cams[c], obs_px[c, seen[c]]))
+        pts_g, _ = triangulate_multi(cams, rays, seen)
+        pts_g = np.where(np.isfinite(pts_g), pts_g, np.nanmean(pts_g, axis=1, keepdims=True))
+    P = np.array(pts_g, dtype=np.float64).T                              # (K, 3)
+
+    # Camera parameters, per camera: [rotvec delta, position, fov]. Camera 0 has no
+    # pose (it fixes the frame). Without a wand the scale is fixed by letting cam1
+    # only slide on the sphere of its initial distance around cam0 (two tangent
+    # offsets instead of a position).
+    free_scale = wand_length is not None
+    n_pose = [0] + [6] * (n_cams - 1)
+    if not free_scale:
+        n_pose[1] = 5
+    n_par = np.array(n_pose) + (1 if refine_fov else 0)
+    i_cam = np.concatenate(([0], np.cumsum(n_par)))
+    n_a = int(i_cam[-1])
+
+    base = o0[1] - o0[0]
+    dist01 = np.linalg.norm(base)
+    e_dir = base / dist01
+    e_tan = np.linalg.svd(e_dir[np.newaxis, :])[2][1:] # (2, 3) orthonormal to the baseline
+
+    a = []
+    for c in range(n_cams):
+        pose = np.concatenate((np.zeros(3), o0[c] if (c > 1 or free_scale) else np.zeros(2)))
+        a += [pose[:n_pose[c]], fov0[c:c + 1] if refine_fov else []]
+    a = np.concatenate(a)
+
+    def cam_state(c, p):
+        """(c_cam2g, origin, fov) of camera c from its slice p of the parameters."""
+        R, o, fov = R0[c], o0[c], fov0[c]
+        if c > 0:
+            R = Rotation.from_rotvec(p[:3]).as_matrix() @ R
+            if c == 1 and not free_scale:
+                d = e_dir + p[3:5] @ e_tan
+                o = o0[0] + dist01 * d / np.linalg.norm(d)
+            else:
+                o = p[3:6]
+        if refine_fov:
+            fov = p[-1]
+        return R, o, fov
+
+    def project(c, state, Pk, sel):
+        """Reprojection residuals (2, n) of observations sel (all of camera c), points Pk (n, 3)."""
+        R, o, fov = state
+        tan = np.tan(np.deg2rad(fov) / 2)
+        focal = np.array([[res[c, 0] / (2 * tan)], [res[c, 1] / (2 * tan * ar[c])]])
+        pc = R.T @ (Pk - o).T                                            # c_g2cam @ rel
+        return distort(pc[0:2] / pc[2], dist[c]) * focal + (res[c] / 2.0)[:, np.newaxis] - target[:, sel]
+
+    def evaluate(a, P):
+        """Camera states, reprojection residuals (2, n_obs), wand gaps and total cost."""
+        states = [cam_state(c, a[i_cam[c]:i_cam[c + 1]]) for c in range(n_cams)]
+        r = np.empty((2, n_obs))
+        for c in range(n_cams):
+            r[:, obs_of[c]] = project(c, states[c], P[ki[obs_of[c]]], obs_of[c])
+        cost = 0.5 * f_scale ** 2 * np.sum(rho(np.sum(r * r, axis=0) / f_scale ** 2))
+        gap = None
+        if free_scale:
+            diff = P[0::2] - P[1::2]
+            gap = (np.linalg.norm(diff, axis=1) - wand_length) / wand_sigma
+            cost += 0.5 * np.sum(gap * gap)
+        return states, r, gap, cost
+
+    # Points are solved in groups that share no residual: single points, or the
+    # two ends of one wand (coupled by its length). s parameters per group.
+    m = 2 if free_scale else 1
+    n_grp, s = n_pts // m, 3 * m
+    h = 1e-6 # finite-difference step (rad, m, deg)
+    pt_cols = (3 * np.tile(ki, 2)[:, np.newaxis] + np.arange(3)).ravel()
+
+    states, r, gap, cost = evaluate(a, P)
+    err_before = np.full((n_cams, n_pts), np.nan)
+    err_before[ci, ki] = np.hypot(r[0], r[1])
+    lam, n_iter = 1e-3, 0
+    for n_iter in range(1, max_iter + 1):
+        # 3) Jacobian, block-sparse: each observation touches one camera's few
+        # parameters and one point. Forward differences, vectorized over observations:
+        # one evaluation per camera parameter (its own observations only) and three for all points.
+        J_a = np.zeros((2, n_obs, n_a))
+        for c in range(n_cams):
+            sel = obs_of[c]
+            for j in range(n_par[c]):
+                p = a[i_cam[c]:i_cam[c + 1]].copy()
+                p[j] += h
+                J_a[:, sel, i_cam[c] + j] = (project(c, cam_state(c, p), P[ki[sel]], sel) - r[:, sel]) / h
+        J_p = np.empty((2, n_obs, 3))
+        for j in range(3):
+            Ph = P.copy()
+            Ph[:, j] += h
+            for c in range(n_cams):
+                sel = obs_of[c]
+                J_p[:, sel, j] = (project(c, states[c], Ph[ki[sel]], sel) - r[:, sel]) / h
+
+        # 4) Normal equations [[U, W], [W^T, V]] with IRLS weights from the robust
+        # loss. The point part of the Jacobian goes in a sparse matrix (rows x/y of
+        # each observation, 3 columns of its point), so the per-point sums are products.
+        w = np.tile(weight(np.sum(r * r, axis=0) / f_scale ** 2), 2)      # (2 n_obs,)
+        Ja, rw = J_a.reshape(2 * n_obs, n_a), r.ravel() * w
+        Jb = csr_matrix((J_p.ravel(), (np.repeat(np.arange(2 * n_obs), 3), pt_cols)), shape=(2 * n_obs, 3 * n_pts))
+        JbT = Jb.T.tocsr()
+        U = Ja.T @ (Ja * w[:, np.newaxis])
+        g_a = Ja.T @ rw
+        Wp = (JbT @ (Ja * w[:, np.newaxis])).reshape(n_pts, 3, n_a).transpose(0, 2, 1)
+        gp = (JbT @ rw).reshape(n_pts, 3)
+        Vp = np.zeros((n_pts, 3, 3))
+        Vc = (JbT @ Jb.multiply(w[:, np.newaxis]).tocsr()).tocoo()
+        Vp[Vc.row // 3, Vc.row % 3, Vc.col % 3] = Vc.data
+
+        # Per group blocks; the wand length row couples both ends
+        V = np.zeros((n_grp, s, s))
+        for e in range(m):
+            V[:, 3 * e:3 * e + 3, 3 * e:3 * e + 3] = Vp[e::m]
+        W = Wp.reshape(n_grp, m, n_a, 3).transpose(0, 2, 1, 3).reshape(n_grp, n_a, s)
+        g_b = gp.reshape(n_grp, s)
+        if free_scale:
+            diff = P[0::2] - P[1::2]
+            u = diff / np.linalg.norm(diff, axis=1, keepdims=True) / wand_sigma
+            Jg = np.hstack((u, -u))                                      # (n_grp, 6)
+            V += Jg[:, :, np.newaxis] * Jg[:, np.newaxis, :]
+            g_b += Jg * gap[:, np.newaxis]
+
+        # 5) Damped steps until the cost drops. The point blocks are eliminated
+        # (Schur complement), leaving an n_a x n_a system for the cameras.
+        diag_idx = np.arange(s)
+        while True:
+            Vd = V.copy()
+            Vd[:, diag_idx, diag_idx] *= 1 + lam
+            Vd[:, diag_idx, diag_idx] += 1e-12
+            Vinv = np.linalg.inv(Vd)
+            Y = W @ Vinv                                                 # (n_grp, n_a, s)
+            S = U + lam * np.diag(np.diag(U)) - np.einsum('gas,gbs->ab', Y, W)
+            da = np.linalg.solve(S + 1e-12 * np.eye(n_a), -g_a + np.einsum('gas,gs->a', Y, g_b))
+            db = -np.einsum('gst,gt->gs', Vinv, g_b + np.einsum('gas,a->gs', W, da))
+
+            a_new, P_new = a + da, P + db.reshape(n_pts, 3)
+            new = evaluate(a_new, P_new)
+            if new[3] < cost:
+                lam = max(lam / 3, 1e-9)
+                break
+            lam *= 4
+            if lam > 1e9:
+                break
+
+        if verbose:
+            print(f"  iter {n_iter:3d}  cost {min(new[3], cost):.6g}  lambda {lam:.1e}")
+        if new[3] >= cost: # no step helps any more
+            break
+        drop = (cost - new[3]) / cost
+        a, P = a_new, P_new
+        states, r, gap, cost = new
+        if drop < 1e-10:
+            break
+
+    # 6) Hand back fresh cameras and every observation's reprojection error (px)
+    err = np.full((n_cams, n_pts), np.nan)
+    err[ci, ki] = np.hypot(r[0], r[1])
+    new_cams = [camera(o.copy(), R, float(fov), cams[c].res, cams[c].AR, cams[c].dist)
+                for c, (R, o, fov) in enumerate(states)]
+    return new_cams, P.T.copy(), err_before, err, n_iter
+
+
+def bundle_adjust(cams: list, obs_px: NDArray, pts_g: NDArray = None, wand_length: float = None,
+                  wand_sigma: float = 1e-3, refine_fov: bool = False, loss: str = "huber",
+                  f_scale: float = 1.0, outlier_px: float = 3.0, max_iter: int = 100, verbose: int = 0):
+    """
+    Jointly refines every camera pose (and optionally FOV) plus the marker
+    positions by minimizing pixel reprojection error over all observations.
+
+    Inputs:
+      cams:        list of C cameras, the initial guess (lens distortion is honoured, not refined)
+      obs_px:      (C, K, 2) OpenCV top-left pixels, NaN = not seen (see wand_observations)
+      pts_g:       (3, K) initial marker positions (default: triangulated from cams)
+      wand_length: if set, points (2j, 2j+1) are wand ends this far apart (m); this
+                   fixes the scale. wand_sigma (m) weighs it against 1 px of reprojection.
+      refine_fov:  also refine each camera's fovh_deg
+      loss/f_scale: robust loss for the final pass, as in scipy's least_squares
+                   ('linear', 'huber', 'soft_l1', 'cauchy'; f_scale in px)
+      outlier_px:  observations further off than this (or 5x the median error, if
+                   larger) are dropped between passes
+
+    Gauge: camera 0 is held fixed. Without a wand, the scale is held by keeping
+    the cam0-cam1 distance at its initial value (so it is only as good as that).
+
+    Sparse Levenberg-Marquardt: residuals and the Jacobian are vectorized over all
+    observations, and since each observation touches one camera and one point the
+    point blocks are eliminated (Schur complement) and only a small dense system
+    in the camera parameters is solved per step. Tens of thousands of
+    observations take a second or two.
+
+    Gross mismatches (a wand's ends swapped in one view, a reflection) make the
+    robust solvers crawl, so plain least squares runs first, outliers are dropped
+    (and points left with fewer than 2 views, plus their wand partner), and the
+    robust loss only polishes the cleaned set.
+
+    Returns:
+      cams:  list of C new camera objects
+      pts_g: (3, K) refined marker positions (NaN for dropped points)
+      info:  dict with 'rms_before' / 'rms_after' (px), 'rms_per_cam' (C,), 'n_obs'
+             (used in the final pass), 'n_rejected', 'iterations' (all passes)
+    """
+    obs = np.array(obs_px, dtype=np.float64)
+    n_pts = obs.shape[1]
+    keep = np.ones(n_pts, dtype=bool) # points still in the problem
+    n_total = int(np.all(np.isfinite(obs), axis=2).sum())
+    args = (wand_length, wand_sigma, refine_fov)
+    rms_before, n_iter = None, 0
+
+    # 1) Plain least squares, dropping outliers until none are left
+    for _ in range(5):
+        cams, pts, err0, err, it = _adjust(cams, obs[:, keep], pts_g, *args, "linear", 1.0, max_iter, verbose)
+        n_iter += it
+        if rms_before is None:
+            rms_before = np.sqrt(np.nanmean(err0 ** 2))
+        pts_g = pts
+        bad = err > max(outlier_px, 5 * np.nanmedian(err))
+        if not np.any(bad):
+            break
+        sub = obs[:, keep]
+        sub[bad] = np.nan
+        obs[:, keep] = sub
+        good = np.all(np.isfinite(sub), axis=2).sum(axis=0) >= 2
+        if wand_length is not None:
+            good = np.repeat(good[0::2] & good[1::2], 2)
+        keep[np.flatnonzero(keep)[~good]] = False
+        pts_g = pts_g[:, good]
+
+    # 2) Robust polish on the cleaned set
+    if loss != "linear":
+        cams, pts_g, _, err, it = _adjust(cams, obs[:, keep], pts_g, *args, loss, f_scale, max_iter, verbose)
+        n_iter += it
+
+    pts_out = np.full((3, n_pts), np.nan)
+    pts_out[:, keep] = pts_g
+    n_obs = int(np.isfinite(err).sum())
+    info = {'rms_before': float(rms_before), 'rms_after': float(np.sqrt(np.nanmean(err ** 2))),
+            'rms_per_cam': np.sqrt(np.nanmean(err ** 2, axis=1)), 'n_obs': n_obs,
+            'n_rejected': n_total - n_obs, 'iterations': n_iter}
+    return cams, pts_out, info
@@ -1,17 +1,235 @@
 import numpy as np
 from numpy.typing import NDArray
+from .distortion import build_undistort_lut
+from .epipolar_assign import dehomogenize_epipole
+
+# Cache entries derived from the pose (everything else only depends on the intrinsics)
+_POSE_KEYS = ('c_g2cam', 'origin_g')
 
 class camera:
     """
-    Camera object; no actual functions exist.
+    Camera object. Holds the pose and intrinsics, and lazily caches everything
+    that can be derived from them (focal lengths, K, K^-1, global->cam DCM, ...)
+    so the per-frame math only does pixel-dependent work.
+
+    Reassigning any attribute (cam.fovh_deg = 60, cam.c_cam2g = R, ...) drops the
+    cache automatically. Editing an array in place (cam.res[0] = 1280) does NOT,
+    so call cam.invalidate() if you do that.
+
+    dist is the lens distortion (k1, k2, p1, p2[, k3]) in OpenCV's model, or None
+    for a perfect pinhole. With distortion, px2cam_unit reads rays out of a per-pixel
+    lookup table (built on first use or by warm(), see undistort_lut) and cam2px distorts.
     """
 
-    def __init__(self, r_o2cam_g: NDArray, c_cam2g: NDArray, fovh_deg: float, res: NDArray, AR: float):
+    def __init__(self, r_o2cam_g: NDArray, c_cam2g: NDArray, fovh_deg: float, res: NDArray, AR: float,
+                 dist: NDArray = None):
         """
         Initializes the cam with the provided attributes.
         """
+        self._version = 0
+        self._cache = {}
+        self._pairs = {}
         self.r_o2cam_g = r_o2cam_g # vector from global origin to camera pinhole.
         self.c_cam2g = c_cam2g # column DCM rotating from camera frame to global frame.
         self.fovh_deg = fovh_deg # camera horizontal field of view, in degrees
         self.res = res # camera sensor resolution (width,height)
-        self.AR = AR # aspect ratio (width/height)
\ No newline at end of file
+        self.AR = AR # aspect ratio (width/height)
+        self.dist = dist # lens distortion (k1, k2, p1, p2, k3), None = pinhole
+
+    # --- pose / intrinsics (setting any of these invalidates the cache) ---
+    r_o2cam_g = property(lambda self: self._r_o2cam_g, lambda self, v: self._set('_r_o2cam_g', np.asarray(v), pose=True))
+    c_cam2g = property(lambda self: self._c_cam2g, lambda self, v: self._set('_c_cam2g', np.asarray(v), pose=True))
+    fovh_deg = property(lambda self: self._fovh_deg, lambda self, v: self._set('_fovh_deg', v))
+    res = property(lambda self: self._res, lambda self, v: self._set('_res', np.asarray(v)))
+    AR = property(lambda self: self._AR, lambda self, v: self._set('_AR', v))
+    dist = property(lambda self: self._dist, lambda self, v: self._set('_dist', _dist_coeffs(v)))
+
+    def _set(self, name, value, pose=False):
+        object.__setattr__(self, name, value)
+        self.invalidate(pose_only=pose)
+
+    def set_pose(self, r_o2cam_g: NDArray, c_cam2g: NDArray):
+        """
+        Moves the camera: pinhole and orientation are replaced together, with a
+        single cache invalidation, so nothing ever sees one without the other.
+        """
+        object.__setattr__(self, '_r_o2cam_g', np.asarray(r_o2cam_g))
+        object.__setattr__(self, '_c_cam2g', np.asarray(c_cam2g))
+        self.invalidate(pose_only=True)
+
+    def invalidate(self, pose_only: bool = False):
+        """
+        Drops all cached geometry. Any camera_pair built on this camera notices
+        via the version counter and rebuilds itself on next use.
+        pose_only keeps the intrinsic tables (undistortion LUT, K, ...), for pose
+        changes (extrinsic refinement moves the cameras while tracking).
+        """
+        self._version += 1
+        if pose_only:
+            for key in _POSE_KEYS:
+                self._cache.pop(key, None)
+        else:
+            self._cache.clear()
+
+    def _cached(self, key, fn):
+        try:
+            return self._cache[key]
+        except KeyError:
+            version = self._version
+            val = fn()
+            if version == self._version: # not invalidated meanwhile (by another thread)
+                self._cache[key] = val
+            return val
+
+    # --- derived intrinsics ---
+    @property
+    def tan_half_fov(self) -> float:
+        return self._cached('tan_half_fov', lambda: float(np.tan(np.deg2rad(self.fovh_deg) / 2)))
+
+    @property
+    def focal(self) -> NDArray:
+        """
+        (2, 1) focal lengths [sx, sy] in pixels.
+        sy uses AR to force a specific aspect (sy == sx for square pixels at the true AR).
+        """
+        def build():
+            res = np.asarray(self.res, dtype=np.float64)
+            sx = res[0] / (2 * self.tan_half_fov)
+            sy = res[1] / (2 * self.tan_half_fov * self.AR)
+            return np.array([[sx], [sy]])
+        return self._cached('focal', build)
+
+    @property
+    def inv_focal(self) -> NDArray:
+        """(2, 1) [1/sx, 1/sy]; scales centered pixels to normalized image coords."""
+        return self._cached('inv_focal', lambda: 1.0 / self.focal)
+
+    @property
+    def center(self) -> NDArray:
+        """(2, 1) image center (res/2), the shift from top-left to centered pixels."""
+        return self._cached('center', lambda: np.asarray(self.res, dtype=np.float64).reshape(2, 1) / 2.0)
+
+    @property
+    def K(self) -> NDArray:
+        """3x3 intrinsic matrix for SCREEN-CENTERED pixels (principal point at 0,0)."""
+        return self._cached('K', lambda: np.diag([self.focal[0, 0], self.focal[1, 0], 1.0]))
+
+    @property
+    def K_inv(self) -> NDArray:
+        return self._cached('K_inv', lambda: np.diag([self.inv_focal[0, 0], self.inv_focal[1, 0], 1.0]))
+
+    @property
+    def has_distortion(self) -> bool:
+        return self.dist is not None
+
+    @property
+    def undistort_lut(self) -> NDArray:
+        """
+        (2, H+1, W+1) float32 table of ideal normalized coords for every top-left
+        pixel grid point. Built once per intrinsics change (iterative undistortion
+        over the whole sensor: ~0.3 s at 640x360, ~1 s at 1280x720), then only
+        looked up. Call warm() before tracking so that isn't paid on a live frame.
+        """
+        return self._cached('undistort_lut', lambda: build_undistort_lut(self.res, self.focal, self.dist))
+
+    def warm(self):
+        """
+        Builds every cached table now (undistortion LUT included) instead of on
+        first use. capture_pipeline.start() calls it; call it yourself after
+        changing intrinsics mid-run. Returns self.
+        """
+        names = ('K', 'K_inv', 'center', 'c_g2cam', 'origin_g')
+        for name in names + (('undistort_lut',) if self.has_distortion else ()):
+            getattr(self, name)
+        return self
+
+    # --- derived pose ---
+    @property
+    def c_g2cam(self) -> NDArray:
+        """DCM rotating from global frame to camera frame (c_cam2g transposed)."""
+        return self._cached('c_g2cam', lambda: np.ascontiguousarray(np.asarray(self.c_cam2g, dtype=np.float64).T))
+
+    @property
+    def origin_g(self) -> NDArray:
+        """(3, 1) camera pinhole in the global frame."""
+        return self._cached('origin_g', lambda: np.asarray(self.r_o2cam_g, dtype=np.float64).reshape(3, 1))
+
+    def pair_with(self, other: "camera") -> "camera_pair":
+        """
+        Returns the cached camera_pair (self -> other), building it on first use.
+        """
+        pair = self._pairs.get(id(other))
+        if pair is None or pair.cam2 is not other:
+            pair = self._pairs[id(other)] = camera_pair(self, other)
+        return pair
+
+
+def _dist_coeffs(v):
+    """None / all zeros -> None, otherwise (k1, k2, p1, p2, k3) padded with zeros."""
+    if v is None:
+        return None
+    v = np.ravel(np.asarray(v, dtype=np.float64))
+    if v.size > 5:
+        raise ValueError("Only (k1, k2, p1, p2, k3) distortion is supported")
+    if not np.any(v):
+        return None
+    return np.concatenate((v, np.zeros(5 - v.size)))
+
+
+class camera_pair:
+    """
+    Cached relative geometry between two cameras (cam1 -> cam2).
+    Rebuilds itself whenever either camera's pose or intrinsics change.
+
+    Conventions (all in cam2's frame / SCREEN-CENTERED cam2 pixels):
+      P_cam2 = R_1to2 @ P_cam1 + t_1to2
+      t_1to2:   cam1 pinhole expressed in cam2's frame (3, 1)
+      epipole:  cam1 pinhole projected into cam2, centered pixels (2, 1), or None
+                when it is at infinity (baseline parallel to cam2's image plane)
+      epipole_h: the same, homogeneous (3, 1); always defined
+      E:        essential matrix, x2^T E x1 = 0 for normalized coords
+      F:        fundamental matrix, p2^T F p1 = 0 for centered pixel coords
+    """
+
+    def __init__(self, cam1: camera, cam2: camera):
+        self.cam1 = cam1
+        self.cam2 = cam2
+        self._versions = None
+
+    def _refresh(self):
+        versions = (self.cam1._version, self.cam2._version)
+        if versions == self._versions:
+            return
+        cam1, cam2 = self.cam1, self.cam2
+
+        # 1) Relative pose
+        R = cam2.c_g2cam @ cam1.c_cam2g
+        t = cam2.c_g2cam @ (cam1.origin_g - cam2.origin_g)
+
+        # 2) Epipole (cam1 pinhole seen by cam2). Kept homogeneous too: on a
+        # rectified rig t[2] is ~0 and the epipole is at infinity.
+        epipole_h = np.vstack((cam2.focal * t[0:2], t[2:3]))
+        epipole = dehomogenize_epipole(epipole_h)
+
+        # 3) Essential / fundamental
+        tx = np.array([
+            [0, -t[2, 0], t[1, 0]],
+            [t[2, 0], 0, -t[0, 0]],
+            [-t[1, 0], t[0, 0], 0]
+        ])
+        E = tx @ R
+        F = cam2.K_inv.T @ E @ cam1.K_inv
+
+        self._geom = {'R_1to2': R, 't_1to2': t, 'epipole': epipole, 'epipole_h': epipole_h, 'E': E, 'F': F}
+        self._versions = versions
+
+    def _get(self, key):
+        self._refresh()
+        return self._geom[key]
+
+    R_1to2 = property(lambda self: self._get('R_1to2'))
+    t_1to2 = property(lambda self: self._get('t_1to2'))
+    epipole = property(lambda self: self._get('epipole'))
+    epipole_h = property(lambda self: self._get('epipole_h'))
+    E = property(lambda self: self._get('E'))
+    F = property(lambda self: self._get('F'))
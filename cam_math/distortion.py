@@ -0,0 +1,108 @@
+import numpy as np
+from numpy.typing import NDArray
+
+# Lens distortion, OpenCV's (Brown-Conrady) model with coefficients (k1, k2, p1, p2, k3)
+# acting on normalized image coords (x/z, y/z), principal point at the image center.
+# Same numbers cv2.calibrateCamera spits out, so they can be pasted straight in.
+
+def distort(xn: NDArray, dist: NDArray, out: NDArray = None):
+    """
+    Ideal normalized coords (2, N) -> distorted normalized coords (2, N).
+    Closed form, so it is cheap enough for the per-frame path (cam2px).
+    """
+    k1, k2, p1, p2, k3 = dist
+    x, y = xn[0], xn[1]
+    r2 = x * x + y * y
+    radial = 1 + r2 * (k1 + r2 * (k2 + r2 * k3))
+    xd = x * radial + 2 * p1 * x * y + p2 * (r2 + 2 * x * x)
+    yd = y * radial + p1 * (r2 + 2 * y * y) + 2 * p2 * x * y
+    if out is None:
+        return np.stack((xd, yd))
+    out[0], out[1] = xd, yd
+    return out
+
+
+def undistort_iter(xd: NDArray, dist: NDArray, iters: int = 20):
+    """
+    Distorted normalized coords (2, N) -> ideal normalized coords, by damped Newton
+    (the plain fixed-point scheme of cv2.undistortPoints diverges towards the
+    corners of strong wide-angle lenses). Slow-ish: only used to build the lookup
+    table, never per detection.
+    """
+    k1, k2, p1, p2, k3 = dist
+    x = np.array(xd, dtype=np.float64)
+    xd = x.copy()
+    res = np.linalg.norm(distort(x, dist) - xd, axis=0)
+    idx = np.arange(x.shape[1])
+    for _ in range(iters):
+        # Only keep working on the points that haven't converged
+        idx = idx[res[idx] > 1e-12]
+        if idx.size == 0:
+            break
+        u, v = x[0, idx], x[1, idx]
+
+        # Jacobian of distort() at x, per point
+        r2 = u * u + v * v
+        radial = 1 + r2 * (k1 + r2 * (k2 + r2 * k3))
+        d_radial = k1 + r2 * (2 * k2 + 3 * k3 * r2) # d radial / d r2
+        j00 = radial + 2 * u * u * d_radial + 2 * p1 * v + 6 * p2 * u
+        j01 = 2 * u * v * d_radial + 2 * p1 * u + 2 * p2 * v
+        j10 = 2 * u * v * d_radial + 2 * p1 * u + 2 * p2 * v
+        j11 = radial + 2 * v * v * d_radial + 6 * p1 * v + 2 * p2 * u
+        f = distort(x[:, idx], dist) - xd[:, idx]
+        det = j00 * j11 - j01 * j10
+        det = np.where(np.abs(det) < 1e-12, 1e-12, det)
+        step = np.stack((j11 * f[0] - j01 * f[1], j00 * f[1] - j10 * f[0])) / det
+
+        # Halve the step until the residual drops (keeps it off the far side of the fold)
+        # (points past the fold have no exact answer; they keep the closest one)
+        t = np.ones(idx.size)
+        for _ in range(8):
+            x_new = x[:, idx] - t * step
+            res_new = np.linalg.norm(distort(x_new, dist) - xd[:, idx], axis=0)
+            worse = ~(res_new < res[idx])
+            if not np.any(worse):
+                break
+            t[worse] *= 0.5
+        ok = ~worse
+        x[:, idx[ok]], res[idx[ok]] = x_new[:, ok], res_new[ok]
+        idx = idx[ok] # stalled points are as close as they will get
+    return x
+
+
+def build_undistort_lut(res, focal: NDArray, dist: NDArray):
+    """
+    Per-pixel ray table for a sensor of resolution res = (W, H).
+    lut[:, v, u] is the ideal normalized (x/z, y/z) of top-left pixel (u, v), for
+    u = 0..W and v = 0..H (one extra row/column so every in-sensor point has four
+    neighbours). float32: ~7 MB at 1280x720.
+    """
+    w, h = int(res[0]), int(res[1])
+    u, v = np.meshgrid(np.arange(w + 1, dtype=np.float64), np.arange(h + 1, dtype=np.float64))
+    xd = np.stack(((u.ravel() - w / 2) / focal[0, 0], (v.ravel() - h / 2) / focal[1, 0]))
+    return undistort_iter(xd, dist).reshape(2, h + 1, w + 1).astype(np.float32)
+
+
+def lut_lookup(lut: NDArray, px: NDArray, center: NDArray, out: NDArray = None):
+    """
+    Bilinear lookup of centered pixels (2, N) in an undistortion table.
+    Pixels outside the sensor are clamped to its edge.
+    Returns (2, N) ideal normalized coords (written into out if given).
+    """
+    _, h1, w1 = lut.shape
+    u = np.clip(px[0] + center[0, 0], 0, w1 - 1)
+    v = np.clip(px[1] + center[1, 0], 0, h1 - 1)
+    i = np.minimum(u.astype(np.intp), w1 - 2)
+    j = np.minimum(v.astype(np.intp), h1 - 2)
+    fu, fv = u - i, v - j
+
+    # Four neighbours through flat indices, blended per axis
+    flat = lut.reshape(2, -1)
+    k = j * w1 + i
+    top = flat[:, k] * (1 - fu) + flat[:, k + 1] * fu
+    bot = flat[:, k + w1] * (1 - fu) + flat[:, k + w1 + 1] * fu
+    if out is None:
+        return top * (1 - fv) + bot * fv
+    np.multiply(top, 1 - fv, out=out)
+    out += bot * fv
+    return out
@@ -0,0 +1,214 @@
+import numpy as np
+from numpy.typing import NDArray
+from scipy.spatial import cKDTree
+
+# An epipole further than this from the image center (px) is treated as being at
+# infinity: over a real image its lines are parallel to well under a pixel.
+_FAR_PX = 1e8
+
+
+def dehomogenize_epipole(epipole_h: NDArray):
+    """
+    (3, 1) homogeneous epipole [x, y, w] -> (2, 1) centered pixels, or None when
+    it is at infinity (w ~ 0: baseline parallel to the image plane, e.g. a
+    rectified side-by-side rig).
+    """
+    e = np.asarray(epipole_h, dtype=np.float64).reshape(3, 1)
+    if abs(e[2, 0]) * _FAR_PX <= np.hypot(e[0, 0], e[1, 0]):
+        return None
+    return e[0:2] / e[2, 0]
+
+
+def _expand_ranges(lo, hi, order):
+    """Flat (line, point) index pairs for per-point ranges [lo, hi) of the sorted lines."""
+    counts = hi - lo
+    j_pt = np.repeat(np.arange(lo.size), counts)
+    starts = np.repeat(lo - np.concatenate(([0], np.cumsum(counts)[:-1])), counts)
+    i_line = order[(np.arange(j_pt.size) + starts) % order.size]
+    return i_line, j_pt
+
+
+def _parallel_candidates(direction: NDArray, px_lines: NDArray, px_pts: NDArray, max_dist: float):
+    """
+    epipolar_candidates for an epipole at infinity: every line runs along
+    `direction`, so each one is just its offset along the normal and the gate
+    becomes an interval search over the sorted offsets.
+    """
+    nrm = np.array([-direction[1, 0], direction[0, 0]]) / np.hypot(direction[0, 0], direction[1, 0])
+    s_line = nrm @ px_lines
+    s_pt = nrm @ px_pts
+    order = np.argsort(s_line)
+    s_sorted = s_line[order]
+    lo = np.searchsorted(s_sorted, s_pt - max_dist, side='left')
+    hi = np.searchsorted(s_sorted, s_pt + max_dist, side='right')
+    i_line, j_pt = _expand_ranges(lo, hi, order)
+    dist = np.abs(s_pt[j_pt] - s_line[i_line])
+    keep = dist <= max_dist
+    return i_line[keep], j_pt[keep], dist[keep]
+
+
+def epipolar_candidates(epipole: NDArray, px_lines: NDArray, px_pts: NDArray, max_dist: float):
+    """
+    Finds every (line, point) pair whose point-to-epipolar-line distance is <= max_dist,
+    without building the dense (N, M) distance matrix.
+
+    All epipolar lines pass through the epipole, so a line is fully described by
+    its angle around it (mod pi). Lines are sorted by that angle (a continuous set
+    of angular buckets), and each point only looks at the lines whose angle is
+    within asin(max_dist / r) of its own, r being its distance from the epipole.
+    An epipole at infinity (rectified rigs) makes every line parallel; they are
+    then bucketed by their offset instead.
+
+    Inputs (all SCREEN-CENTERED pixels in the same image):
+      epipole:  (2, 1) epipole, or (3, 1) homogeneous (camera_pair.epipole_h)
+      px_lines: (2, N) a second point on each epipolar line
+      px_pts:   (2, M) points to match against the lines
+    Returns:
+      i_line (K,), j_pt (K,), dist (K,) for the K pairs inside the gate
+    """
+    n_lines, n_pts = px_lines.shape[1], px_pts.shape[1]
+    empty = (np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp), np.empty(0))
+    if n_lines == 0 or n_pts == 0:
+        return empty
+
+    e = np.asarray(epipole, dtype=np.float64).reshape(-1, 1)
+    if e.shape[0] == 3:
+        e_px = dehomogenize_epipole(e)
+        if e_px is None:
+            if not np.any(e[0:2]): # coincident pinholes: no epipolar geometry at all
+                return empty
+            return _parallel_candidates(e[0:2], px_lines, px_pts, max_dist)
+        e = e_px
+
+    # 1) Unit direction of every line, and the point offsets from the epipole
+    d = px_lines - e
+    d = d / np.hypot(d[0], d[1])
+    q = px_pts - e
+    r = np.hypot(q[0], q[1])
+
+    bad = ~np.isfinite(d[0])
+    if bad.any():
+        # A line point sitting on the epipole has no direction: it can't match
+        keep = np.flatnonzero(~bad)
+        i_line, j_pt, dist = epipolar_candidates(e, px_lines[:, keep], px_pts, max_dist)
+        return keep[i_line], j_pt, dist
+
+    # 2) Sort lines by angle in [0, pi); tile the sorted list at -pi and +pi
+    # so wrapped windows stay contiguous.
+    theta = np.arctan2(d[1], d[0]) % np.pi
+    order = np.argsort(theta)
+    theta_ext = np.concatenate((theta[order] - np.pi, theta[order], theta[order] + np.pi))
+
+    # 3) Angular half-window per point. Anything wider than pi/2 sees every line.
+    phi = np.arctan2(q[1], q[0]) % np.pi
+    with np.errstate(divide='ignore'):
+        half = np.arcsin(np.minimum(1.0, max_dist / r))
+    lo = np.searchsorted(theta_ext, phi - half, side='left')
+    hi = np.searchsorted(theta_ext, phi + half, side='right')
+    wide = half >= np.pi / 2
+    lo[wide], hi[wide] = n_lines, 2 * n_lines
+
+    # 4) Expand the per-point ranges into flat (line, point) index pairs
+    i_line, j_pt = _expand_ranges(lo, hi, order)
+
+    # 5) Exact perpendicular distance for the surviving pairs only
+    dist = np.abs(q[0, j_pt] * d[1, i_line] - q[1, j_pt] * d[0, i_line])
+    keep = dist <= max_dist
+    return i_line[keep], j_pt[keep], dist[keep]
+
+
+def assign_pairs(i_line: NDArray, j_pt: NDArray, dist: NDArray, n_lines: int, n_pts: int, method: str = "greedy",
+                 out: NDArray = None):
+    """
+    One-to-one assignment over sparse (line, point, cost) candidates.
+
+    method:
+      "greedy":  take the globally cheapest remaining pair until nothing is left.
+      "optimal": minimum total cost (Hungarian), solved per connected component
+                 of the candidate graph so cost stays local to each cluster.
+
+    Returns (n_pts,) index of the matched line for every point, -1 if unmatched
+    (written into `out` if given).
+    """
+    if out is None:
+        match = np.full(n_pts, -1, dtype=np.intp)
+    else:
+        match = out
+        match.fill(-1)
+    if dist.size == 0:
+        return match
+
+    if method == "greedy":
+        # Same result as walking the candidates cheapest-first, but vectorized:
+        # each round accepts every pair that is the cheapest live candidate for BOTH
+        # its line and its point (the globally cheapest pair always qualifies), then
+        # kills every candidate touching an accepted line or point.
+        order = np.argsort(dist, kind='stable')
+        i_line, j_pt = i_line[order], j_pt[order]
+        line_used = np.zeros(n_lines, dtype=bool)
+        first_i = np.empty(n_lines, dtype=np.intp)
+        first_j = np.empty(n_pts, dtype=np.intp)
+        while i_line.size:
+            # Position of the cheapest live candidate per line / per point: the
+            # candidates are cost-sorted, so that is each one's smallest position
+            # (ufunc.at is unbuffered, so repeated indices are well defined)
+            k = np.arange(i_line.size)
+            first_i.fill(k.size)
+            first_j.fill(k.size)
+            np.minimum.at(first_i, i_line, k)
+            np.minimum.at(first_j, j_pt, k)
+            win = np.flatnonzero((first_i[i_line] == k) & (first_j[j_pt] == k))
+            match[j_pt[win]] = i_line[win]
+            line_used[i_line[win]] = True
+            live = ~line_used[i_line] & (match[j_pt] < 0)
+            i_line, j_pt = i_line[live], j_pt[live]
+        return match
+
+    if method == "optimal":
+        from scipy.optimize import linear_sum_assignment
+        from scipy.sparse import coo_matrix
+        from scipy.sparse.csgraph import connected_components
+
+        # Lines are nodes [0, N), points are nodes [N, N + M)
+        graph = coo_matrix((np.ones(dist.size), (i_line, n_lines + j_pt)), shape=(n_lines + n_pts,) * 2)
+        _, label = connected_components(graph, directed=False)
+        comp = label[i_line]
+        order = np.argsort(comp, kind='stable')
+        bounds = np.flatnonzero(np.diff(comp[order])) + 1
+        big = 1e6 * (dist.max() + 1.0)
+        for ks in np.split(order, bounds):
+            rows, ri = np.unique(i_line[ks], return_inverse=True)
+            cols, ci = np.unique(j_pt[ks], return_inverse=True)
+            cost = np.full((rows.size, cols.size), big)
+            cost[ri, ci] = dist[ks]
+            r_sel, c_sel = linear_sum_assignment(cost)
+            ok = cost[r_sel, c_sel] < big
+            match[cols[c_sel[ok]]] = rows[r_sel[ok]]
+        return match
+
+    raise ValueError(f"Unknown assignment method '{method}'")
+
+
+def gate_match(pred_px, det_px, gate_px):
+    """
+    One-to-one match of predicted pixels (2, T) to detections (2, N), both in the
+    same image. Only pairs within gate_px are considered; NaN predictions never match.
+    Uses a KD-tree over the detections, so cost is ~(T + N) log N.
+    Returns (T,) detection index per prediction, -1 if none.
+    """
+    n_pred, n_det = pred_px.shape[1], det_px.shape[1]
+    match = np.full(n_pred, -1, dtype=np.intp)
+    ok = np.all(np.isfinite(pred_px), axis=0)
+    if n_det == 0 or not np.any(ok):
+        return match
+
+    k = min(3, n_det)
+    dist, j = cKDTree(det_px.T).query(pred_px[:, ok].T, k=k, distance_upper_bound=gate_px)
+    dist, j = dist.reshape(-1, k), j.reshape(-1, k)
+    hit = np.isfinite(dist)
+    i_pred = np.flatnonzero(ok)[np.nonzero(hit)[0]]
+
+    det_for = assign_pairs(i_pred, j[hit], dist[hit], n_pred, n_det, "greedy")
+    seen = det_for >= 0
+    match[det_for[seen]] = np.flatnonzero(seen)
+    return match
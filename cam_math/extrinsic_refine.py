@@ -0,0 +1,207 @@
+import numpy as np
+from numpy.typing import NDArray
+from scipy.spatial.transform import Rotation
+from .offset_pixels import offset_pixels
+from .px2cam_unit import px2cam_unit
+from .correlate import correlate
+from .triangulate import triangulate
+from .cam_class import camera
+
+
+def print_drift(drifting: bool, gap: float):
+    if drifting:
+        print(f"Extrinsic drift: typical ray gap {gap * 1000:.1f} mm, recalibrate (calibration/localize.py)")
+    else:
+        print(f"Extrinsic drift cleared: typical ray gap {gap * 1000:.1f} mm")
+
+
+class extrinsic_refiner:
+    """
+    Keeps a stereo pair's extrinsics tuned while tracking, and raises an alarm
+    when they drift faster than it can follow (a bumped mount).
+
+    Every matched ray pair of a correct calibration intersects, so its signed ray
+    gap (o2 - o1) . unit(d1 x d2) is zero. Each frame, the well-conditioned pairs
+    (wide triangulation angle, plausible gap) are linearized in cam2's pose
+    (a small rotation and a pinhole shift) and added to a 6x6 normal-equation
+    accumulator with exponential forgetting. Every update_every frames a tiny
+    solve moves cam2 and shifts the accumulator to the new linearization point
+    (g += A @ step), so history is never revisited: O(1) per frame, whatever the
+    run length.
+
+    Only the relative pose is observable from rays, so cam1 stays put, and cam2's
+    shift is kept perpendicular to the baseline (scale stays as calibrated).
+
+    cam2 moves while it is being tracked with, so feed the refiner from the thread
+    that tracks. In a capture_pipeline that is its solve, and track() does both
+    jobs from one set of matches:
+
+        pipe = capture_pipeline(sources, [cam1, cam2], solve=lambda pxs, cams: refiner.track(*pxs))
+
+    Parameters:
+    - cam1, cam2 (camera): the pair, as used for multi_track (cam2 gets refined)
+    - update_every (int): frames between pose updates
+    - memory (float): accumulator forgetting time constant (frames)
+    - min_rays (float): (weighted) ray pairs in memory needed before updating
+    - min_angle_deg (float): smallest triangulation angle a pair may have
+    - max_gap (float): pairs with a bigger gap are treated as mismatches (global units)
+    - huber (float): gap beyond which a pair's weight falls off (global units)
+    - max_step_deg (float): largest rotation applied per update
+    - min_conditioning (float): smallest ratio of the least to the best determined
+                                rotation direction (pinhole shift solved out) a
+                                solve needs; rays bunched in a small or distant
+                                volume fall below it and cam2 is left alone
+    - alarm_gap (float): smoothed median gap that trips the drift alarm (global units);
+                         it clears again below 0.8 * alarm_gap
+    - alarm_frames (float): smoothing time constant of that gap (frames)
+    - on_drift (callable): on_drift(drifting, gap) when the alarm trips or clears
+                           (default: print_drift)
+    - max_dist, method: correlate settings, as for multi_track
+    """
+
+    def __init__(self, cam1: camera, cam2: camera, update_every: int = 30, memory: float = 3000.0,
+                 min_rays: float = 200.0, min_angle_deg: float = 3.0, max_gap: float = 0.05,
+                 huber: float = 0.003, max_step_deg: float = 0.5, min_conditioning: float = 2e-4,
+                 alarm_gap: float = 0.005, alarm_frames: float = 120.0, on_drift=None, max_dist: float = 15.0,
+                 method: str = "greedy"):
+        self.cam1 = cam1
+        self.cam2 = cam2
+        self.update_every = update_every
+        self.memory = memory
+        self.min_rays = min_rays
+        self.min_angle_deg = min_angle_deg
+        self.max_gap = max_gap
+        self.huber = huber
+        self.max_step_deg = max_step_deg
+        self.min_conditioning = min_conditioning
+        self.alarm_gap = alarm_gap
+        self.alarm_frames = alarm_frames
+        self.on_drift = on_drift if on_drift is not None else print_drift
+        self.max_dist = max_dist
+        self.method = method
+        self.reset()
+
+    def reset(self):
+        """Forgets everything gathered so far (the cameras keep their current pose)."""
+        self.A = np.zeros((6, 6)) # normal matrix, [rotation (3), pinhole shift (3)] of cam2
+        self.g = np.zeros(6) # gradient
+        self.n_rays = 0.0 # weighted pairs in memory
+        self.frames = 0
+        self.updates = 0
+        self.gap = None # smoothed median |gap| of the matched pairs
+        self.drifting = False
+
+    def _jacobian(self, u1, u2):
+        """Signed gaps (K,) and their (K, 6) derivatives w.r.t. cam2's rotation and pinhole."""
+        d1 = (self.cam1.c_cam2g @ u1).T
+        d2 = (self.cam2.c_cam2g @ u2).T
+        b = (self.cam2.origin_g - self.cam1.origin_g)[:, 0]
+        m = np.cross(d1, d2)
+        s = np.linalg.norm(m, axis=1)
+        n = m / s[:, None]
+        gap = n @ b
+
+        # Rotating cam2 by phi turns d2 into d2 + phi x d2, so
+        # d gap = phi . [q (d1 . d2) - d1 (q . d2)], q = (b - gap n) / |d1 x d2|
+        q = (b - gap[:, None] * n) / s[:, None]
+        J_rot = q * np.sum(d1 * d2, axis=1)[:, None] - d1 * np.sum(q * d2, axis=1)[:, None]
+        return gap, np.hstack((J_rot, n)), s
+
+    def _matched_rays(self, px1: NDArray, px2: NDArray):
+        """Matched unit rays (3, K) of each camera, same as multi_track."""
+        u1 = px2cam_unit(self.cam1, offset_pixels(self.cam1, px1))
+        u2 = px2cam_unit(self.cam2, offset_pixels(self.cam2, px2))
+        if not (u1.shape[1] and u2.shape[1]):
+            return np.empty((3, 0)), np.empty((3, 0))
+        idx = correlate(self.cam1, self.cam2, u1, u2, self.max_dist, self.method)
+        ok = idx >= 0
+        return u1[:, idx[ok]], u2[:, ok]
+
+    def track(self, px1: NDArray, px2: NDArray):
+        """
+        multi_track and update() in one pass: solves the frame's points (3, K),
+        then refines with the same matches.
+        """
+        u1, u2 = self._matched_rays(px1, px2)
+        pts_g, _ = triangulate(u1, u2, self.cam1, self.cam2)
+        self.update_rays(u1, u2)
+        return pts_g
+
+    def update(self, px1: NDArray, px2: NDArray):
+        """
+        Feeds one frame of OpenCV pixels (N, 2) from each camera (the same ones
+        multi_track got). Returns True if cam2's pose was updated this frame.
+        """
+        return self.update_rays(*self._matched_rays(px1, px2))
+
+    def update_rays(self, u1: NDArray, u2: NDArray):
+        """update() for rays already matched: (3, K) unit rays of cam1 and cam2, column k with column k."""
+        self.frames += 1
+
+        # 1) Gaps and their derivatives
+        if u1.shape[1]:
+            gap, J, s = self._jacobian(u1, u2)
+        else:
+            gap, J, s = np.empty(0), np.empty((0, 6)), np.empty(0)
+
+        # 2) Drift watch on everything matched
+        if gap.size:
+            k = 1.0 / self.alarm_frames
+            med = float(np.median(np.abs(gap)))
+            self.gap = med if self.gap is None else (1 - k) * self.gap + k * med
+            # Clears a bit below where it trips, so it doesn't chatter around the threshold
+            if self.gap > self.alarm_gap if not self.drifting else self.gap < 0.8 * self.alarm_gap:
+                self.drifting = not self.drifting
+                self.on_drift(self.drifting, self.gap)
+
+        # 3) Accumulate the well-conditioned pairs (|d1 x d2| = sin of the ray angle)
+        lam = 1.0 - 1.0 / self.memory
+        good = (s >= np.sin(np.deg2rad(self.min_angle_deg))) & (np.abs(gap) <= self.max_gap)
+        gap, J = gap[good], J[good]
+        w = np.minimum(1.0, self.huber / np.maximum(np.abs(gap), 1e-12))
+        self.A = lam * self.A + (J * w[:, None]).T @ J
+        self.g = lam * self.g + (J * w[:, None]).T @ gap
+        self.n_rays = lam * self.n_rays + float(w.sum())
+
+        if self.frames % self.update_every:
+            return False
+        return self.solve()
+
+    def solve(self):
+        """
+        Moves cam2 by the accumulated Gauss-Newton step, if there is enough
+        well-spread data. Returns True if it did.
+        """
+        if self.n_rays < self.min_rays:
+            return False
+
+        # 1) Drop the unobservable direction (pinhole sliding along the baseline)
+        b = (self.cam2.origin_g - self.cam1.origin_g)[:, 0]
+        E = np.linalg.svd(b.reshape(1, 3))[2][1:].T # (3, 2) basis perpendicular to b
+        P = np.zeros((6, 5))
+        P[:3, :3] = np.eye(3)
+        P[3:, 3:] = E
+        A, g = P.T @ self.A @ P, P.T @ self.g
+
+        # 2) Skip ill-conditioned systems. With the rays bunched together some rotation
+        # of cam2 is nearly the same as a pinhole shift, and the solve wanders along it
+        # while the gaps stay at the noise floor. So compare the weakest rotation, with
+        # the shift solved out (Schur complement), to the best determined one.
+        try:
+            A_rot = A[:3, :3] - A[:3, 3:] @ np.linalg.solve(A[3:, 3:], A[3:, :3])
+        except np.linalg.LinAlgError:
+            return False
+        if np.linalg.eigvalsh(A_rot)[0] < self.min_conditioning * np.linalg.eigvalsh(A[:3, :3])[-1]:
+            return False
+        step = P @ np.linalg.solve(A, -g)
+        angle = np.linalg.norm(step[:3])
+        if angle > np.deg2rad(self.max_step_deg):
+            step *= np.deg2rad(self.max_step_deg) / angle
+
+        # 3) Apply (rotation and pinhole together), and move the linearization point along with it
+        r = np.asarray(self.cam2.r_o2cam_g, dtype=np.float64)
+        self.cam2.set_pose(r + step[3:].reshape(r.shape),
+                           Rotation.from_rotvec(step[:3]).as_matrix() @ self.cam2.c_cam2g)
+        self.g += self.A @ step
+        self.updates += 1
+        return True
@@ -0,0 +1,149 @@
+import time
+import threading
+import numpy as np
+
+class _null_stage:
+    """Shared do-nothing context manager handed out while instrumentation is off."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL = _null_stage()
+
+
+class _stage:
+    __slots__ = ('inst', 'name', 't0')
+
+    def __init__(self, inst, name):
+        self.inst = inst
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.inst.add_time(self.name, time.perf_counter() - self.t0)
+        return False
+
+
+class instrumentation:
+    """
+    Opt-in per-stage latency timers and counters.
+
+    Disabled (the default), stage() returns a shared no-op context manager and
+    count() returns immediately, so the hooks left in cam_math / the pipeline cost
+    one attribute check each.
+
+    Enabled, every stage keeps a ring buffer of its last `window` durations (the
+    rolling histogram: p50/p95/p99 are computed from it only when a summary is
+    asked for) and counters accumulate until the next report.
+
+        from cam_math import instrument
+        instrument.enable(report_every=5.0)     # prints a table every 5 s
+        ...
+        with instrument.stage("draw"): ...
+        instrument.count("detected", len(px1))
+        instrument.tick()                        # once per frame, fires the report
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.window = 1024
+        self.report_every = None
+        self.callback = None
+        self._lock = threading.Lock()
+        self.reset()
+
+    def enable(self, report_every: float = None, callback=None, window: int = 1024):
+        """
+        Turns instrumentation on. With report_every (s), tick() calls
+        callback(summary) at that period (callback defaults to print_summary).
+        """
+        self.window = window
+        self.report_every = report_every
+        self.callback = callback if callback is not None else print_summary
+        self.reset()
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self._times = {} # name -> [ring list, next slot, total count]
+            self._counts = {}
+            self._t_report = time.monotonic()
+
+    def stage(self, name: str):
+        """Context manager timing one pass through stage `name`."""
+        if not self.enabled:
+            return _NULL
+        return _stage(self, name)
+
+    def add_time(self, name: str, seconds: float):
+        if not self.enabled:
+            return
+        with self._lock:
+            rec = self._times.get(name)
+            if rec is None:
+                rec = self._times[name] = [[], 0, 0]
+            ring = rec[0]
+            if len(ring) < self.window:
+                ring.append(seconds)
+            else:
+                ring[rec[1]] = seconds
+            rec[1] = (rec[1] + 1) % self.window
+            rec[2] += 1
+
+    def count(self, name: str, n: int = 1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + n
+
+    def summary(self):
+        """
+        {'stages': {name: {'n', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms'}},
+         'counts': {name: total since the last report}, 'period_s': seconds covered}
+        """
+        with self._lock:
+            stages = {}
+            for name, (ring, _, n) in self._times.items():
+                v = np.asarray(ring) * 1e3
+                p50, p95, p99 = np.percentile(v, (50, 95, 99))
+                stages[name] = {'n': n, 'mean_ms': float(v.mean()), 'p50_ms': float(p50),
+                                'p95_ms': float(p95), 'p99_ms': float(p99)}
+            return {'stages': stages, 'counts': dict(self._counts),
+                    'period_s': time.monotonic() - self._t_report}
+
+    def tick(self):
+        """Call once per frame; fires the periodic report when it is due."""
+        if not self.enabled or self.report_every is None:
+            return
+        now = time.monotonic()
+        if now - self._t_report >= self.report_every:
+            summary = self.summary()
+            with self._lock:
+                self._counts = {}
+                self._t_report = now
+            self.callback(summary)
+
+
+def print_summary(summary):
+    """Default report: one line per stage plus the counters (per second)."""
+    print(f"--- timing over {summary['period_s']:.1f} s ---")
+    for name, s in summary['stages'].items():
+        print(f"  {name:<16} p50 {s['p50_ms']:7.3f}  p95 {s['p95_ms']:7.3f}  p99 {s['p99_ms']:7.3f} ms")
+    if summary['counts']:
+        rate = max(summary['period_s'], 1e-9)
+        print("  " + "  ".join(f"{k}: {v} ({v / rate:.1f}/s)" for k, v in summary['counts'].items()))
+
+
+# The one instance everything reports into
+instrument = instrumentation()
@@ -2,36 +2,52 @@ import numpy as np
 from .offset_pixels import offset_pixels
 from .px2cam_unit import px2cam_unit
 from .correlate import correlate
-from .locate import locate
+from .triangulate import triangulate
 from .cam_class import camera
+from .instrument import instrument
+from .workspace import workspace, _out
 from numpy.typing import NDArray
 
 "This function takes in lit pixels from OpenCV, and spits out 3D points!"
-"It can track an arbitrarily large number of points, but it'll probably start sucking"
-def multi_track(px1: NDArray, px2: NDArray, cam1: camera, cam2: camera):
+"It can track an arbitrarily large number of points. Correspondence is one-to-one and gated"
+"(max_dist, in cam2 pixels), so cam2 blobs with no believable cam1 partner are dropped."
+"Pass a workspace (ws) to run allocation-free; the results are then views into it."
+def multi_track(px1: NDArray, px2: NDArray, cam1: camera, cam2: camera, return_error: bool = False,
+                max_dist: float = 15.0, method: str = "greedy", ws: workspace = None):
+    n1, n2 = len(px1), len(px2)
+    if ws is not None:
+        ws.reserve(max(n1, n2))
+
     # 1) Offset pixels
-    px1_off = offset_pixels(cam1.res, px1)
-    px2_off = offset_pixels(cam2.res, px2)
+    with instrument.stage("offset_pixels"):
+        px1_off = offset_pixels(cam1, px1, out=_out(ws, 'px1', n1))
+        px2_off = offset_pixels(cam2, px2, out=_out(ws, 'px2', n2))
 
     # 2) Transform pixels to 3D unit vectors
-    u1 = px2cam_unit(cam1, px1_off)
-    u2 = px2cam_unit(cam2, px2_off)
+    with instrument.stage("px2cam_unit"):
+        u1 = px2cam_unit(cam1, px1_off, out=_out(ws, 'u1', n1))
+        u2 = px2cam_unit(cam2, px2_off, out=_out(ws, 'u2', n2))
 
     # 3) Correlate via epipolar constraint
-    pt2_pt1_partner_indices = correlate(cam1, cam2, u1, u2)
-    
-    # 4) Sort matched indices and triangulate pairs
-    matched_u1 = u1[:, pt2_pt1_partner_indices]
-    n_pairs = u2.shape[1]
-    pts_g = np.zeros((3, n_pairs))
-    
-    for i_pair in range(n_pairs):
-        v1_vec = matched_u1[:, i_pair]
-        v2_vec = u2[:, i_pair]
-        
-        # Pass the specific vectors for this pair
-        point_3d, error = locate(v1_vec, v2_vec, cam1, cam2)
-        pts_g[:, i_pair] = point_3d.flatten()
+    with instrument.stage("correlate"):
+        pt2_pt1_partner_indices = correlate(cam1, cam2, u1, u2, max_dist, method, ws)
+        matched = np.greater_equal(pt2_pt1_partner_indices, 0, out=_out(ws, 'matched', n2))
+
+    # 4) Sort matched indices and triangulate all pairs in one shot
+    with instrument.stage("triangulate"):
+        k = int(np.count_nonzero(matched))
+        sel = np.compress(matched, pt2_pt1_partner_indices, out=_out(ws, 'sel', k))
+        matched_u1 = np.take(u1, sel, axis=1, out=_out(ws, 'mu1', k), mode='clip')
+        matched_u2 = np.compress(matched, u2, axis=1, out=_out(ws, 'mu2', k))
+        pts_g, error = triangulate(matched_u1, matched_u2, cam1, cam2,
+                                   out=_out(ws, 'pts_g', k), error=_out(ws, 'error', k), ws=ws)
+
+    if instrument.enabled:
+        instrument.count("detected", n1 + n2)
+        instrument.count("matched", k)
+        instrument.count("rejected", n2 - k) # cam2 blobs without a partner
 
-    # 5) Return solved points
-    return pts_g
\ No newline at end of file
+    # 5) Return solved points (and per-point ray-gap error if asked)
+    if return_error:
+        return pts_g, error
+    return pts_g
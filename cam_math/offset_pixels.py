@@ -1,16 +1,18 @@
 import numpy as np
+from .cam_class import camera
 
-def offset_pixels(res, px):
+def offset_pixels(res, px, out=None):
     """
     Shifts pixels to screen-center.
     Inputs:
-      res: (width, height)
+      res: (width, height), or a camera (uses its cached center)
       px:  OpenCV points (N, 2)
+      out: optional (2, N) array to write into
     
     Returns:
       (2, N) array centered at (0,0)
     """
-    px = np.array(px)
+    px = np.asarray(px)
     
     # 1) Force Transpose: OpenCV gives (N, 2), we want (2, N)
     # We check if it is NOT (2, N) or simply always transpose if we trust the source.
@@ -19,6 +21,9 @@ def offset_pixels(res, px):
         px = px.T
         
     # 2) Reshape 'res' for broadcasting against (2, N)
-    center_offset = np.array(res).reshape(2, 1) / 2.0
+    if isinstance(res, camera):
+        center_offset = res.center
+    else:
+        center_offset = np.array(res).reshape(2, 1) / 2.0
     
-    return px - center_offset
\ No newline at end of file
+    return np.subtract(px, center_offset, out=out)
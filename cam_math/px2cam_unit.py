@@ -1,30 +1,29 @@
 import numpy as np
 from .cam_class import camera
+from .distortion import lut_lookup
 
-def px2cam_unit(cam: camera, px):
+def px2cam_unit(cam: camera, px, out=None):
     """
     Converts Screen-Centered Pixels (2D) to Unit Vectors in Camera Frame (3D).
     Input `px` must assume (0,0) is the center of the image.
+    Lens distortion (cam.dist) is removed through the camera's per-pixel ray table.
+    out: optional (3, N) array to write into (its dtype sets the precision)
     """
-    # 0) Safety: Ensure inputs are float and res is shaped (2, 1)
-    px = px.astype(np.float64)
-    res = np.array(cam.res, dtype=np.float64).reshape(2, 1)
-    
-    # 2) Calculate Inverse Focal Lengths (Scale Factors)
-    tan_half_fov = np.tan(np.deg2rad(cam.fovh_deg / 2.0))
-    
-    # sp = [1/fx, 1/fy]
-    sp = np.array([
-        [2.0 * tan_half_fov / res[0, 0]],       
-        [2.0 * cam.AR * tan_half_fov / res[1, 0]]   
-    ])
+    # 0) Safety: Ensure inputs are float
+    px = np.asarray(px)
+    if px.dtype.kind != 'f':
+        px = px.astype(np.float64)
 
-    # 3) Apply Scaling to get Normalized Image Coordinates (x/z, y/z)
-    vs_2d = px * sp
+    # 1) Output rays, Z = 1
+    vs = np.empty((3, px.shape[1])) if out is None else out
+    vs[2, :] = 1.0
 
-    # 4) Stack with Z = 1
-    ones = np.ones((1, px.shape[1]))
-    vs = np.vstack((vs_2d, ones)) 
+    # 2) Apply cached inverse focal lengths sp = [1/fx, 1/fy]
+    # to get Normalized Image Coordinates (x/z, y/z)
+    if cam.has_distortion:
+        # Bilinear lookup of the precomputed undistorted rays (no iterating per blob)
+        lut_lookup(cam.undistort_lut, px, cam.center, out=vs[0:2, :])
+    else:
+        np.multiply(px, cam.inv_focal, out=vs[0:2, :])
 
-    # 5) Normalize to Unit Vectors
-    return vs
\ No newline at end of file
+    return vs
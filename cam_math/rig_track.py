@@ -0,0 +1,185 @@
+import numpy as np
+from .offset_pixels import offset_pixels
+from .px2cam_unit import px2cam_unit
+from .cam2px import cam2px
+from .correlate import correlate
+from .triangulate import triangulate
+from .epipolar_assign import gate_match
+from .cam_class import camera
+
+def triangulate_multi(cams: list, rays, obs):
+    """
+    Batched least-squares triangulation of K points from any subset of C cameras.
+    Finds the point minimizing the summed squared perpendicular distance to every
+    contributing ray (for exactly 2 rays this is the `locate` midpoint).
+
+    Inputs:
+      cams: list of C cameras
+      rays: (C, 3, K) camera-frame ray directions (any length; ignored where obs is False)
+      obs:  (C, K) bool, True where camera c sees point k
+
+    Returns:
+      pts_g: (3, K) solved points in the global frame
+      error: (K,) sqrt of the summed squared ray distances (matches `locate` for 2 rays)
+    """
+    rays = np.asarray(rays, dtype=np.float64)
+    obs = np.asarray(obs, dtype=bool)
+    n_pts = rays.shape[2]
+
+    # 1) Stack per-camera DCMs and pinholes, rotate every ray to global and normalize
+    C_cam2g = np.stack([cam.c_cam2g for cam in cams]).astype(np.float64) # (C, 3, 3)
+    O = np.stack([cam.origin_g[:, 0] for cam in cams])                     # (C, 3)
+    d = np.einsum('cij,cjk->cki', C_cam2g, rays)                           # (C, K, 3)
+    d[~obs] = 0.0
+    norm = np.linalg.norm(d, axis=2, keepdims=True)
+    d /= np.where(norm > 0, norm, 1.0)
+
+    # 2) Normal equations: sum_c (I - d d^T) P = sum_c (I - d d^T) o_c
+    w = obs.astype(np.float64)                                              # (C, K)
+    ddT = d[..., :, np.newaxis] * d[..., np.newaxis, :]                     # (C, K, 3, 3)
+    A = np.einsum('ck,ij->kij', w, np.eye(3)) - ddT.sum(axis=0)             # (K, 3, 3)
+    Od = np.einsum('ci,cki->ck', O, d)                                      # (C, K)
+    b = w.T @ O - np.einsum('ck,cki->ki', Od, d)                            # (K, 3)
+
+    # 3) Solve all 3x3 systems at once; degenerate ones (< 2 views, parallel rays) give NaN
+    pts = np.full((n_pts, 3), np.nan)
+    ok = (obs.sum(axis=0) >= 2) & (np.abs(np.linalg.det(A)) > 1e-12)
+    if np.any(ok):
+        pts[ok] = np.linalg.solve(A[ok], b[ok, :, np.newaxis])[..., 0]
+
+    # 4) Per-ray perpendicular distances -> error
+    rel = pts[np.newaxis, :, :] - O[:, np.newaxis, :]                       # (C, K, 3)
+    perp = rel - np.einsum('cki,cki->ck', rel, d)[..., np.newaxis] * d
+    dist2 = np.where(obs, np.einsum('cki,cki->ck', perp, perp), 0.0)
+    error = np.sqrt(dist2.sum(axis=0))
+
+    return pts.T, error
+
+
+def _collect_support(cam: camera, pts_g, det_px, max_dist):
+    """
+    Projects candidate 3D points into `cam` and matches them one-to-one to the
+    free detections there (centered pixels, (2, n)). Returns (K,) detection index or -1.
+    """
+    n_pts = pts_g.shape[1]
+    if det_px.shape[1] == 0 or n_pts == 0:
+        return np.full(n_pts, -1, dtype=np.intp)
+
+    pts_c = cam.c_g2cam @ (pts_g - cam.origin_g)
+    in_front = pts_c[2] > 0
+    pred = np.full((2, n_pts), np.nan)
+    pred[:, in_front] = cam2px(cam, pts_c[:, in_front])
+    return gate_match(pred, det_px, max_dist)
+
+
+"Rig-level tracker: C cameras, C pixel arrays in, 3D points plus who-saw-what out."
+def rig_track(pxs: list, cams: list, max_dist: float = 15.0, method: str = "greedy", min_views: int = 2,
+              seed_span: int = 1):
+    """
+    Multi-view tracker for a rig of any number of cameras.
+
+    Points are seeded from a bounded set of camera pairs: each camera with the
+    next seed_span cameras in the list (seed_span=1 is the ring (0,1), (1,2), ...,
+    (C-1,0)), so list the cameras in order around the rig. Seeds seen by a ring
+    neighbour of their pair as well are committed first, which throws out most
+    epipolar ghosts before they can claim detections; the rest become plain
+    two-view points. Every committed point is then projected once into each
+    camera that doesn't see it yet and snapped to the nearest free detection
+    within max_dist pixels, and finally re-solved from ALL the rays that see it
+    with `triangulate_multi`.
+
+    Cost: C * seed_span epipolar matches plus O(C * seed_span) reprojections per
+    camera of the seeds and one per camera of every point, i.e. linear in the
+    number of cameras (not in the number of camera pairs). Points seen only by
+    two cameras further apart than seed_span are not found.
+
+    Inputs:
+      pxs:  list of C OpenCV pixel arrays (N_c, 2), top-left origin
+      cams: list of C cameras, in order around the rig
+
+    Returns:
+      pts_g: (3, K) global points
+      error: (K,) ray-gap error
+      obs_idx: (C, K) index into pxs[c] of the detection used for each point, -1 if
+               camera c did not contribute
+    """
+    n_cams = len(cams)
+    if n_cams < 2 or len(pxs) != n_cams:
+        raise ValueError("rig_track needs at least 2 cameras and one pixel array per camera")
+
+    # 1) Pixels -> camera-frame rays, plus centered pixels for reprojection gating
+    px_off = [offset_pixels(cam, px) for cam, px in zip(cams, pxs)]
+    u = [px2cam_unit(cam, p) for cam, p in zip(cams, px_off)]
+    free = [np.ones(p.shape[1], dtype=bool) for p in px_off]
+
+    def claim(c, pts_g, block):
+        # Snap points to camera c's free detections; record and take them out of the pool
+        fc = np.flatnonzero(free[c])
+        m = _collect_support(cams[c], pts_g, px_off[c][:, fc], max_dist)
+        block[c, m >= 0] = fc[m[m >= 0]]
+
+    # 2) Seed pairs: every camera with its next seed_span cameras (no duplicates)
+    pairs = []
+    for s in range(1, min(seed_span, n_cams - 1) + 1):
+        for a in range(n_cams):
+            b = (a + s) % n_cams
+            if (b, a) not in pairs:
+                pairs.append((a, b))
+
+    # Pass 1 only keeps seeds a neighbouring camera (just before a or after b)
+    # agrees with. Pass 2 takes what's left as plain two-view points.
+    blocks = []
+    for need in ([3, 2] if n_cams > 2 else [2]):
+        for a, b in pairs:
+            ia, ib = np.flatnonzero(free[a]), np.flatnonzero(free[b])
+            if ia.size == 0 or ib.size == 0:
+                continue
+
+            # 2a) Epipolar match between the two seed views
+            idx = correlate(cams[a], cams[b], u[a][:, ia], u[b][:, ib], max_dist, method)
+            ok = idx >= 0
+            if not np.any(ok):
+                continue
+            block = np.full((n_cams, ok.sum()), -1, dtype=np.intp)
+            block[a], block[b] = ia[idx[ok]], ib[ok]
+
+            # 2b) Confirm in the neighbours (at most two views, whatever the rig size)
+            if need > 2:
+                seeds, _ = triangulate(u[a][:, block[a]], u[b][:, block[b]], cams[a], cams[b])
+                for c in {(a - 1) % n_cams, (b + 1) % n_cams} - {a, b}:
+                    claim(c, seeds, block)
+
+            # 2c) Commit the supported seeds, release the rest
+            block = block[:, (block >= 0).sum(axis=0) >= need]
+            for c in range(n_cams):
+                free[c][block[c][block[c] >= 0]] = False
+            blocks.append(block)
+
+    obs_idx = np.concatenate(blocks, axis=1) if blocks else np.empty((n_cams, 0), dtype=np.intp)
+
+    # 3) Every other camera that sees a point: one reprojection pass per camera
+    if n_cams > 2 and obs_idx.shape[1]:
+        pts_g, _ = _solve(u, cams, obs_idx)
+        for c in range(n_cams):
+            todo = np.flatnonzero(obs_idx[c] < 0)
+            if todo.size == 0 or not free[c].any():
+                continue
+            sub = obs_idx[:, todo]
+            claim(c, pts_g[:, todo], sub)
+            obs_idx[:, todo] = sub
+            free[c][sub[c][sub[c] >= 0]] = False
+
+    obs_idx = obs_idx[:, (obs_idx >= 0).sum(axis=0) >= min_views]
+
+    # 4) Final multi-ray solve over every contributing camera
+    pts_g, error = _solve(u, cams, obs_idx)
+    return pts_g, error, obs_idx
+
+
+def _solve(u, cams, obs_idx):
+    """triangulate_multi of the rays picked by obs_idx (C, K)."""
+    obs = obs_idx >= 0
+    rays = np.zeros((len(cams), 3, obs_idx.shape[1]))
+    for c in range(len(cams)):
+        rays[c][:, obs[c]] = u[c][:, obs_idx[c, obs[c]]]
+    return triangulate_multi(cams, rays, obs)
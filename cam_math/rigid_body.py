@@ -0,0 +1,213 @@
+from collections import namedtuple
+import numpy as np
+from numpy.typing import NDArray
+
+# One solved body. Same convention as the cameras: a point p_b in the body frame
+# sits at c_body2g @ p_b + r_o2body_g in the global frame.
+#   c_body2g (3, 3), r_o2body_g (3, 1), rms (fit residual, global units),
+#   idx (M,) column of pts_g used for each marker, -1 = not seen
+body_pose = namedtuple('body_pose', 'name c_body2g r_o2body_g rms idx')
+
+
+def kabsch(pts_b: NDArray, pts_g: NDArray, weights: NDArray = None):
+    """
+    Batched least-squares rigid fit (Kabsch / SVD): the rotation and translation
+    taking body-frame markers onto their measured global positions.
+
+    Inputs:
+      pts_b:   (..., 3, M) marker positions in the body frame
+      pts_g:   (..., 3, M) measured global positions (NaN = not seen)
+      weights: (..., M) optional per-marker weights (0 = ignore)
+    Any leading dimensions are fitted independently, in one go.
+
+    Returns:
+      c_body2g:   (..., 3, 3) column DCM rotating body -> global
+      r_o2body_g: (..., 3, 1) body origin in the global frame
+      rms:        (...) RMS marker residual (NaN where fewer than 3 markers were used)
+    """
+    pts_b = np.asarray(pts_b, dtype=np.float64)
+    pts_g = np.asarray(pts_g, dtype=np.float64)
+    shape = np.broadcast_shapes(pts_b.shape, pts_g.shape)
+    pts_b, pts_g = np.broadcast_to(pts_b, shape), np.broadcast_to(pts_g, shape)
+    w = np.ones(shape[:-2] + shape[-1:]) if weights is None else np.broadcast_to(weights, shape[:-2] + shape[-1:])
+    w = np.where(np.all(np.isfinite(pts_g), axis=-2), w, 0.0)
+    pts_g = np.nan_to_num(pts_g)
+
+    # 1) Weighted centroids
+    n = w.sum(axis=-1)
+    w_n = (w / np.maximum(n, 1e-300)[..., None])[..., None, :]
+    cb = np.sum(pts_b * w_n, axis=-1, keepdims=True)
+    cg = np.sum(pts_g * w_n, axis=-1, keepdims=True)
+
+    # 2) Cross-covariance and its SVD; flip the last axis if that would be a reflection
+    H = (pts_b - cb) * w[..., None, :] @ np.swapaxes(pts_g - cg, -1, -2)
+    U, _, Vt = np.linalg.svd(H)
+    V = np.swapaxes(Vt, -1, -2)
+    d = np.sign(np.linalg.det(V @ np.swapaxes(U, -1, -2)))
+    V[..., :, 2] *= np.where(d == 0, 1.0, d)[..., None]
+    c_body2g = V @ np.swapaxes(U, -1, -2)
+    r_o2body_g = cg - c_body2g @ cb
+
+    # 3) Residual
+    resid = c_body2g @ pts_b + r_o2body_g - pts_g
+    rms = np.sqrt(np.sum(w * np.sum(resid ** 2, axis=-2), axis=-1) / np.maximum(n, 1e-300))
+    rms = np.where(np.count_nonzero(w, axis=-1) >= 3, rms, np.nan)
+    return c_body2g, r_o2body_g, rms
+
+
+class rigid_bodies:
+    """
+    Finds known marker constellations (rigid tools, wands, calibration targets)
+    in the unlabeled points multi_track / rig_track return, and solves each one's
+    6-DoF pose.
+
+    Distances between markers don't change with pose, so every body is stored as
+    its (M, M) pairwise-distance signature. To find a body in a frame:
+      1) compute the frame's (K, K) distance matrix once
+      2) every point pair whose distance matches some marker pair's distance
+         (within tol) is a hypothesis for those two markers
+      3) each hypothesis places every other marker at the point whose distances
+         to the two seeds match the signature (all hypotheses at once)
+      4) every complete-enough hypothesis gets a Kabsch fit (batched); the one
+         with the most markers, then the lowest RMS, wins if its RMS <= tol
+    Points used by one body are not offered to the next (registration order).
+
+    Markers may be occluded: a body is reported as long as min_markers of them
+    (at least 3) are found. Constellations whose distances are all distinct by
+    more than a few tol identify unambiguously.
+
+    Parameters:
+    - tol (float): distance / fit tolerance (global units)
+    - min_markers (int): markers needed to report a body
+    """
+
+    def __init__(self, tol: float = 0.005, min_markers: int = 3):
+        self.tol = tol
+        self.min_markers = max(int(min_markers), 3)
+        self.names = []
+        self.pts_b = [] # (3, M) body-frame markers per body
+        self._dist = [] # (M, M) pairwise-distance signature per body
+        self._seeds = [] # (P, 2) marker pairs, most distinctive distance first
+
+    def register(self, name: str, pts_b: NDArray):
+        """
+        Adds a constellation: pts_b (3, M) marker positions in the body's own frame
+        (M >= 3; e.g. localize.GROUND_TRUTH_POINTS.T). The pose reported later is
+        that frame's.
+        """
+        pts_b = np.asarray(pts_b, dtype=np.float64)
+        if pts_b.ndim != 2 or pts_b.shape[0] != 3 or pts_b.shape[1] < 3:
+            raise ValueError("pts_b must be (3, M) with M >= 3 markers")
+        if name in self.names:
+            raise ValueError(f"A body named {name!r} is already registered")
+        dist = np.linalg.norm(pts_b[:, :, None] - pts_b[:, None, :], axis=0)
+
+        # Seeds: marker pairs whose distance is furthest from every other pair's
+        a, b = np.triu_indices(pts_b.shape[1], k=1)
+        d = dist[a, b]
+        gap = np.abs(d[:, None] - d[None, :])
+        np.fill_diagonal(gap, np.inf)
+        order = np.argsort(-gap.min(axis=1), kind='stable')
+
+        self.names.append(name)
+        self.pts_b.append(pts_b)
+        self._dist.append(dist)
+        self._seeds.append(np.column_stack((a[order], b[order])))
+
+    def _find(self, body: int, pts_g, D, free):
+        """Best marker -> column assignment (M,) for one body, and its fit, or None."""
+        B, seeds, tol = self._dist[body], self._seeds[body], self.tol
+        M = B.shape[0]
+
+        # 2) Hypotheses: (marker a, marker b) -> (point i, point j), both orders
+        hyp = []
+        for a, b in seeds:
+            i, j = np.nonzero((np.abs(D - B[a, b]) <= tol) & free[:, None] & free[None, :])
+            if i.size:
+                hyp.append(np.column_stack((np.full(i.size, a), np.full(i.size, b), i, j)))
+        if not hyp:
+            return None
+        a, b, i, j = np.vstack(hyp).T
+
+        # 3) Every other marker c goes to the free point k matching both seed distances best
+        err = np.maximum(np.abs(D[i][:, None, :] - B[a][:, :, None]),
+                         np.abs(D[j][:, None, :] - B[b][:, :, None])) # (H, M, K)
+        err[:, :, ~free] = np.inf
+        k = np.argmin(err, axis=2)
+        ok = np.take_along_axis(err, k[:, :, None], axis=2)[:, :, 0] <= tol
+        h = np.arange(a.size)
+        k[h, a], k[h, b] = i, j
+        ok[h, a] = ok[h, b] = True
+        idx = np.where(ok, k, -1)
+
+        # A point can't be two markers
+        srt = np.sort(np.where(ok, k, -1 - np.arange(M)), axis=1)
+        unique = np.all(srt[:, 1:] != srt[:, :-1], axis=1)
+        n_found = ok.sum(axis=1)
+        keep = unique & (n_found >= self.min_markers)
+        if not np.any(keep):
+            return None
+        idx, ok, n_found = idx[keep], ok[keep], n_found[keep]
+
+        # 4) Fit them all, best = most markers, then lowest RMS
+        meas = np.where(ok[:, None, :], pts_g[:, np.maximum(idx, 0)].transpose(1, 0, 2), np.nan)
+        R, r, rms = kabsch(self.pts_b[body], meas)
+        best = np.lexsort((rms, -n_found))[0]
+        if not rms[best] <= tol:
+            return None
+        return idx[best], R[best], r[best], float(rms[best])
+
+    def solve(self, pts_g: NDArray):
+        """
+        Identifies and solves every registered body in one frame of points (3, K).
+        Returns a list of body_pose, one per body found.
+        """
+        pts_g = np.asarray(pts_g, dtype=np.float64).reshape(3, -1)
+        D = np.linalg.norm(pts_g[:, :, None] - pts_g[:, None, :], axis=0)
+        np.fill_diagonal(D, np.inf)
+        free = np.all(np.isfinite(pts_g), axis=0)
+        poses = []
+        for body, name in enumerate(self.names):
+            found = self._find(body, pts_g, D, free)
+            if found is None:
+                continue
+            idx, R, r, rms = found
+            free[idx[idx >= 0]] = False
+            poses.append(body_pose(name, R, r, rms, idx))
+        return poses
+
+    def solve_batch(self, frames: list):
+        """
+        Poses of every body over a whole recording. frames is a list of (3, K_f)
+        point arrays (K may change per frame).
+
+        Identification runs frame by frame; the fits of every body in every frame
+        then go through one batched kabsch call.
+
+        Returns a dict name -> body_pose whose fields are stacked over the F frames:
+        c_body2g (F, 3, 3), r_o2body_g (F, 3, 1), rms (F,), idx (F, M); NaN / -1
+        where the body was not found.
+        """
+        n_bodies, F = len(self.names), len(frames)
+        m_max = max((p.shape[1] for p in self.pts_b), default=3)
+
+        # 1) Labels, and the measured markers padded to a common M (NaN = missing)
+        idx = [np.full((F, p.shape[1]), -1, dtype=np.int64) for p in self.pts_b]
+        meas = np.full((n_bodies, F, 3, m_max), np.nan)
+        model = np.zeros((n_bodies, 1, 3, m_max))
+        for body, p in enumerate(self.pts_b):
+            model[body, 0, :, :p.shape[1]] = p
+        for f, pts_g in enumerate(frames):
+            pts_g = np.asarray(pts_g, dtype=np.float64).reshape(3, -1)
+            for pose in self.solve(pts_g):
+                body = self.names.index(pose.name)
+                seen = pose.idx >= 0
+                idx[body][f] = pose.idx
+                meas[body, f, :, np.flatnonzero(seen)] = pts_g[:, pose.idx[seen]].T
+
+        # 2) One fit for everything
+        R, r, rms = kabsch(model, meas)
+        lost = np.isnan(rms)
+        R[lost], r[lost] = np.nan, np.nan
+        return {name: body_pose(name, R[body], r[body], rms[body], idx[body])
+                for body, name in enumerate(self.names)}
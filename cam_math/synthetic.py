@@ -0,0 +1,110 @@
+import numpy as np
+from numpy.typing import NDArray
+from .cam_class import camera
+from .cam2px import cam2px
+
+def look_at(pos, target, up=(0.0, 0.0, 1.0)):
+    """
+    c_cam2g DCM for a camera at `pos` looking at `target`
+    (camera +Z forward, +X right, +Y down, like OpenCV).
+    """
+    z = np.asarray(target, dtype=np.float64) - np.asarray(pos, dtype=np.float64)
+    z /= np.linalg.norm(z)
+    x = np.cross(z, up)
+    if np.linalg.norm(x) < 1e-9: # looking straight along `up`
+        x = np.cross(z, (1.0, 0.0, 0.0))
+    x /= np.linalg.norm(x)
+    y = np.cross(z, x)
+    return np.column_stack((x, y, z))
+
+
+def synth_rig(n_cams: int = 2, radius: float = 3.0, height: float = 2.5, target=(0.0, 0.0, 1.0),
+              fovh_deg: float = 70, res=(640, 360), AR: float = 9 / 16, jitter: float = 0.0, rng=None):
+    """
+    n_cams cameras spread evenly on a circle of `radius` at `height`, all looking
+    at `target`. jitter (m) randomly perturbs each position.
+    """
+    rng = np.random.default_rng(rng)
+    cams = []
+    for k in range(n_cams):
+        a = 2 * np.pi * k / n_cams
+        pos = np.array([radius * np.cos(a), radius * np.sin(a), height]) + rng.normal(scale=jitter, size=3)
+        cams.append(camera(pos, look_at(pos, target), fovh_deg, np.array(res), AR))
+    return cams
+
+
+def random_points(n: int, center=(0.0, 0.0, 1.0), half_size: float = 0.5, rng=None):
+    """(3, n) points uniform in a cube of side 2*half_size around center."""
+    rng = np.random.default_rng(rng)
+    return np.asarray(center, dtype=np.float64).reshape(3, 1) + rng.uniform(-half_size, half_size, (3, n))
+
+
+def trajectory_points(n: int, n_frames: int, center=(0.0, 0.0, 1.0), half_size: float = 0.5,
+                      speed: float = 0.5, fps: float = 60.0, rng=None):
+    """
+    (n_frames, 3, n) smooth marker trajectories: each marker circles its own random
+    axis through a random start point at `speed` m/s.
+    """
+    rng = np.random.default_rng(rng)
+    p0 = random_points(n, center, half_size, rng)
+    c = np.asarray(center, dtype=np.float64).reshape(3, 1)
+    axis = rng.normal(size=(3, n))
+    axis /= np.linalg.norm(axis, axis=0)
+    r = p0 - c
+    r_perp = r - np.sum(r * axis, axis=0) * axis
+    rad = np.maximum(np.linalg.norm(r_perp, axis=0), 1e-3)
+    w = speed / rad # rad/s
+
+    # Rodrigues rotation of (p0 - c) about each marker's axis, all frames at once
+    th = w[np.newaxis, :] * (np.arange(n_frames)[:, np.newaxis] / fps) # (F, n)
+    cos, sin = np.cos(th)[:, np.newaxis, :], np.sin(th)[:, np.newaxis, :]
+    kxr = np.cross(axis, r, axis=0)
+    kdr = np.sum(axis * r, axis=0)
+    return c + r * cos + kxr * sin + axis * kdr * (1 - cos)
+
+
+def project_points(cam: camera, pts_g: NDArray):
+    """
+    Projects global points into `cam`.
+    Returns (N, 2) top-left pixels (like OpenCV gives) and an (N,) visibility mask
+    (in front of the camera and inside the sensor).
+    """
+    pts_c = cam.c_g2cam @ (np.asarray(pts_g, dtype=np.float64) - cam.origin_g)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        px = (cam2px(cam, pts_c) + cam.center).T
+    res = np.asarray(cam.res)
+    visible = (pts_c[2] > 0) & np.all((px >= 0) & (px < res), axis=1)
+    return px, visible
+
+
+def synth_detections(cams: list, pts_g: NDArray, noise_px: float = 0.0, p_miss: float = 0.0,
+                     n_false: int = 0, shuffle: bool = True, rng=None):
+    """
+    Simulates one frame of blob detections for every camera.
+
+    noise_px: gaussian pixel noise (std, px)
+    p_miss:   probability each visible marker is not detected
+    n_false:  number of false blobs per camera (uniform over the sensor)
+
+    Returns:
+      pxs:   list of (N_c, 2) float32 top-left pixel arrays (multi_track input)
+      truth: list of (N_c,) index of the true point behind each detection, -1 = false blob
+    """
+    rng = np.random.default_rng(rng)
+    pxs, truth = [], []
+    for cam in cams:
+        px, visible = project_points(cam, pts_g)
+        keep = visible & (rng.random(visible.size) >= p_miss)
+        ids = np.flatnonzero(keep)
+        px = px[ids] + rng.normal(scale=noise_px, size=(ids.size, 2))
+
+        res = np.asarray(cam.res, dtype=np.float64)
+        px = np.vstack((px, rng.uniform(0, 1, (n_false, 2)) * res))
+        ids = np.concatenate((ids, np.full(n_false, -1)))
+
+        if shuffle:
+            order = rng.permutation(ids.size)
+            px, ids = px[order], ids[order]
+        pxs.append(px.astype(np.float32))
+        truth.append(ids)
+    return pxs, truth
@@ -0,0 +1,127 @@
+import numpy as np
+from numpy.typing import NDArray
+from .offset_pixels import offset_pixels
+from .px2cam_unit import px2cam_unit
+from .cam2px import cam2px
+from .correlate import correlate
+from .triangulate import triangulate
+from .epipolar_assign import gate_match
+from .cam_class import camera
+
+class tracker:
+    """
+    Persistent marker tracker on top of the stereo pipeline (multi_track's steps).
+
+    Every live track carries an ID, a position and a velocity (alpha-beta filter,
+    i.e. a steady-state constant-velocity Kalman). Each frame:
+      1) predict every track forward by dt
+      2) project the predictions into both cameras with cam2px
+      3) snap each prediction to the nearest detection within gate_px (per camera)
+      4) tracks hit in BOTH cameras are triangulated straight from those detections
+         (a hit whose ray-gap error exceeds max_error is treated as a miss)
+      5) only the leftover detections go through full epipolar correlation;
+         the points they produce start new tracks. A detection gated by a track
+         stays reserved for it even when the track wasn't confirmed (seen in one
+         camera only, or rejected by max_error), so a coasting track never gets
+         a twin with a new ID
+      6) tracks missed for more than max_missed frames are dropped
+    """
+
+    def __init__(self, cam1: camera, cam2: camera, gate_px: float = 15.0, max_missed: int = 5,
+                 alpha: float = 0.8, beta: float = 0.3, max_dist: float = 15.0, method: str = "greedy",
+                 max_error: float = np.inf):
+        self.cam1 = cam1
+        self.cam2 = cam2
+        self.gate_px = gate_px # reprojection gate around each predicted track (pixels)
+        self.max_missed = max_missed # frames a track may coast before it is dropped
+        self.alpha = alpha # position gain
+        self.beta = beta # velocity gain
+        self.max_dist = max_dist # epipolar gate for new detections (see correlate)
+        self.method = method
+        self.max_error = max_error # ray-gap error above which a gated hit is rejected (global units)
+
+        self.pos = np.empty((3, 0))
+        self.vel = np.empty((3, 0))
+        self.ids = np.empty(0, dtype=np.int64)
+        self.missed = np.empty(0, dtype=np.int64)
+        self._next_id = 0
+        self._t_last = None
+
+    def reset(self):
+        """Drops every track (IDs keep counting up)."""
+        self.pos, self.vel = np.empty((3, 0)), np.empty((3, 0))
+        self.ids, self.missed = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        self._t_last = None
+
+    def predict(self, dt: float = 1.0):
+        """Constant-velocity prediction of every track, (3, T)."""
+        return self.pos + self.vel * dt
+
+    def _project(self, cam: camera, pts_g):
+        pts_c = cam.c_g2cam @ (pts_g - cam.origin_g)
+        px = cam2px(cam, pts_c)
+        px[:, pts_c[2] <= 0] = np.nan # behind the camera -> never matches
+        return px
+
+    def update(self, px1: NDArray, px2: NDArray, t: float = None):
+        """
+        Feeds one frame of OpenCV pixels (N, 2) from each camera.
+        t is the frame timestamp in seconds (if None, dt = 1 frame).
+
+        Returns:
+          pts_g: (3, K) points solved this frame
+          ids:   (K,) track ID of each point
+          error: (K,) ray-gap error of each point
+        """
+        dt = 1.0 if t is None or self._t_last is None else max(t - self._t_last, 1e-6)
+        self._t_last = t
+
+        # 1) Rays and centered pixels for both cameras
+        px1_off, px2_off = offset_pixels(self.cam1, px1), offset_pixels(self.cam2, px2)
+        u1, u2 = px2cam_unit(self.cam1, px1_off), px2cam_unit(self.cam2, px2_off)
+
+        # 2) Predict + gate existing tracks in each camera
+        pred = self.predict(dt)
+        m1 = gate_match(self._project(self.cam1, pred), px1_off, self.gate_px)
+        m2 = gate_match(self._project(self.cam2, pred), px2_off, self.gate_px)
+        hit = (m1 >= 0) & (m2 >= 0)
+
+        # 3) Tracked points: triangulate straight from the gated detections.
+        # A wrong snap in one camera (markers crossing in the image) shows up as a big ray gap.
+        pts_trk, err_trk = triangulate(u1[:, m1[hit]], u2[:, m2[hit]], self.cam1, self.cam2)
+        good = err_trk <= self.max_error
+        hit[np.flatnonzero(hit)[~good]] = False
+        pts_trk, err_trk = pts_trk[:, good], err_trk[good]
+
+        # 4) Alpha-beta update for hits, coast the misses
+        resid = pts_trk - pred[:, hit]
+        self.pos = pred
+        self.pos[:, hit] += self.alpha * resid
+        self.vel[:, hit] += (self.beta / dt) * resid
+        self.missed[hit] = 0
+        self.missed[~hit] += 1
+
+        # 5) Full epipolar correlation only for the detections no track gated
+        # (hit or not: a half-seen marker must not restart under a new ID)
+        free1 = np.ones(u1.shape[1], dtype=bool)
+        free2 = np.ones(u2.shape[1], dtype=bool)
+        free1[m1[m1 >= 0]] = False
+        free2[m2[m2 >= 0]] = False
+        i1, i2 = np.flatnonzero(free1), np.flatnonzero(free2)
+        pts_new, err_new = np.empty((3, 0)), np.empty(0)
+        if i1.size and i2.size:
+            idx = correlate(self.cam1, self.cam2, u1[:, i1], u2[:, i2], self.max_dist, self.method)
+            ok = idx >= 0
+            pts_new, err_new = triangulate(u1[:, i1[idx[ok]]], u2[:, i2[ok]], self.cam1, self.cam2)
+        ids_new = np.arange(self._next_id, self._next_id + pts_new.shape[1], dtype=np.int64)
+        self._next_id += pts_new.shape[1]
+
+        # 6) Drop stale tracks, start new ones
+        ids_trk = self.ids[hit]
+        keep = self.missed <= self.max_missed
+        self.pos = np.hstack((self.pos[:, keep], pts_new))
+        self.vel = np.hstack((self.vel[:, keep], np.zeros_like(pts_new)))
+        self.ids = np.concatenate((self.ids[keep], ids_new))
+        self.missed = np.concatenate((self.missed[keep], np.zeros(ids_new.size, dtype=np.int64)))
+
+        return np.hstack((pts_trk, pts_new)), np.concatenate((ids_trk, ids_new)), np.concatenate((err_trk, err_new))
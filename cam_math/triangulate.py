@@ -0,0 +1,83 @@
+import numpy as np
+from .cam_class import camera
+
+def triangulate(v1, v2, cam1: camera, cam2: camera, out=None, error=None, ws=None):
+    """
+    Batched closest-approach triangulation of N ray pairs.
+    v1, v2 are camera-frame ray directions, shape (3, N) (need not be unit length).
+
+    Solves the same least-squares problem as `locate` for every column at once:
+        P - t1*v1_g = r_cam1,  P - t2*v2_g = r_cam2
+    The answer is the midpoint of the two closest points on the rays.
+
+    out / error: optional (3, N) / (N,) arrays to write the results into
+    ws:          optional workspace providing the scratch buffers
+
+    Returns:
+      pts_g: (3, N) solved points in the global frame
+      error: (N,) least-squares residual norm (ray gap / sqrt(2)), same as `locate`
+    """
+    v1 = np.asarray(v1)
+    v2 = np.asarray(v2)
+    if v1.dtype.kind != 'f': v1 = v1.astype(np.float64)
+    if v2.dtype.kind != 'f': v2 = v2.astype(np.float64)
+    if v1.ndim == 1: v1 = v1[:, np.newaxis]
+    if v2.ndim == 1: v2 = v2[:, np.newaxis]
+    n = v1.shape[1]
+
+    # 0) Scratch: two ray sets, nine per-ray scalars, one mask
+    if ws is None:
+        vec, scl, parallel = np.empty((2, 3, n)), np.empty((9, n)), np.empty(n, bool)
+    else:
+        ws.reserve(n)
+        vec, scl, parallel = ws.tri_vec[:, :, :n], ws.tri_scl[:, :n], ws.tri_mask[:n]
+    a, b, c, d, e, denom, t1, t2, tmp = scl
+    if out is None: out = np.empty((3, n), vec.dtype)
+    if error is None: error = np.empty(n, vec.dtype)
+
+    # 1) Rotate rays into the global frame, grab pinholes as (3, 1)
+    d1 = np.matmul(cam1.c_cam2g, v1, out=vec[0])
+    d2 = np.matmul(cam2.c_cam2g, v2, out=vec[1])
+    o1 = cam1.origin_g
+    o2 = cam2.origin_g
+    w0 = (o1 - o2)[:, 0]
+
+    # 2) Dot products for the 2x2 normal equations (one per column)
+    np.einsum('ij,ij->j', d1, d1, out=a)
+    np.einsum('ij,ij->j', d1, d2, out=b)
+    np.einsum('ij,ij->j', d2, d2, out=c)
+    np.matmul(w0, d1, out=d)
+    np.matmul(w0, d2, out=e)
+    np.multiply(a, c, out=denom)
+    denom -= np.multiply(b, b, out=tmp)
+
+    # 3) Ray parameters. Parallel rays have no unique answer, so pin t1 = 0
+    # and drop cam1's pinhole onto ray 2 instead.
+    np.multiply(a, c, out=tmp)
+    tmp *= 1e-12
+    np.less_equal(np.abs(denom, out=t1), tmp, out=parallel)
+    np.copyto(denom, 1.0, where=parallel)
+
+    np.multiply(b, e, out=t1)
+    t1 -= np.multiply(c, d, out=tmp)
+    t1 /= denom
+    np.copyto(t1, 0.0, where=parallel)
+
+    np.multiply(a, e, out=t2)
+    t2 -= np.multiply(b, d, out=tmp)
+    t2 /= denom
+    np.divide(e, c, out=t2, where=parallel)
+
+    # 4) Closest points on each ray (in place over the rays), midpoint, and gap
+    p1 = np.multiply(d1, t1, out=d1)
+    p1 += o1
+    p2 = np.multiply(d2, t2, out=d2)
+    p2 += o2
+    np.add(p1, p2, out=out)
+    out *= 0.5
+    gap = np.subtract(p1, p2, out=p1)
+    np.einsum('ij,ij->j', gap, gap, out=error)
+    np.sqrt(error, out=error)
+    error *= 1 / np.sqrt(2.0)
+
+    return out, error
@@ -0,0 +1,63 @@
+import numpy as np
+
+class workspace:
+    """
+    Preallocated buffers for the multi_track chain, sized for `max_markers`
+    detections per camera. Pass one to multi_track(..., ws=ws) and every stage
+    writes into slices of these arrays instead of allocating its own, so a steady
+    loop makes no per-marker allocations.
+
+    dtype=np.float32 runs the chain in single precision (half the memory traffic;
+    points come out within ~1e-6 m of float64, far below webcam pixel noise).
+
+    correlate's candidate search still allocates in proportion to the number of
+    epipolar candidates it finds; everything sized by the marker count is reused.
+
+    NOTE: results returned through a workspace are views into it. They are
+    overwritten by the next call, so copy them if you need to keep them.
+    """
+
+    def __init__(self, max_markers: int = 256, dtype=np.float64):
+        self.dtype = np.dtype(dtype)
+        self.max_markers = 0
+        self.reserve(max_markers)
+
+    def reserve(self, n: int):
+        """Makes sure the buffers hold n markers (grows once, never shrinks)."""
+        if n <= self.max_markers:
+            return
+        n = max(n, 2 * self.max_markers)
+        f = self.dtype
+        self.max_markers = n
+
+        # offset_pixels / px2cam_unit
+        self.px1 = np.empty((2, n), f)
+        self.px2 = np.empty((2, n), f)
+        self.u1 = np.empty((3, n), f)
+        self.u2 = np.empty((3, n), f)
+
+        # correlate: cam1 rays in cam2's frame and both pixel sets in cam2
+        self.pts1_cam2 = np.empty((3, n), f)
+        self.px1_cam2 = np.empty((2, n), f)
+        self.px2_cam2 = np.empty((2, n), f)
+        self.idx = np.empty(n, np.intp)
+        self.matched = np.empty(n, bool)
+
+        # matched rays
+        self.sel = np.empty(n, np.intp)
+        self.mu1 = np.empty((3, n), f)
+        self.mu2 = np.empty((3, n), f)
+
+        # triangulate scratch (two ray sets, nine per-ray scalars, parallel mask) and outputs
+        self.tri_vec = np.empty((2, 3, n), f)
+        self.tri_scl = np.empty((9, n), f)
+        self.tri_mask = np.empty(n, bool)
+        self.pts_g = np.empty((3, n), f)
+        self.error = np.empty(n, f)
+
+
+def _out(ws, name, n):
+    """Slice of workspace buffer `name` for n markers, or None without a workspace."""
+    if ws is None:
+        return None
+    return getattr(ws, name)[..., :n]
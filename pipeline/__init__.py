@@ -0,0 +1,8 @@
+from .drop_queue import drop_queue
+from .capture import capture_pipeline, fake_capture, tracked_frame
+from .detlog import detlog_writer, detlog_reader
+from .publish import shm_publisher, shm_reader, udp_publisher, udp_reader, published_frame
+from .offline import process_recording
+from .sync import temporal_sync
+from .aio import async_tracker
+from .frame_pool import frame_pool, pooled_frame
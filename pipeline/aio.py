@@ -0,0 +1,133 @@
+import asyncio
+import threading
+from .capture import capture_pipeline
+
+_POLICIES = ("latest", "bounded", "block")
+
+
+class async_tracker:
+    """
+    asyncio front end to capture_pipeline, for hosting the tracker in the same
+    event loop as network I/O:
+
+        async with async_tracker([lambda: cv2.VideoCapture(0), lambda: cv2.VideoCapture(1)],
+                                 [cam1, cam2]) as trk:
+            async for result in trk: # tracked_frame: t, stamps, seqs, pxs, pts_g, ids, frames
+                ...
+
+    Nothing blocking ever runs on the loop: opening the sources and shutting
+    down go through the default executor, and capture / detection / solving run
+    on the pipeline's own worker threads. Each solved frame is handed to the loop
+    with call_soon_threadsafe the moment it exists (no polling), so an idle loop
+    picks it up immediately.
+
+    What happens when the consumer falls behind is the `policy`:
+      "latest":  only the newest frame is kept (older unread ones are dropped)
+      "bounded": up to maxsize frames are kept, the oldest dropped when full
+      "block":   up to maxsize frames, then the solver waits for the consumer
+                 (the pipeline's drop queues then shed camera frames upstream,
+                 so capture itself never stalls)
+    `dropped` counts what the first two threw away.
+
+    With pool_size and keep_frames (see capture_pipeline), pass every result
+    back with recycle() once done with its frames.
+
+    Parameters:
+    - sources (list): capture objects, or zero-argument callables that open one
+                      (called in the executor on entry); released on exit
+    - cams (list): camera objects
+    - policy (str): see above
+    - maxsize (int): buffer length for "bounded" and "block"
+    - **pipeline_kwargs: passed on to capture_pipeline (detect, solve, sync, ...)
+    """
+
+    def __init__(self, sources: list, cams: list, policy: str = "latest", maxsize: int = 8, **pipeline_kwargs):
+        if policy not in _POLICIES:
+            raise ValueError(f"policy must be one of {_POLICIES}, not {policy!r}")
+        self.sources = sources
+        self.cams = cams
+        self.policy = policy
+        self.maxsize = 1 if policy == "latest" else maxsize
+        self.pipeline_kwargs = pipeline_kwargs
+        self.pipeline = None
+        self.dropped = 0
+
+        self._loop = None
+        self._queue = None
+        self._slots = threading.Semaphore(self.maxsize) # "block": free buffer places
+        self._closing = threading.Event()
+
+    # --- solver thread side ---
+    def _on_result(self, result):
+        if self.policy == "block":
+            while not self._slots.acquire(timeout=0.05):
+                if self._closing.is_set():
+                    return
+        try:
+            self._loop.call_soon_threadsafe(self._deliver, result)
+        except RuntimeError: # loop already closed
+            pass
+
+    # --- loop side ---
+    def _deliver(self, result):
+        if self._queue.full(): # latest / bounded: make room by dropping the oldest
+            self.pipeline.recycle(self._queue.get_nowait())
+            self.dropped += 1
+        self._queue.put_nowait(result)
+
+    async def start(self):
+        """Opens the sources (in the executor) and starts the pipeline."""
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(self.maxsize)
+        self._slots = threading.Semaphore(self.maxsize)
+        self._closing.clear()
+
+        async def _open(src):
+            return await self._loop.run_in_executor(None, src) if callable(src) else src
+        sources = await asyncio.gather(*map(_open, self.sources))
+
+        self.pipeline = capture_pipeline(list(sources), self.cams, on_result=self._on_result, **self.pipeline_kwargs)
+        self.pipeline.start()
+        return self
+
+    async def close(self):
+        """Stops the pipeline and releases the sources (in the executor)."""
+        self._closing.set()
+        if self.pipeline is not None:
+            await self._loop.run_in_executor(None, self.pipeline.release)
+
+    async def get(self, timeout: float = None):
+        """Next tracked_frame, or None after `timeout` seconds."""
+        try:
+            result = await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if self.policy == "block":
+            self._slots.release()
+        return result
+
+    def recycle(self, result):
+        """Hands a result's pooled frames back (see capture_pipeline.recycle)."""
+        self.pipeline.recycle(result)
+
+    @property
+    def sources_alive(self):
+        return self.pipeline is not None and self.pipeline.sources_alive
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        """Ends once every source has stopped and nothing is left to hand out."""
+        while True:
+            result = await self.get(timeout=0.1)
+            if result is not None:
+                return result
+            if not self.sources_alive:
+                raise StopAsyncIteration
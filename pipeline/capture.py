@@ -0,0 +1,333 @@
+import time
+import threading
+from collections import namedtuple
+import numpy as np
+from cam_math import multi_track, rig_track, instrument
+from vision_tools import detect_blobs
+from .drop_queue import drop_queue
+from .sync import temporal_sync
+from .frame_pool import frame_pool, retain_frame, release_frame
+
+# One camera's frame after detection
+detection = namedtuple('detection', 'cam t seq px frame')
+
+# One solved, time-paired set of frames (one entry per camera). seqs are the
+# frames' numbers per camera (gaps = frames dropped on the way), ids whatever IDs
+# the solve gave the points (None for plain multi_track). With a frame pool,
+# buffers holds the pooled frames behind `frames` (see capture_pipeline.recycle).
+tracked_frame = namedtuple('tracked_frame', 't stamps seqs pxs pts_g ids frames buffers', defaults=(None,))
+
+
+class fake_capture:
+    """
+    Stand-in for cv2.VideoCapture that replays frames from memory, so the
+    pipeline can be exercised without hardware.
+
+    frames: list of images, or a callable i -> image (None = end of stream)
+    fps:    if set, read() paces itself to this rate like a real camera
+    loop:   restart from frame 0 at the end of a list
+    """
+
+    def __init__(self, frames, fps: float = None, loop: bool = False):
+        self.frames = frames
+        self.fps = fps
+        self.loop = loop
+        self._i = 0
+        self._t_next = None
+        self._open = True
+
+    def isOpened(self):
+        return self._open
+
+    def read(self, image=None):
+        if not self._open:
+            return False, None
+        if self.fps:
+            now = time.monotonic()
+            if self._t_next is None:
+                self._t_next = now
+            if self._t_next > now:
+                time.sleep(self._t_next - now)
+            self._t_next += 1.0 / self.fps
+
+        if callable(self.frames):
+            frame = self.frames(self._i)
+        else:
+            if self._i >= len(self.frames):
+                if not self.loop or len(self.frames) == 0:
+                    return False, None
+                self._i = 0
+            frame = self.frames[self._i]
+        self._i += 1
+        if frame is None:
+            return False, None
+        if image is not None and image.shape == frame.shape:
+            image[...] = frame
+            return True, image
+        return True, frame.copy()
+
+    def release(self):
+        self._open = False
+
+
+def _default_solve(pxs, cams):
+    if len(cams) == 2:
+        return multi_track(pxs[0], pxs[1], cams[0], cams[1])
+    return rig_track(pxs, cams)[0]
+
+
+class capture_pipeline:
+    """
+    Threaded capture -> detect -> pair -> solve pipeline.
+
+      - one capture thread per source, stamping each frame with time.monotonic()
+        the moment read() returns
+      - a pool of detection workers (OpenCV releases the GIL, so threads scale)
+      - cross-camera alignment, either
+          sync="nearest": nearest-timestamp pairing (max_skew seconds apart at most)
+          sync="interp":  every frame of ref_cam, with the other cameras' detections
+                          interpolated to its capture time (temporal_sync), for
+                          unsynced cameras running at their own rates
+      - a solver thread running multi_track (2 cameras) or rig_track (more), or
+        your solve(pxs, cams) -> pts_g or (pts_g, ids). Solvers that follow
+        markers through time (blink_tracker) need to know about dropped frames:
+        with solve_seqs they are called solve(pxs, cams, seqs) instead, seqs
+        being every camera's frame number (in interp mode, the reference frame's)
+
+    Every hand-off is a bounded drop-oldest queue, so a slow stage sheds stale
+    frames instead of building latency. Call get() for results.
+
+    With pool_size > 0 every camera gets a frame_pool: frames are read into
+    reused buffers and converted into reused gray images on the capture thread,
+    and detect gets that gray view (so it must accept single-channel frames,
+    detect_blobs does). detect may also be a list with one function per camera,
+    for per-camera state (an auto_threshold each, say). Dropped and finished frames go back to the pool by
+    themselves; with keep_frames the result's frames are views of pooled buffers,
+    valid until you hand the result back with recycle(result). Size the pool for
+    the frames in flight: queued, being detected, held by you, and in interp mode
+    with keep_frames the 4 per camera the interpolation history holds.
+
+    In interp mode a reference frame is solved as soon as every other camera has
+    a frame at or after its time, or after max_wait seconds by extrapolating
+    their last two frames, so one stalled camera never holds the others up.
+    """
+
+    def __init__(self, sources: list, cams: list, detect=detect_blobs, solve=_default_solve,
+                 n_workers: int = 2, queue_len: int = 2, max_skew: float = 1 / 120, keep_frames: bool = False,
+                 sync: str = "nearest", ref_cam: int = 0, max_wait: float = 0.05, max_motion: float = 40.0,
+                 on_result=None, pool_size: int = 0, solve_seqs: bool = False):
+        if sync not in ("nearest", "interp"):
+            raise ValueError(f"sync must be 'nearest' or 'interp', not {sync!r}")
+        self.sources = sources # cv2.VideoCapture-like objects (read/release)
+        self.cams = cams
+        self.detect = detect # frame -> (N, 2) pixels, or a list of them (one per camera)
+        self.solve = solve # (pxs, cams[, seqs]) -> (3, K) points, or (points, (K,) ids)
+        self.solve_seqs = solve_seqs # pass the frame numbers to solve
+        self.n_workers = n_workers
+        self.max_skew = max_skew
+        self.keep_frames = keep_frames # pass frames through to the result (for drawing)
+        self.sync = sync
+        self.ref_cam = ref_cam # interp: the camera whose frames set the output times
+        self.max_wait = max_wait # interp: s to wait for the others before extrapolating
+        self.max_motion = max_motion # interp: px a marker may move between two frames
+        self.on_result = on_result # called from the solver thread with each tracked_frame, instead of get()
+
+        n_cams = len(sources)
+        self._detects = list(detect) if isinstance(detect, (list, tuple)) else [detect] * n_cams
+        if len(self._detects) != n_cams:
+            raise ValueError(f"{len(self._detects)} detect functions for {n_cams} sources")
+        self.pools = [frame_pool(pool_size) for _ in sources] if pool_size > 0 else None
+        self.frame_q = drop_queue(queue_len * n_cams, on_drop=lambda item: release_frame(item[3]))
+        self.det_q = drop_queue(4 * queue_len * n_cams, on_drop=lambda d: release_frame(d.frame))
+        self.out_q = drop_queue(queue_len, on_drop=self.recycle)
+        self.unpaired = 0 # detections that never found partners within max_skew (or max_wait)
+
+        self._stop = threading.Event()
+        self._threads = []
+        self._live_sources = 0
+        self._lock = threading.Lock()
+
+    # --- stages ---
+    def _capture(self, cam_idx, src):
+        seq = 0
+        while not self._stop.is_set():
+            with instrument.stage(f"capture{cam_idx}"):
+                ret, frame = src.read() if self.pools is None else self.pools[cam_idx].read(src)
+            t = time.monotonic()
+            if not ret:
+                break
+            self.frame_q.put((cam_idx, t, seq, frame))
+            seq += 1
+        with self._lock:
+            self._live_sources -= 1
+
+    def _detect(self):
+        while not self._stop.is_set():
+            item = self.frame_q.get(timeout=0.05)
+            if item is None:
+                continue
+            cam_idx, t, seq, frame = item
+            with instrument.stage("detect"):
+                px = self._detects[cam_idx](frame if self.pools is None else frame.gray)
+            if not self.keep_frames:
+                release_frame(frame)
+                frame = None
+            self.det_q.put(detection(cam_idx, t, seq, px, frame))
+
+    def _pop_set(self, bufs):
+        """Pulls one time-aligned set (one detection per camera) out of bufs, or None."""
+        while all(bufs):
+            t_ref = max(b[0].t for b in bufs)
+            for b in bufs:
+                # Skip ahead to the entry nearest t_ref
+                while len(b) > 1 and abs(b[1].t - t_ref) <= abs(b[0].t - t_ref):
+                    release_frame(b.pop(0).frame)
+                    self.unpaired += 1
+            if all(abs(b[0].t - t_ref) <= self.max_skew for b in bufs):
+                return [b.pop(0) for b in bufs]
+            # The oldest head is too old for anything still to come: drop it
+            oldest = min(range(len(bufs)), key=lambda c: bufs[c][0].t)
+            release_frame(bufs[oldest].pop(0).frame)
+            self.unpaired += 1
+        return None
+
+    def _emit(self, t, stamps, seqs, pxs, frames):
+        """Solves and hands out one set; takes over one reference to each pooled frame."""
+        with instrument.stage("solve"):
+            out = self.solve(pxs, self.cams, seqs) if self.solve_seqs else self.solve(pxs, self.cams)
+        pts_g, ids = out if isinstance(out, tuple) else (out, None)
+        buffers = None
+        if not self.keep_frames:
+            frames = None
+        elif self.pools is not None:
+            buffers, frames = frames, [f.image for f in frames]
+        result = tracked_frame(t, stamps, seqs, pxs, pts_g, ids, frames, buffers)
+        if self.on_result is not None:
+            self.on_result(result)
+        else:
+            self.out_q.put(result)
+        instrument.tick()
+
+    def _pair_and_solve(self):
+        bufs = [[] for _ in self.sources]
+        while not self._stop.is_set():
+            item = self.det_q.get(timeout=0.05)
+            if item is None:
+                continue
+
+            # Workers can finish out of order: keep each buffer sorted by time, short
+            b = bufs[item.cam]
+            i = len(b)
+            while i > 0 and b[i - 1].t > item.t:
+                i -= 1
+            b.insert(i, item)
+            if len(b) > 8:
+                release_frame(b.pop(0).frame)
+                self.unpaired += 1
+
+            dets = self._pop_set(bufs)
+            if dets is None:
+                continue
+            stamps = np.array([d.t for d in dets])
+            seqs = np.array([d.seq for d in dets])
+            self._emit(float(stamps.mean()), stamps, seqs, [d.px for d in dets], [d.frame for d in dets])
+
+        for b in bufs: # stopped: hand back whatever never got paired
+            for d in b:
+                release_frame(d.frame)
+
+    def _interp_and_solve(self):
+        n_cams = len(self.sources)
+        hist = temporal_sync(n_cams, max_motion=self.max_motion, max_extrapolate=self.max_wait,
+                             on_evict=lambda s: release_frame(s.frame))
+        pending = [] # reference frames waiting for the other cameras, oldest first
+        while not self._stop.is_set():
+            item = self.det_q.get(timeout=0.05)
+            if item is not None:
+                hist.add(item.cam, item.t, item.px, item.frame)
+                if item.cam == self.ref_cam:
+                    i = len(pending)
+                    while i > 0 and pending[i - 1].t > item.t:
+                        i -= 1
+                    pending.insert(i, item)
+                    retain_frame(item.frame) # one reference for the history, one for pending
+
+            # 1) Solve every reference frame the others have caught up with (or given up on)
+            now = time.monotonic()
+            while pending:
+                ref = pending[0]
+                newest = [hist.newest(c) for c in range(n_cams) if c != self.ref_cam]
+                caught_up = all(t is not None and t >= ref.t for t in newest)
+                if not caught_up and now - ref.t < self.max_wait:
+                    break
+                pending.pop(0)
+
+                # 2) Everyone's detections at the reference time
+                pxs = [ref.px if c == self.ref_cam else hist.at(c, ref.t) for c in range(n_cams)]
+                if any(p is None for p in pxs):
+                    release_frame(ref.frame)
+                    self.unpaired += 1
+                    continue
+                frames = [ref.frame if c == self.ref_cam else retain_frame(hist.nearest(c, ref.t).frame)
+                          for c in range(n_cams)] if self.keep_frames else None
+                self._emit(ref.t, np.full(n_cams, ref.t), np.full(n_cams, ref.seq), pxs, frames)
+
+        for ref in pending: # stopped: hand back the waiting frames and the history
+            release_frame(ref.frame)
+        hist.clear()
+
+    # --- control ---
+    def start(self):
+        for cam in self.cams: # build the lookup tables here, not on the first live frame
+            cam.warm()
+        self._stop.clear()
+        self._live_sources = len(self.sources)
+        self._threads = [threading.Thread(target=self._capture, args=(i, s), daemon=True)
+                         for i, s in enumerate(self.sources)]
+        self._threads += [threading.Thread(target=self._detect, daemon=True) for _ in range(self.n_workers)]
+        solver = self._interp_and_solve if self.sync == "interp" else self._pair_and_solve
+        self._threads.append(threading.Thread(target=solver, daemon=True))
+        for th in self._threads:
+            th.start()
+        return self
+
+    def recycle(self, result: tracked_frame):
+        """
+        Hands a result's pooled frames back (pool_size > 0 with keep_frames).
+        Don't touch result.frames afterwards. Harmless without a pool.
+        """
+        for buf in result.buffers or ():
+            buf.release()
+
+    def stop(self):
+        """
+        Stops every thread. Frames still queued or held for pairing go back to
+        their pools; results already waiting in get() stay there.
+        """
+        self._stop.set()
+        for th in self._threads:
+            th.join(timeout=1.0)
+        self._threads = []
+        self.frame_q.clear()
+        self.det_q.clear()
+
+    def release(self):
+        """Stops the pipeline and releases every source."""
+        self.stop()
+        for s in self.sources:
+            s.release()
+
+    @property
+    def sources_alive(self):
+        """True while at least one capture thread is still getting frames."""
+        return self._live_sources > 0
+
+    def get(self, timeout: float = None):
+        """Next tracked_frame (oldest first), or None after `timeout` seconds."""
+        return self.out_q.get(timeout)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.release()
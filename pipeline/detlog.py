@@ -0,0 +1,236 @@
+"""
+Detection log: compact, append-only binary recording of per-frame detections.
+
+<name>.ctlog
+  header:  b'CTDLOG01' | u32 n_cams | u32 n_dist | n_cams x (16 + n_dist) f64 camera block
+           camera block = r_o2cam_g(3) c_cam2g(9, row-major) fovh_deg res(2) AR dist(n_dist)
+           (n_dist is 0 when no camera has lens distortion, else 5: k1 k2 p1 p2 k3)
+  records: f64 t | n_cams x u32 count | count_c x (f32 x, f32 y) per camera | pad to 8 bytes
+
+<name>.ctlog.idx (sidecar, rebuilt by detlog_writer if missing or short; readers
+                  index what it lacks in memory)
+  records: f64 t | i64 byte offset of the record in the log
+
+Everything is little-endian. Pixels are the OpenCV (N, 2) top-left pixels multi_track takes.
+"""
+import os
+import struct
+import numpy as np
+from cam_math import camera, multi_track
+
+MAGIC = b'CTDLOG01'
+_CAM_F64 = 16 # camera block without distortion
+_N_DIST = 5
+_IDX_DTYPE = np.dtype([('t', '<f8'), ('offset', '<i8')])
+
+
+def _header_size(n_cams, n_dist=0):
+    return 16 + n_cams * (_CAM_F64 + n_dist) * 8
+
+
+def _pack_cam(cam: camera, n_dist: int):
+    dist = np.zeros(n_dist) if cam.dist is None else cam.dist[:n_dist]
+    return np.concatenate((np.ravel(cam.r_o2cam_g), np.ravel(cam.c_cam2g), [cam.fovh_deg],
+                           np.ravel(cam.res), [cam.AR], dist)).astype('<f8')
+
+
+def _unpack_cam(v):
+    dist = v[_CAM_F64:].copy() if v.size > _CAM_F64 else None
+    return camera(v[0:3].copy(), v[3:12].reshape(3, 3).copy(), float(v[12]),
+                  v[13:15].astype(np.int64), float(v[15]), dist)
+
+
+def _read_header(f):
+    """Returns (cams, header size in bytes)."""
+    head = f.read(16)
+    if len(head) < 16 or head[:8] != MAGIC:
+        raise ValueError("Not a detection log (bad magic)")
+    n_cams, n_dist = struct.unpack('<II', head[8:16])
+    n = _CAM_F64 + n_dist
+    block = np.frombuffer(f.read(n_cams * n * 8), dtype='<f8').reshape(n_cams, n)
+    return [_unpack_cam(v) for v in block], _header_size(n_cams, n_dist)
+
+
+class detlog_writer:
+    """
+    Appends frames of detections to a detection log. Opening an existing log
+    appends to it (the cameras must have the same count; their calibration in the
+    header is kept).
+    """
+
+    def __init__(self, path: str, cams: list):
+        self.path = path
+        self.n_cams = len(cams)
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, 'rb') as f:
+                old_cams, header = _read_header(f)
+            if len(old_cams) != self.n_cams:
+                raise ValueError("Existing log has a different number of cameras")
+            # Make sure the sidecar covers the whole log (the writer is the only one
+            # that touches it), then cut off any torn tail
+            n_good, tail, end = _scan_log(path, self.n_cams, header)[1:]
+            with open(path + '.idx', 'ab') as f:
+                f.truncate(n_good * _IDX_DTYPE.itemsize)
+                f.write(tail.tobytes())
+            self._f = open(path, 'r+b')
+            self._f.truncate(end)
+            self._f.seek(end)
+        else:
+            n_dist = _N_DIST if any(c.has_distortion for c in cams) else 0
+            self._f = open(path, 'wb')
+            self._f.write(MAGIC + struct.pack('<II', self.n_cams, n_dist))
+            self._f.write(np.stack([_pack_cam(c, n_dist) for c in cams]).tobytes())
+            open(path + '.idx', 'wb').close()
+        self._idx = open(path + '.idx', 'ab')
+
+    def write(self, t: float, pxs: list):
+        """Appends one frame: timestamp t (s) and one (N_c, 2) pixel array per camera."""
+        if len(pxs) != self.n_cams:
+            raise ValueError(f"Expected {self.n_cams} pixel arrays, got {len(pxs)}")
+        pxs = [np.asarray(p, dtype='<f4').reshape(-1, 2) for p in pxs]
+        counts = np.array([p.shape[0] for p in pxs], dtype='<u4')
+        body = struct.pack('<d', t) + counts.tobytes() + b''.join(p.tobytes() for p in pxs)
+        body += b'\0' * (-len(body) % 8)
+
+        # Record first, index entry second: a crash can only leave an unindexed tail
+        offset = self._f.tell()
+        self._f.write(body)
+        self._idx.write(np.array([(t, offset)], dtype=_IDX_DTYPE).tobytes())
+
+    def flush(self):
+        self._f.flush()
+        self._idx.flush()
+
+    def close(self):
+        self._f.close()
+        self._idx.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _scan_log(path, n_cams, header):
+    """
+    Checks path.idx against the log and indexes the complete records it is
+    missing, without writing anything (a writer may still be appending to both).
+    Returns (idx, n_good, tail, end): the sidecar entries (memory-mapped), how
+    many of them lead to complete records, (t, offset) entries for the records
+    after those, and the byte offset just past the last complete record.
+    """
+    size = os.path.getsize(path)
+    idx_path = path + '.idx'
+    n_idx = os.path.getsize(idx_path) // _IDX_DTYPE.itemsize if os.path.exists(idx_path) else 0
+    # (can't map an empty file; a half-written last entry is left out)
+    idx = np.memmap(idx_path, dtype=_IDX_DTYPE, mode='r', shape=(n_idx,)) if n_idx else np.empty(0, _IDX_DTYPE)
+
+    # Trust the index up to its last complete record, scan from there
+    pos = header
+    entries = []
+    with open(path, 'rb') as f:
+        n_good = idx.size
+        while n_good:
+            f.seek(int(idx['offset'][n_good - 1]))
+            rec = f.read(8 + 4 * n_cams)
+            end = int(idx['offset'][n_good - 1]) + _record_size(np.frombuffer(rec[8:], dtype='<u4')) \
+                if len(rec) == 8 + 4 * n_cams else size + 1
+            if end <= size:
+                pos = end
+                break
+            n_good -= 1 # index got ahead of a torn record
+
+        f.seek(pos)
+        while pos + 8 + 4 * n_cams <= size:
+            rec = f.read(8 + 4 * n_cams)
+            counts = np.frombuffer(rec[8:], dtype='<u4')
+            n = _record_size(counts)
+            if pos + n > size:
+                break # torn record at the tail
+            entries.append((struct.unpack('<d', rec[:8])[0], pos))
+            pos += n
+            f.seek(pos)
+    return idx, n_good, np.array(entries, dtype=_IDX_DTYPE), pos
+
+
+def _record_size(counts):
+    n = 8 + 4 * counts.size + 8 * int(counts.sum())
+    return n + (-n % 8)
+
+
+class detlog_reader:
+    """
+    Memory-mapped detection log reader. Nothing but the (t, offset) index is
+    touched up front; frames are zero-copy views into the mapped file, so hours of
+    capture can be replayed without loading them into RAM.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.cams, header = _read_header(f)
+        self.n_cams = len(self.cams)
+
+        # Read-only: whatever the sidecar is missing (a log still being written,
+        # or one that lost its .idx) is indexed in memory, never written back
+        idx, n_good, tail, _ = _scan_log(path, self.n_cams, header)
+        idx = np.concatenate((idx[:n_good], tail)) if tail.size else idx[:n_good]
+        self._mm = np.memmap(path, dtype=np.uint8, mode='r')
+        self.times = idx['t']
+        self._offsets = idx['offset']
+
+    def __len__(self):
+        return self.times.size
+
+    def __getitem__(self, i: int):
+        """Frame i as (t, [px_cam0 (N0, 2), px_cam1 (N1, 2), ...])."""
+        o = int(self._offsets[i])
+        buf = self._mm
+        counts = np.frombuffer(buf, dtype='<u4', count=self.n_cams, offset=o + 8)
+        pxs = []
+        o += 8 + 4 * self.n_cams
+        for n in counts:
+            pxs.append(np.frombuffer(buf, dtype='<f4', count=2 * int(n), offset=o).reshape(-1, 2))
+            o += 8 * int(n)
+        return float(self.times[i]), pxs
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def seek(self, t: float) -> int:
+        """Index of the first frame at or after time t."""
+        return int(np.searchsorted(self.times, t, side='left'))
+
+    def iter_batches(self, batch_size: int = 256, t_start: float = None, t_end: float = None):
+        """
+        Yields (times (B,), [frame pxs lists]) batches between t_start and t_end.
+        """
+        i0 = 0 if t_start is None else self.seek(t_start)
+        i1 = len(self) if t_end is None else self.seek(t_end)
+        for i in range(i0, i1, batch_size):
+            stop = min(i + batch_size, i1)
+            yield np.asarray(self.times[i:stop]), [self[k][1] for k in range(i, stop)]
+
+    def replay(self, solve=None, t_start: float = None, t_end: float = None):
+        """
+        Runs every frame through the tracker and yields (t, pts_g).
+        solve(pxs, cams) defaults to multi_track on the first two cameras.
+        """
+        if solve is None:
+            solve = lambda pxs, cams: multi_track(pxs[0], pxs[1], cams[0], cams[1])
+        for times, frames in self.iter_batches(t_start=t_start, t_end=t_end):
+            for t, pxs in zip(times, frames):
+                yield float(t), solve(pxs, self.cams)
+
+    def close(self):
+        # Frames already handed out keep the mapping alive until they are dropped
+        self._mm = None
+        self.times = self._offsets = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,49 @@
+import threading
+from collections import deque
+
+class drop_queue:
+    """
+    Bounded thread-safe FIFO that never blocks the producer: when full, put()
+    throws away the OLDEST item. Good for live data where stale frames are worthless.
+
+    on_drop(item), if given, is called with every item thrown away (e.g. to give
+    a pooled frame back).
+    """
+
+    def __init__(self, maxlen: int, on_drop=None):
+        self._items = deque(maxlen=maxlen)
+        self._cond = threading.Condition()
+        self.on_drop = on_drop
+        self.dropped = 0 # number of items thrown away so far
+
+    def put(self, item):
+        old = None
+        with self._cond:
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+                old = self._items.popleft()
+            self._items.append(item)
+            self._cond.notify()
+        if old is not None and self.on_drop is not None:
+            self.on_drop(old)
+
+    def get(self, timeout: float = None):
+        """
+        Pops the oldest item, waiting up to `timeout` seconds (None = forever).
+        Returns None on timeout.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: len(self._items) > 0, timeout):
+                return None
+            return self._items.popleft()
+
+    def clear(self):
+        with self._cond:
+            items = list(self._items)
+            self._items.clear()
+        if self.on_drop is not None:
+            for item in items:
+                self.on_drop(item)
+
+    def __len__(self):
+        return len(self._items)
@@ -0,0 +1,102 @@
+import threading
+import cv2
+
+
+class pooled_frame:
+    """
+    One reusable frame: `image` as read from the camera, and `gray`, its 8-bit
+    grayscale (a view of image for single-channel sources). Reference counted:
+    whoever hands it on calls retain(), whoever is done with it calls release(),
+    and the last release() puts it back in its pool.
+    """
+    __slots__ = ('image', 'gray', '_pool', '_refs')
+
+    def __init__(self, pool):
+        self.image = None
+        self.gray = None
+        self._pool = pool
+        self._refs = 0
+
+    def retain(self):
+        with self._pool._lock:
+            self._refs += 1
+        return self
+
+    def release(self):
+        with self._pool._lock:
+            if self._refs <= 0:
+                raise RuntimeError("pooled_frame released more times than it was retained")
+            self._refs -= 1
+            if self._refs == 0 and len(self._pool._free) < self._pool.size:
+                self._pool._free.append(self)
+
+
+def retain_frame(frame):
+    """Retains frame if it is a pooled_frame (plain arrays need nothing). Returns frame."""
+    if isinstance(frame, pooled_frame):
+        frame.retain()
+    return frame
+
+
+def release_frame(frame):
+    """Releases frame if it is a pooled_frame (plain arrays need nothing)."""
+    if isinstance(frame, pooled_frame):
+        frame.release()
+
+
+class frame_pool:
+    """
+    Fixed set of frame buffers for one camera, so steady-state capture allocates
+    nothing: read() fills a free buffer in place (cap.read(image=...)) and
+    converts it into that buffer's own gray image (cvtColor(..., dst=...)).
+    Consumers get views of those arrays, and the buffer goes back to the pool once
+    every one of them has released it.
+
+    The first read into each buffer lets the backend allocate (it knows the frame
+    size); if a backend ever hands back a different array (it ignored image=, or
+    the resolution changed) the buffer just adopts it.
+
+    The pool never makes capture wait: with every buffer still in use, acquire()
+    makes a new one (counted in `allocated`), and buffers coming back to a full
+    pool are left to the garbage collector. A steady `allocated` means nobody is
+    holding frames too long.
+
+    Parameters:
+    - size (int): buffers kept for reuse (frames in flight at once: queued,
+                  being detected, held by the consumer)
+    """
+
+    def __init__(self, size: int = 8):
+        self.size = size
+        self.allocated = 0 # buffers created so far
+        self._free = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """A free buffer with one reference (yours), contents undefined."""
+        with self._lock:
+            buf = self._free.pop() if self._free else None
+            if buf is None:
+                buf = pooled_frame(self)
+                self.allocated += 1
+            buf._refs = 1
+        return buf
+
+    def read(self, src, gray: bool = True):
+        """
+        cap.read() into a pooled buffer (and its gray image if `gray`).
+        Returns (ret, pooled_frame); on failure the buffer is already released.
+        """
+        buf = self.acquire()
+        ret, image = src.read(buf.image) if buf.image is not None else src.read()
+        if not ret:
+            buf.release()
+            return False, None
+        if image is not buf.image:
+            buf.image, buf.gray = image, None
+        if gray:
+            if image.ndim == 2:
+                buf.gray = image
+            else:
+                buf.gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=buf.gray)
+        return True, buf
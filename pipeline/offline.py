@@ -0,0 +1,183 @@
+"""
+Offline batch processing of recorded sessions: decode -> detect -> triangulate
+over a process pool, results merged in frame order into one columnar file.
+
+<name>.npz columns (np.load gives a dict-like of arrays):
+  per frame (F rows):   frame (i8), t (f8, s), n_points (i4), n_det (i4, (F, C) detections per camera),
+                        ok (bool, False where a recording failed to decode the frame: no points, n_det 0)
+  per point (P rows):   point_frame (i8, frame it belongs to), x, y, z (f8, global), error (f8, ray gap)
+  fps (scalar)
+
+Points of frame f are the rows where point_frame == f (contiguous, in order:
+they start at cumsum(n_points)[f] - n_points[f]).
+"""
+import os
+import glob
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+import numpy as np
+from cam_math import multi_track, rig_track
+from vision_tools import detect_blobs
+
+_IMAGE_EXTS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff', '.pgm')
+
+
+class _source:
+    """One recording, either a video file or an image sequence (directory or glob), with random access."""
+
+    def __init__(self, path: str, fps: float = None):
+        if os.path.isdir(path):
+            files = [f for f in sorted(os.listdir(path)) if f.lower().endswith(_IMAGE_EXTS)]
+            self.files = [os.path.join(path, f) for f in files]
+        elif any(c in path for c in '*?['):
+            self.files = sorted(glob.glob(path))
+        else:
+            self.files = None
+        self.path = path
+        self._cap = None
+        self._next = None # frame the open VideoCapture will decode next
+
+        if self.files is not None:
+            self.n_frames = len(self.files)
+            self.fps = fps
+        else:
+            cap = cv2.VideoCapture(path)
+            if not cap.isOpened():
+                raise IOError(f"Could not open {path}")
+            self.n_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            self.fps = fps if fps is not None else (cap.get(cv2.CAP_PROP_FPS) or None)
+            cap.release()
+
+    def read(self, i: int):
+        """Frame i as 8-bit grayscale, or None past the end."""
+        if self.files is not None:
+            return cv2.imread(self.files[i], cv2.IMREAD_GRAYSCALE) if i < self.n_frames else None
+
+        # Video: seek only when not already there (sequential reads inside a chunk)
+        if self._cap is None:
+            self._cap = cv2.VideoCapture(self.path)
+        if self._next != i:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, i)
+        ret, frame = self._cap.read()
+        self._next = i + 1 if ret else None # re-seek after a failed decode
+        if not ret:
+            return None
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+
+    def close(self):
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+
+# Per-worker state, sent once by the pool initializer (cameras carry their
+# undistortion tables, no point pickling those with every chunk)
+_worker = {}
+
+
+def _init_worker(paths, offsets, cams, detect, detect_kwargs, fps):
+    cv2.setNumThreads(1) # one process per core already
+    _worker.update(sources=[_source(p, fps) for p in paths], offsets=offsets, cams=cams,
+                   detect=detect, detect_kwargs=detect_kwargs)
+
+
+def _solve(pxs, cams):
+    if len(cams) == 2:
+        return multi_track(pxs[0], pxs[1], cams[0], cams[1], return_error=True)
+    pts_g, error, _ = rig_track(pxs, cams)
+    return pts_g, error
+
+
+def _process_chunk(span):
+    """Frames [start, stop) -> this chunk's columns."""
+    start, stop = span
+    w = _worker
+    detect = w['detect'] if w['detect'] is not None else detect_blobs
+    n_cams = len(w['sources'])
+    frames, ok, n_points, n_det, pts, err = [], [], [], [], [], []
+    for f in range(start, stop):
+        grays = [src.read(f + off) for src, off in zip(w['sources'], w['offsets'])]
+        frames.append(f)
+        ok.append(all(g is not None for g in grays))
+        if not ok[-1]: # keep the row (the file stays one row per frame), flag it
+            n_points.append(0)
+            n_det.append([0] * n_cams)
+            continue
+        pxs = [detect(g, **w['detect_kwargs']) for g in grays]
+        pts_g, error = _solve(pxs, w['cams'])
+        n_points.append(pts_g.shape[1])
+        n_det.append([len(p) for p in pxs])
+        pts.append(pts_g)
+        err.append(error)
+
+    return (np.array(frames, dtype=np.int64), np.array(n_points, dtype=np.int32),
+            np.array(n_det, dtype=np.int32).reshape(-1, n_cams),
+            np.hstack(pts) if pts else np.empty((3, 0)), np.concatenate(err) if err else np.empty(0),
+            np.array(ok, dtype=bool))
+
+
+def process_recording(paths: list, cams: list, out_path: str, detect=None, detect_kwargs: dict = None,
+                      offsets: list = None, chunk_frames: int = 256, n_workers: int = None,
+                      fps: float = None, progress=None):
+    """
+    Runs a recorded session through detection and triangulation on every core.
+
+    Inputs:
+      paths:        one recording per camera: video files, image directories or globs
+      cams:         the matching camera objects
+      out_path:     columnar .npz to write (see the module docstring)
+      detect:       gray frame -> (N, 2) pixels (default detect_blobs); must be a
+                    top-level function so worker processes can import it
+      detect_kwargs: extra keyword arguments for detect (e.g. {'threshold': 60})
+      offsets:      per-recording frame offset (>= 0), for recordings that started at
+                    different times (frame f uses frame f + offsets[c] of recording c);
+                    give the recordings that started later offset 0
+      chunk_frames: frames per task; each task opens its own decoders and seeks once
+      n_workers:    processes (default: all cores)
+      fps:          frame rate for t (default: the first video's; 1.0 for images)
+      progress:     optional callback(frames_done, n_frames)
+
+    The timeline is cut into chunks that the pool processes in any order;
+    results are collected in frame order, so the file is identical to a
+    sequential run's.
+
+    Video seeking lands on the exact frame with most backends/codecs; for
+    long-GOP footage whose backend can't, use image sequences (or larger chunks).
+
+    A frame some recording fails to decode is kept as a row with ok False
+    (and no points) instead of ending the run early.
+
+    Returns the number of frames written.
+    """
+    offsets = [0] * len(paths) if offsets is None else [int(o) for o in offsets]
+    if len(offsets) != len(paths):
+        raise ValueError("Expected one offset per recording")
+    if any(o < 0 for o in offsets):
+        raise ValueError("Offsets must be >= 0 (offset the recordings that started earlier instead)")
+    sources = [_source(p, fps) for p in paths]
+    n_frames = max(min(src.n_frames - off for src, off in zip(sources, offsets)), 0)
+    fps = fps if fps is not None else (next((s.fps for s in sources if s.fps), None) or 1.0)
+    spans = [(s, min(s + chunk_frames, n_frames)) for s in range(0, n_frames, chunk_frames)]
+
+    # 1) Fan the chunks out; map() hands results back in submission order
+    chunks = []
+    done = 0
+    init = (paths, offsets, cams, detect, detect_kwargs or {}, fps)
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=init) as pool:
+        for chunk in pool.map(_process_chunk, spans):
+            chunks.append(chunk)
+            done += chunk[0].size
+            if progress is not None:
+                progress(done, n_frames)
+
+    # 2) Stitch the columns together and write them
+    frame = np.concatenate([c[0] for c in chunks]) if chunks else np.empty(0, dtype=np.int64)
+    n_points = np.concatenate([c[1] for c in chunks]) if chunks else np.empty(0, dtype=np.int32)
+    n_det = np.vstack([c[2] for c in chunks]) if chunks else np.empty((0, len(paths)), dtype=np.int32)
+    pts = np.hstack([c[3] for c in chunks]) if chunks else np.empty((3, 0))
+    error = np.concatenate([c[4] for c in chunks]) if chunks else np.empty(0)
+    ok = np.concatenate([c[5] for c in chunks]) if chunks else np.empty(0, dtype=bool)
+    np.savez(out_path, frame=frame, t=frame / fps, n_points=n_points, n_det=n_det, ok=ok,
+             point_frame=np.repeat(frame, n_points), x=pts[0], y=pts[1], z=pts[2], error=error,
+             fps=np.float64(fps))
+    return frame.size
@@ -0,0 +1,330 @@
+"""
+Publishing tracker output to other processes.
+
+shm_publisher / shm_reader: single-writer ring buffer in shared memory, for
+consumers on the same machine (lowest latency, no copies on the reader side).
+
+  header:  b'CTSHM001' | u32 n_slots | u32 max_points | u64 last published seq | pad to 64
+  slots:   n_slots x [u64 seq | f64 t | u32 n | u32 flags |
+                      f64 pts (3, max_points) | i64 ids (max_points) | f64 error (max_points)]
+           flags: 1 = ids valid, 2 = error valid. Frame seq lives in slot seq % n_slots.
+
+  No locks: each slot is a seqlock. The writer zeroes the slot's seq, writes the
+  frame, then stores its seq; a reader accepts a slot only if its seq is the one
+  it wants both before and after reading. Readers never block the writer, and a
+  reader that falls more than n_slots - 1 frames behind just misses frames.
+
+udp_publisher / udp_reader: the same frames as one datagram each, for consumers
+on another host.
+
+  datagram: b'CTP1' | u64 seq | f64 t | u32 n | u32 flags | f64 pts (3, n) | i64 ids (n) | f64 error (n)
+
+Everything is little-endian.
+"""
+import sys
+import time
+import socket
+import struct
+from collections import namedtuple
+from multiprocessing import shared_memory
+import numpy as np
+from numpy.typing import NDArray
+
+MAGIC = b'CTSHM001'
+DEFAULT_NAME = 'cheap_tracker'
+DEFAULT_PORT = 47800
+_HEAD_DTYPE = np.dtype([('magic', 'S8'), ('n_slots', '<u4'), ('max_points', '<u4'), ('seq', '<u8')])
+_HEAD_SIZE = 64
+_HAS_IDS, _HAS_ERROR = 1, 2
+
+# seq counts from 1; ids / error are None when the publisher didn't have them
+published_frame = namedtuple('published_frame', 'seq t pts_g ids error')
+
+
+def _slot_dtype(max_points):
+    return np.dtype([('seq', '<u8'), ('t', '<f8'), ('n', '<u4'), ('flags', '<u4'),
+                     ('pts', '<f8', (3, max_points)), ('ids', '<i8', (max_points,)),
+                     ('error', '<f8', (max_points,))])
+
+
+_owned = set() # segments created by publishers in this process
+
+
+def _attach(name):
+    """Opens an existing segment without handing it to this process's resource tracker
+    (which would otherwise unlink it when a reader exits)."""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name, track=False)
+    shm = shared_memory.SharedMemory(name)
+    if name not in _owned:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    return shm
+
+
+def _frame_args(pts_g, ids, error, max_points):
+    pts_g = np.asarray(pts_g, dtype=np.float64).reshape(3, -1)[:, :max_points]
+    n = pts_g.shape[1]
+    flags = 0
+    if ids is not None:
+        ids = np.asarray(ids, dtype=np.int64)[:n]
+        flags |= _HAS_IDS
+    if error is not None:
+        error = np.asarray(error, dtype=np.float64)[:n]
+        flags |= _HAS_ERROR
+    return pts_g, ids, error, n, flags
+
+
+class shm_publisher:
+    """
+    Writer side of the shared-memory ring. One per segment name; creating it
+    replaces a segment left behind by a previous run.
+
+        pub = shm_publisher()
+        pub.publish(result.t, result.pts_g)               # multi_track output
+        pub.publish(t, pts, ids=ids, error=err)           # tracker output
+
+    Frames with more than max_points points are truncated.
+    """
+
+    def __init__(self, name: str = DEFAULT_NAME, max_points: int = 256, n_slots: int = 64):
+        self.name = name
+        self.max_points = max_points
+        self.n_slots = n_slots
+        dtype = _slot_dtype(max_points)
+        size = _HEAD_SIZE + n_slots * dtype.itemsize
+        try:
+            self._shm = shared_memory.SharedMemory(name, create=True, size=size)
+        except FileExistsError:
+            old = _attach(name)
+            old.close()
+            old.unlink()
+            self._shm = shared_memory.SharedMemory(name, create=True, size=size)
+        _owned.add(name)
+
+        self._head = np.ndarray((), dtype=_HEAD_DTYPE, buffer=self._shm.buf)
+        slots = np.ndarray(n_slots, dtype=dtype, buffer=self._shm.buf, offset=_HEAD_SIZE)
+        # Field views, so every write below is a plain strided store
+        self._seq, self._t, self._n, self._flags = slots['seq'], slots['t'], slots['n'], slots['flags']
+        self._pts, self._ids, self._err = slots['pts'], slots['ids'], slots['error']
+        self._seq[:] = 0
+        self._head['n_slots'], self._head['max_points'], self._head['seq'] = n_slots, max_points, 0
+        self._head['magic'] = MAGIC # last: readers check it before trusting the rest
+        self.seq = 0
+
+    def publish(self, t: float, pts_g: NDArray, ids: NDArray = None, error: NDArray = None):
+        """Writes one frame ((3, N) global points, optional (N,) ids / errors). Returns its seq."""
+        pts_g, ids, error, n, flags = _frame_args(pts_g, ids, error, self.max_points)
+        seq = self.seq + 1
+        i = seq % self.n_slots
+
+        self._seq[i] = 0 # slot is being written
+        self._t[i], self._n[i], self._flags[i] = t, n, flags
+        self._pts[i, :, :n] = pts_g
+        if ids is not None:
+            self._ids[i, :n] = ids
+        if error is not None:
+            self._err[i, :n] = error
+        self._seq[i] = seq # slot is valid again
+        self._head['seq'] = seq
+        self.seq = seq
+        return seq
+
+    def close(self, unlink: bool = True):
+        self._head = self._seq = self._t = self._n = self._flags = self._pts = self._ids = self._err = None
+        self._shm.close()
+        if unlink:
+            self._shm.unlink()
+            _owned.discard(self.name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class shm_reader:
+    """
+    Reader side of the shared-memory ring, for any number of local processes.
+
+        with shm_reader() as sub:
+            while True:
+                for f in sub.poll():              # every frame since the last poll
+                    use(f.pts_g)                  # (3, N) view into shared memory
+                sub.wait(timeout=1.0)
+
+    Frames are zero-copy views. They stay intact until the writer comes back
+    around to their slot (n_slots - 1 frames later); valid(frame) says whether a
+    frame you are done using was still intact, copy it if you need to keep it.
+    """
+
+    def __init__(self, name: str = DEFAULT_NAME):
+        self._shm = _attach(name)
+        self._head = np.ndarray((), dtype=_HEAD_DTYPE, buffer=self._shm.buf)
+        if bytes(self._head['magic']) != MAGIC:
+            self._shm.close()
+            raise ValueError("Not a tracker ring (bad magic)")
+        self.n_slots = int(self._head['n_slots'])
+        self.max_points = int(self._head['max_points'])
+        slots = np.ndarray(self.n_slots, dtype=_slot_dtype(self.max_points), buffer=self._shm.buf,
+                           offset=_HEAD_SIZE)
+        self._seq, self._t, self._n, self._flags = slots['seq'], slots['t'], slots['n'], slots['flags']
+        self._pts, self._ids, self._err = slots['pts'], slots['ids'], slots['error']
+        self.last_seq = self.head # poll() starts with what comes next
+        self.missed = 0 # frames overwritten before poll() got to them
+
+    @property
+    def head(self):
+        """seq of the newest published frame (0 = nothing yet)."""
+        return int(self._head['seq'])
+
+    def read(self, seq: int):
+        """Frame `seq`, or None if it was overwritten, is being written or doesn't exist yet."""
+        if seq <= 0:
+            return None
+        i = seq % self.n_slots
+        if self._seq[i] != seq:
+            return None
+        t, n, flags = float(self._t[i]), int(self._n[i]), int(self._flags[i])
+        if self._seq[i] != seq: # overwritten while reading the fields
+            return None
+        return published_frame(seq, t, self._pts[i, :, :n],
+                               self._ids[i, :n] if flags & _HAS_IDS else None,
+                               self._err[i, :n] if flags & _HAS_ERROR else None)
+
+    def latest(self):
+        """Newest frame, or None."""
+        return self.read(self.head)
+
+    def valid(self, frame: published_frame):
+        """True if `frame`'s slot hasn't been reused yet (call after using the views)."""
+        return self._seq[frame.seq % self.n_slots] == frame.seq
+
+    def poll(self):
+        """Every frame published since the last poll, oldest first."""
+        head = self.head
+        # The writer may already be busy with head + 1, which reuses slot (head + 1 - n_slots)
+        first = max(self.last_seq + 1, head - self.n_slots + 2)
+        self.missed += first - (self.last_seq + 1)
+        frames = []
+        for seq in range(first, head + 1):
+            f = self.read(seq)
+            if f is None:
+                self.missed += 1
+            else:
+                frames.append(f)
+        self.last_seq = head
+        return frames
+
+    def wait(self, timeout: float = None, sleep: float = 0.0002):
+        """Blocks until a frame newer than the last poll() arrives. Returns False on timeout."""
+        t_end = None if timeout is None else time.monotonic() + timeout
+        while self.head <= self.last_seq:
+            if t_end is not None and time.monotonic() >= t_end:
+                return False
+            time.sleep(sleep)
+        return True
+
+    def close(self):
+        # Frames already handed out keep views into the buffer; drop them first
+        self._head = self._seq = self._t = self._n = self._flags = self._pts = self._ids = self._err = None
+        self._shm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_UDP_HEAD = struct.Struct('<4sQdII')
+_UDP_MAGIC = b'CTP1'
+_UDP_MAX_POINTS = (65507 - _UDP_HEAD.size) // 40 # one datagram, ids and errors included
+
+
+class udp_publisher:
+    """
+    Same publish() as shm_publisher, one datagram per frame, for consumers on
+    another host (or anything that can't map shared memory).
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = DEFAULT_PORT, max_points: int = _UDP_MAX_POINTS):
+        self.addr = (host, port)
+        self.max_points = min(max_points, _UDP_MAX_POINTS)
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.seq = 0
+
+    def publish(self, t: float, pts_g: NDArray, ids: NDArray = None, error: NDArray = None):
+        pts_g, ids, error, n, flags = _frame_args(pts_g, ids, error, self.max_points)
+        self.seq += 1
+        parts = [_UDP_HEAD.pack(_UDP_MAGIC, self.seq, t, n, flags), pts_g.astype('<f8').tobytes()]
+        if ids is not None:
+            parts.append(ids.astype('<i8').tobytes())
+        if error is not None:
+            parts.append(error.astype('<f8').tobytes())
+        self._sock.sendto(b''.join(parts), self.addr)
+        return self.seq
+
+    def close(self):
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class udp_reader:
+    """
+    Receives udp_publisher frames. recv() hands back published_frame tuples whose
+    arrays are views into the received datagram. Gaps in seq count as missed.
+    """
+
+    def __init__(self, port: int = DEFAULT_PORT, host: str = '0.0.0.0'):
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+        self._sock.bind((host, port))
+        self.last_seq = 0
+        self.missed = 0
+
+    def recv(self, timeout: float = None):
+        """Next frame, or None after `timeout` seconds (or on a malformed datagram)."""
+        self._sock.settimeout(timeout)
+        try:
+            data = self._sock.recv(65536)
+        except socket.timeout:
+            return None
+        if len(data) < _UDP_HEAD.size:
+            return None
+        magic, seq, t, n, flags = _UDP_HEAD.unpack_from(data)
+        if magic != _UDP_MAGIC:
+            return None
+        n_arrays = 3 + bool(flags & _HAS_IDS) + bool(flags & _HAS_ERROR)
+        if len(data) < _UDP_HEAD.size + 8 * n_arrays * n: # truncated body
+            return None
+
+        o = _UDP_HEAD.size
+        pts_g = np.frombuffer(data, dtype='<f8', count=3 * n, offset=o).reshape(3, n)
+        o += 24 * n
+        ids = error = None
+        if flags & _HAS_IDS:
+            ids = np.frombuffer(data, dtype='<i8', count=n, offset=o)
+            o += 8 * n
+        if flags & _HAS_ERROR:
+            error = np.frombuffer(data, dtype='<f8', count=n, offset=o)
+
+        if seq > self.last_seq + 1 and self.last_seq:
+            self.missed += seq - self.last_seq - 1
+        self.last_seq = seq
+        return published_frame(seq, t, pts_g, ids, error)
+
+    def close(self):
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
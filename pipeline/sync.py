@@ -0,0 +1,103 @@
+import bisect
+from collections import namedtuple
+import numpy as np
+from numpy.typing import NDArray
+from cam_math.epipolar_assign import gate_match
+
+# One camera frame in the history (frame is whatever the caller wants to carry along)
+stamped = namedtuple('stamped', 't px frame')
+
+
+class temporal_sync:
+    """
+    Short per-camera history of timestamped detections, to estimate where every
+    camera would have seen its markers at any other camera's capture time.
+
+    Unsynced cameras grab frames at different instants, so a moving marker shows up
+    at different places along its path; triangulating those as if simultaneous
+    leaves a ray gap that grows with speed. at(cam, t) instead:
+      1) finds the two frames of `cam` around t (or the two nearest, to extrapolate
+         a little past the newest)
+      2) matches their detections one-to-one (gate_match, max_motion px apart)
+      3) moves each matched marker linearly to time t
+
+    Over one frame interval that is the same as interpolating the rays (to first
+    order), at a fraction of the cost. Markers seen in only one of the two frames
+    are passed through as they are.
+    """
+
+    def __init__(self, n_cams: int, history: int = 4, max_motion: float = 40.0, max_extrapolate: float = 0.05,
+                 on_evict=None):
+        self.history = history # frames kept per camera
+        self.on_evict = on_evict # on_evict(stamped) for frames pushed out of the history
+        self.max_motion = max_motion # px a marker may move between two frames
+        self.max_extrapolate = max_extrapolate # s past the nearest frame before giving up
+        self._hist = [[] for _ in range(n_cams)]
+
+    def add(self, cam: int, t: float, px: NDArray, frame=None):
+        """Adds one detection frame ((N, 2) pixels captured at t) of camera `cam`."""
+        h = self._hist[cam]
+        i = len(h)
+        while i > 0 and h[i - 1].t > t: # detection workers can finish out of order
+            i -= 1
+        h.insert(i, stamped(t, np.asarray(px, dtype=np.float64).reshape(-1, 2), frame))
+        if len(h) > self.history:
+            old = h.pop(0)
+            if self.on_evict is not None:
+                self.on_evict(old)
+
+    def clear(self):
+        """Forgets every camera's history (each frame goes through on_evict)."""
+        for h in self._hist:
+            while h:
+                old = h.pop(0)
+                if self.on_evict is not None:
+                    self.on_evict(old)
+
+    def newest(self, cam: int):
+        """Capture time of camera `cam`'s newest frame, or None."""
+        h = self._hist[cam]
+        return h[-1].t if h else None
+
+    def nearest(self, cam: int, t: float):
+        """Camera `cam`'s stored frame closest to t (a stamped tuple), or None."""
+        h = self._hist[cam]
+        return min(h, key=lambda s: abs(s.t - t)) if h else None
+
+    def at(self, cam: int, t: float):
+        """
+        Camera `cam`'s detections moved to time t, (N, 2) float32, or None if it has
+        no frame within max_extrapolate of t.
+        """
+        h = self._hist[cam]
+        if not h:
+            return None
+
+        # 1) Frames around t, else the closest two on one side
+        i = bisect.bisect_right([s.t for s in h], t)
+        if 0 < i < len(h):
+            a, b = h[i - 1], h[i]
+        elif len(h) >= 2:
+            a, b = (h[0], h[1]) if i == 0 else (h[-2], h[-1])
+        else:
+            a = b = h[0]
+        near_a = abs(t - a.t) <= abs(t - b.t)
+        near = a if near_a else b
+        if abs(t - near.t) > self.max_extrapolate:
+            return None
+        if b.t <= a.t or a.px.shape[0] == 0 or b.px.shape[0] == 0:
+            return near.px.astype(np.float32)
+
+        # 2) Which marker in a is which in b
+        m = gate_match(a.px.T, b.px.T, self.max_motion)
+        hit = m >= 0
+
+        # 3) Linear motion to t; unmatched markers of the nearer frame as they are
+        s = (t - a.t) / (b.t - a.t)
+        moved = a.px[hit] + s * (b.px[m[hit]] - a.px[hit])
+        out = near.px.copy()
+        if near_a:
+            out[hit] = moved
+        else:
+            out[m[hit]] = moved
+        return out.astype(np.float32)
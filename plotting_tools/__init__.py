@@ -1,2 +1,3 @@
 from .datum import datum
-from .axis_equal import axis_equal
\ No newline at end of file
+from .axis_equal import axis_equal
+from .live_view import live_view
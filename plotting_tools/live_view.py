@@ -0,0 +1,150 @@
+import time
+import threading
+import numpy as np
+import matplotlib.pyplot as plt
+from .datum import datum
+from .axis_equal import axis_equal
+
+class live_view:
+    """
+    Live 3D view of tracker output that never slows the tracking down.
+
+    Everything static (camera datums, axes, limits) is drawn once. The markers
+    and their trails are a handful of line artists whose data is swapped in
+    place, and where the backend supports it they are blitted over a cached
+    background instead of redrawing the whole figure.
+
+    The tracking side only calls push(), which copies the points into a ring
+    buffer under a lock (no matplotlib at all). The GUI thread calls refresh()
+    (or run()), which redraws at most max_fps times a second from the latest
+    snapshot, however fast points arrive.
+
+    Parameters:
+    - cams (list): camera objects, drawn as datums
+    - trail_len (int): frames of history kept per trail
+    - max_trails (int): trail slots; with IDs a marker goes to slot id % max_trails
+    - max_fps (float): refresh cap
+    - axis_length (float): camera datum arrow length
+    - bounds (np.array): optional (3, 2) [min, max] per axis of the tracked volume
+                         (default: around the cameras and the origin)
+    """
+
+    def __init__(self, cams: list, trail_len: int = 100, max_trails: int = 16, max_fps: float = 20.0,
+                 axis_length: float = 0.3, bounds=None):
+        self.trail_len = trail_len
+        self.max_trails = max_trails
+        self.max_fps = max_fps
+        self.n_drawn = 0
+
+        # Ring buffer: row = frame, column = trail slot, NaN = nothing there
+        self._trail = np.full((trail_len, max_trails, 3), np.nan)
+        self._head = 0
+        self._pts = np.empty((3, 0))
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._t_drawn = 0.0
+
+        # 1) Static scene, once
+        self.fig = plt.figure()
+        self.ax = self.fig.add_subplot(111, projection='3d')
+        self.ax.set_xlabel('X')
+        self.ax.set_ylabel('Y')
+        self.ax.set_zlabel('Z')
+        for i, cam in enumerate(cams):
+            datum(cam.c_cam2g, cam.r_o2cam_g, self.ax, axis_length, label_suffix=f"{i + 1}")
+        if bounds is None:
+            corners = np.vstack([np.zeros(3)] + [np.ravel(cam.r_o2cam_g) for cam in cams])
+            bounds = np.column_stack((corners.min(axis=0), corners.max(axis=0)))
+        bounds = np.asarray(bounds, dtype=np.float64)
+        self.ax.set_xlim3d(bounds[0])
+        self.ax.set_ylim3d(bounds[1])
+        self.ax.set_zlim3d(bounds[2])
+        axis_equal(self.ax)
+
+        # 2) Dynamic artists, created once and only fed new data from now on
+        self._blit = self.fig.canvas.supports_blit
+        self.trails = [self.ax.plot([], [], [], '-', lw=1, alpha=0.6, animated=self._blit)[0]
+                       for _ in range(max_trails)]
+        self.markers = self.ax.plot([], [], [], 'ko', ms=5, animated=self._blit)[0]
+        self._artists = self.trails + [self.markers]
+
+        # The cached background goes stale whenever the figure redraws (resize, rotate)
+        self._bg = None
+        self.fig.canvas.mpl_connect('draw_event', self._on_draw)
+
+    # --- tracking side ---
+    def push(self, pts_g, ids=None):
+        """
+        New frame of points, (3, K) global. ids (K,) from tracker.update keep each
+        marker on its own trail; without them column k feeds trail k.
+        Cheap and thread-safe: call it from the tracking loop.
+        """
+        pts_g = np.asarray(pts_g, dtype=np.float64).reshape(3, -1)
+        if ids is None:
+            k = min(pts_g.shape[1], self.max_trails)
+            slots, pts = np.arange(k), pts_g[:, :k]
+        else:
+            slots, pts = np.asarray(ids) % self.max_trails, pts_g
+        with self._lock:
+            row = self._trail[self._head]
+            row[:] = np.nan
+            row[slots] = pts.T
+            self._head = (self._head + 1) % self.trail_len
+            self._pts = pts_g.copy()
+            self._dirty = True
+
+    # --- GUI side ---
+    def _on_draw(self, event):
+        if self._blit:
+            self._bg = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+            self._draw_artists()
+
+    def _draw_artists(self):
+        for a in self._artists:
+            self.ax.draw_artist(a)
+
+    def refresh(self, force: bool = False):
+        """
+        Redraws if there is new data and the max_fps budget allows it.
+        Call from the thread that owns the figure. Returns True if it drew.
+        """
+        now = time.perf_counter()
+        if not (self._dirty or force) or now - self._t_drawn < 1.0 / self.max_fps:
+            return False
+
+        # 1) Snapshot under the lock, oldest row first
+        with self._lock:
+            trail = np.roll(self._trail, -self._head, axis=0)
+            pts = self._pts
+            self._dirty = False
+
+        # 2) Swap the data into the existing artists
+        for s, line in enumerate(self.trails):
+            line.set_data_3d(trail[:, s, 0], trail[:, s, 1], trail[:, s, 2])
+        self.markers.set_data_3d(pts[0], pts[1], pts[2])
+
+        # 3) Blit over the cached background, or let the backend redraw
+        canvas = self.fig.canvas
+        if self._blit and self._bg is not None:
+            canvas.restore_region(self._bg)
+            self._draw_artists()
+            canvas.blit(self.fig.bbox)
+        else:
+            canvas.draw_idle()
+        canvas.flush_events()
+        self._t_drawn = now
+        self.n_drawn += 1
+        return True
+
+    def run(self, stop: threading.Event = None):
+        """
+        Shows the window and keeps it refreshed until it is closed (or `stop` is
+        set). For when the tracking runs on other threads (see capture_pipeline).
+        """
+        plt.show(block=False)
+        while plt.fignum_exists(self.fig.number) and not (stop is not None and stop.is_set()):
+            if not self.refresh():
+                plt.pause(0.25 / self.max_fps) # also services the GUI events
+
+    def close(self):
+        plt.close(self.fig)
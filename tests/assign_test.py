@@ -0,0 +1,48 @@
+import sys
+import os
+
+current = os.path.dirname(os.path.realpath(__file__))
+parent = os.path.dirname(current)
+sys.path.append(parent)
+
+import numpy as np
+from cam_math.epipolar_assign import assign_pairs
+
+# Equivalence check: the vectorized greedy assign_pairs against the plain
+# cheapest-first loop it replaces, on random sparse candidate sets (with ties).
+#   python tests/assign_test.py
+
+
+def greedy_loop(i_line, j_pt, dist, n_lines, n_pts):
+    """Reference: walk the candidates cheapest-first, take every pair still free."""
+    match = np.full(n_pts, -1, dtype=np.intp)
+    line_used = np.zeros(n_lines, dtype=bool)
+    for k in np.argsort(dist, kind='stable'):
+        if not line_used[i_line[k]] and match[j_pt[k]] < 0:
+            match[j_pt[k]] = i_line[k]
+            line_used[i_line[k]] = True
+    return match
+
+
+def check(trials=2000, seed=0):
+    """Number of random candidate sets where the two disagree."""
+    rng = np.random.default_rng(seed)
+    mismatches = 0
+    for _ in range(trials):
+        n_lines, n_pts = rng.integers(1, 60, size=2)
+        k = rng.integers(0, 4 * max(n_lines, n_pts))
+        pairs = np.unique(np.column_stack((rng.integers(0, n_lines, k), rng.integers(0, n_pts, k))), axis=0)
+        pairs = rng.permutation(pairs)
+        i_line, j_pt = pairs[:, 0].astype(np.intp), pairs[:, 1].astype(np.intp)
+        dist = np.round(rng.uniform(0, 15, len(pairs)), 1) # coarse costs -> plenty of ties
+        got = assign_pairs(i_line, j_pt, dist, n_lines, n_pts, "greedy")
+        mismatches += not np.array_equal(got, greedy_loop(i_line, j_pt, dist, n_lines, n_pts))
+    return mismatches
+
+
+if __name__ == "__main__":
+    trials = 2000
+    mismatches = check(trials)
+    print(f"greedy assign_pairs vs reference loop: {mismatches} mismatches in {trials} trials")
+    if mismatches:
+        sys.exit(1)
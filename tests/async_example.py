@@ -0,0 +1,71 @@
+import sys
+import os
+import json
+import asyncio
+
+current = os.path.dirname(os.path.realpath(__file__))
+parent = os.path.dirname(current)
+sys.path.append(parent)
+
+import cv2
+import numpy as np
+from cam_math import camera
+from vision_tools import detect_blobs
+from pipeline import async_tracker
+
+# The tracker inside an asyncio service: every frame's points go out as JSON over
+# UDP from the same event loop that would run the rest of the service.
+#   python tests/async_example.py [host] [port]
+
+# --- 1. SETUP MATH OBJECTS (same calibration as example.py) ---
+res = np.array([640, 360])
+fovh_deg = 55
+AR = 9/16
+
+cam1 = camera(np.array([ 0.5661,-2.3785, 2.5925]),
+              np.array([[-0.9917, 0.1237, 0.0359],
+                        [ 0.1147, 0.7216, 0.6827],
+                        [ 0.0585, 0.6812,-0.7298]]),
+              fovh_deg, res, AR)
+
+cam2 = camera(np.array([ 2.1788,-1.201 , 2.9993]),
+              np.array([[-0.1162,-0.7595,-0.64  ],
+                        [-0.9925, 0.065 , 0.1031],
+                        [-0.0367, 0.6472,-0.7614]]),
+              fovh_deg, res, AR)
+
+THRESHOLD = 50
+MIN_AREA = 5
+MAX_AREA = 5000
+
+def open_cam(i):
+    # Runs in the executor (opening a camera blocks for a while)
+    cap = cv2.VideoCapture(i, cv2.CAP_DSHOW)
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, res[0])
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, res[1])
+    return cap
+
+def detect(frame):
+    return detect_blobs(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), THRESHOLD, MIN_AREA, MAX_AREA)
+
+async def main(host, port):
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(asyncio.DatagramProtocol, remote_addr=(host, port))
+
+    # "latest": a slow network never makes us send stale points
+    async with async_tracker([lambda: open_cam(0), lambda: open_cam(1)], [cam1, cam2],
+                             policy="latest", detect=detect, max_skew=1/60) as trk:
+        print(f"Tracking started, sending to {host}:{port}. Ctrl+C to quit.")
+        async for result in trk:
+            msg = {'t': result.t, 'pts': np.round(result.pts_g.T, 4).tolist()}
+            transport.sendto(json.dumps(msg).encode())
+        print(f"Sources stopped ({trk.dropped} frames skipped by the consumer)")
+    transport.close()
+
+if __name__ == "__main__":
+    host = sys.argv[1] if len(sys.argv) > 1 else "127.0.0.1"
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 5005
+    try:
+        asyncio.run(main(host, port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,139 @@
+import sys
+import os
+
+current = os.path.dirname(os.path.realpath(__file__))
+parent = os.path.dirname(current)
+sys.path.append(parent)
+
+import argparse
+import json
+import time
+import numpy as np
+from cam_math import *
+
+# Throughput / latency / accuracy benchmark for cam_math on synthetic scenes.
+#
+#   python tests/benchmark.py                          -> print the table
+#   python tests/benchmark.py --save base.json         -> also store the numbers
+#   python tests/benchmark.py --compare base.json      -> flag anything slower/worse
+#
+# Latency is wall-clock per call; p50/p95/p99 over --repeats calls.
+
+STAGES = ["offset_pixels", "px2cam_unit", "correlate", "locate_loop", "triangulate", "multi_track", "multi_track_ws"]
+
+
+def time_calls(fn, repeats):
+    """Runs fn() `repeats` times, returns per-call latencies in microseconds."""
+    fn() # warm-up (camera caches, allocator)
+    lat = np.empty(repeats)
+    for i in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        lat[i] = time.perf_counter() - t0
+    return lat * 1e6
+
+
+def bench_count(n, repeats, noise_px, p_miss, n_false, gate, rng):
+    cams = synth_rig(2, rng=rng)
+    cam1, cam2 = cams
+    pts = random_points(n, rng=rng)
+    (px1, px2), (id1, id2) = synth_detections(cams, pts, noise_px, p_miss, n_false, rng=rng)
+
+    # Intermediate products for the per-stage timings
+    px1_off, px2_off = offset_pixels(cam1, px1), offset_pixels(cam2, px2)
+    u1, u2 = px2cam_unit(cam1, px1_off), px2cam_unit(cam2, px2_off)
+    idx = correlate(cam1, cam2, u1, u2, gate)
+    ok = idx >= 0
+    mu1, mu2 = u1[:, idx[ok]], u2[:, ok]
+
+    ws = workspace(max(len(px1), len(px2)))
+
+    def locate_loop():
+        for k in range(mu2.shape[1]):
+            locate(mu1[:, k], mu2[:, k], cam1, cam2)
+
+    fns = {
+        "offset_pixels": lambda: offset_pixels(cam1, px1),
+        "px2cam_unit": lambda: px2cam_unit(cam1, px1_off),
+        "correlate": lambda: correlate(cam1, cam2, u1, u2, gate),
+        "locate_loop": locate_loop,
+        "triangulate": lambda: triangulate(mu1, mu2, cam1, cam2),
+        "multi_track": lambda: multi_track(px1, px2, cam1, cam2, max_dist=gate),
+        "multi_track_ws": lambda: multi_track(px1, px2, cam1, cam2, max_dist=gate, ws=ws),
+    }
+    # The python-loop locate gets slow at high counts; fewer repeats is plenty
+    row = {}
+    for name, fn in fns.items():
+        reps = max(3, repeats // 10) if name == "locate_loop" and n > 100 else repeats
+        lat = time_calls(fn, reps)
+        row[name] = {"p50": float(np.percentile(lat, 50)), "p95": float(np.percentile(lat, 95)),
+                     "p99": float(np.percentile(lat, 99))}
+
+    # Accuracy: correspondence (same true point on both sides) and 3D error
+    true1 = id1[idx[ok]]
+    true2 = id2[ok]
+    n_real = int(np.isin(id2[id2 >= 0], id1[id1 >= 0]).sum()) # markers both cameras saw
+    correct = (true1 == true2) & (true2 >= 0)
+    pts_g, _ = triangulate(mu1, mu2, cam1, cam2)
+    err3d = np.linalg.norm(pts_g[:, correct] - pts[:, true2[correct]], axis=0)
+    row["match_recall"] = float(correct.sum() / max(n_real, 1))
+    row["match_precision"] = float(correct.sum() / max(ok.sum(), 1))
+    row["err3d_p50_mm"] = float(np.median(err3d) * 1e3) if err3d.size else float("nan")
+    row["err3d_p95_mm"] = float(np.percentile(err3d, 95) * 1e3) if err3d.size else float("nan")
+    return row
+
+
+def print_table(results):
+    print(f"{'N':>6} " + " ".join(f"{s:>14}" for s in STAGES) + "   recall  precis  err50mm  err95mm")
+    for n, row in results.items():
+        cells = " ".join(f"{row[s]['p50']:8.1f}/{row[s]['p99']:<5.0f}" for s in STAGES)
+        print(f"{n:>6} {cells}   {row['match_recall']:6.3f}  {row['match_precision']:6.3f}"
+              f"  {row['err3d_p50_mm']:7.2f}  {row['err3d_p95_mm']:7.2f}")
+    print("(stage cells are p50/p99 latency in microseconds)")
+
+
+def compare(results, baseline, tol):
+    """Prints every latency p50 that got more than tol slower and every accuracy drop."""
+    bad = 0
+    for n, row in results.items():
+        base = baseline.get(str(n))
+        if base is None:
+            continue
+        for s in STAGES:
+            if s not in base:
+                continue
+            if row[s]["p50"] > base[s]["p50"] * (1 + tol):
+                print(f"REGRESSION N={n} {s}: p50 {base[s]['p50']:.1f} -> {row[s]['p50']:.1f} us")
+                bad += 1
+        for k in ("match_recall", "match_precision"):
+            if row[k] < base[k] - 0.02:
+                print(f"REGRESSION N={n} {k}: {base[k]:.3f} -> {row[k]:.3f}")
+                bad += 1
+    print("no regressions" if bad == 0 else f"{bad} regression(s)")
+    return bad
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="cam_math throughput/latency/accuracy benchmark")
+    ap.add_argument("--counts", type=int, nargs="+", default=[1, 10, 100, 300, 1000])
+    ap.add_argument("--repeats", type=int, default=200)
+    ap.add_argument("--noise", type=float, default=0.3, help="pixel noise std")
+    ap.add_argument("--miss", type=float, default=0.05, help="missed detection probability")
+    ap.add_argument("--false", type=int, default=2, help="false blobs per camera")
+    ap.add_argument("--gate", type=float, default=15.0, help="epipolar gate (px), see correlate")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--save", help="write results to this json file")
+    ap.add_argument("--compare", help="compare against a json file written by --save")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed p50 slowdown (fraction)")
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    results = {n: bench_count(n, args.repeats, args.noise, args.miss, args.false, args.gate, rng) for n in args.counts}
+    print_table(results)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({str(k): v for k, v in results.items()}, f, indent=1)
+    if args.compare:
+        with open(args.compare) as f:
+            sys.exit(1 if compare(results, json.load(f), args.tolerance) else 0)
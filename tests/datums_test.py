@@ -0,0 +1,72 @@
+import sys
+import os
+
+current = os.path.dirname(os.path.realpath(__file__))
+parent = os.path.dirname(current)
+sys.path.append(parent)
+sys.path.append(os.path.join(parent, "calibration"))
+
+import tempfile
+import cv2
+import numpy as np
+from cam_math import camera, cam2px, look_at
+import localize
+
+# Checks localize's --images path without a camera: the datum layout is drawn
+# with cam2px into synthetic frames (plus a few dimmer stray lights), saved and
+# read back like `localize.py --images`, and find_datums must pick out the right
+# dot for every datum and get_camera_state must recover the pose.
+#   python tests/datums_test.py
+
+views = [ # camera position, looking at the datum plate
+    np.array([1.5, -1.5, 1.2]),
+    np.array([-1.8, -0.6, 1.5]),
+    np.array([0.4, 2.0, 0.9]),
+]
+
+
+def make_cam(pos):
+    return camera(pos, look_at(pos, (0.0, 0.0, 0.0)), localize.HORI_FOV, localize.RES_PX,
+                  localize.FRAME_HEIGHT / localize.FRAME_WIDTH) # square pixels, like camera_matrix()
+
+
+def render(cam, rng, n_stray=2):
+    """Gray frame with a dot at every datum, and the datum pixels (N, 2) in GROUND_TRUTH order."""
+    pts_g = localize.GROUND_TRUTH_POINTS.T.astype(np.float64)
+    px = (cam2px(cam, cam.c_g2cam @ (pts_g - cam.origin_g)) + cam.center).T
+    img = np.zeros((localize.FRAME_HEIGHT, localize.FRAME_WIDTH), dtype=np.uint8)
+    stray = rng.uniform((20, 20), (localize.FRAME_WIDTH - 20, localize.FRAME_HEIGHT - 20), (n_stray, 2))
+    for (u, v), level in [(p, 255) for p in px] + [(p, 160) for p in stray]:
+        # sub-pixel centers (shift=4 -> 1/16 px), antialiased so the centroid lands on them
+        cv2.circle(img, (int(round(u * 16)), int(round(v * 16))), 3 * 16, level, -1, cv2.LINE_AA, shift=4)
+    return img, px
+
+
+def check(seed=0):
+    rng = np.random.default_rng(seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        for k, pos in enumerate(views):
+            cam = make_cam(pos)
+            img, px_true = render(cam, rng)
+            path = os.path.join(tmp, f"view{k}.png")
+            cv2.imwrite(path, img)
+            frame = cv2.imread(path) # BGR, as `localize.py --images` reads it
+
+            # 1) Ordering: every datum snapped to its own dot
+            px = localize.find_datums(frame, f"view {k}")
+            assert px is not None, f"view {k}: no datums found"
+            err = np.linalg.norm(px - px_true, axis=1)
+            assert np.all(err < 1.0), f"view {k}: datum pixels off by {err} px"
+
+            # 2) Pose: same position and DCM as the camera that drew the frame
+            pos_est, R_est = localize.get_camera_state(px, f"view {k}")
+            dpos = np.linalg.norm(pos_est - pos)
+            dang = np.rad2deg(np.arccos(np.clip((np.trace(R_est.T @ cam.c_cam2g) - 1) / 2, -1, 1)))
+            print(f"view {k}: pixel error {err.max():.3f} px, position error {dpos * 1000:.1f} mm, "
+                  f"rotation error {dang:.3f} deg")
+            assert dpos < 0.02 and dang < 0.5, f"view {k}: pose off by {dpos:.3f} m / {dang:.2f} deg"
+
+
+if __name__ == "__main__":
+    check()
+    print("Datums OK")
@@ -7,8 +7,11 @@ sys.path.append(parent)
 
 import cv2
 import numpy as np
-from cam_math import multi_track
-from cam_math import camera
+import matplotlib.pyplot as plt
+from cam_math import camera, instrument, multi_track, extrinsic_refiner, blink_codes, blink_tracker
+from vision_tools import detect_blobs, draw_blobs, auto_threshold
+from pipeline import capture_pipeline, shm_publisher
+from plotting_tools import live_view
 import sys
 
 # --- 1. SETUP MATH OBJECTS ---
@@ -43,67 +46,138 @@ if not cap1.isOpened() or not cap2.isOpened():
     print("Error: Could not open one or both cameras.")
     sys.exit()
 
-# Configure Blob Detector (TUNED FOR ROBUSTNESS)
-params = cv2.SimpleBlobDetector_Params()
-params.minThreshold = 50
-params.maxThreshold = 255
-params.thresholdStep = 10
-params.filterByArea = True
-params.minArea = 5
-params.maxArea = 5000
-params.filterByCircularity = False
-params.filterByConvexity = False
-params.filterByInertia = False
-params.filterByColor = True
-params.blobColor = 255
-params.minDistBetweenBlobs = 10
-detector = cv2.SimpleBlobDetector_create(params)
+# Configure Blob Detector (one threshold + connected components)
+# Pick THRESHOLD with calibration/tuner.py
+THRESHOLD = 50
+MIN_AREA = 5
+MAX_AREA = 5000
+
+# Set True to let auto_threshold follow the lighting (THRESHOLD is only the start);
+# give it target_blobs=<marker count> to hold the blob count instead of the contrast
+AUTO_THRESHOLD = False
+
+def make_detect(auto):
+    def detect(frame):
+        # The pipeline's frame pool already converted to gray (into a reused buffer)
+        gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if not AUTO_THRESHOLD:
+            return detect_blobs(gray, THRESHOLD, MIN_AREA, MAX_AREA)
+        px = detect_blobs(gray, auto.threshold, MIN_AREA, MAX_AREA)
+        auto.update(gray, len(px))
+        return px
+    return detect
+
+# One auto_threshold (and so one detect) per camera: each sees its own lighting
+detect = [make_detect(auto_threshold(THRESHOLD)) for _ in range(2)]
+
+# Set True to print per-stage p50/p95/p99 latencies and marker counts every 5 s
+PROFILE = False
+if PROFILE:
+    instrument.enable(report_every=5.0)
+
+# Set True for a live 3D view of the points (redrawn at most LIVE_3D_FPS times a
+# second from this thread, so it never holds up tracking)
+LIVE_3D = False
+LIVE_3D_FPS = 20
+view = live_view([cam1, cam2], max_fps=LIVE_3D_FPS) if LIVE_3D else None
+if view is not None:
+    plt.show(block=False)
+
+# Set True to publish every frame's points to local processes (pipeline.shm_reader;
+# udp_publisher instead for another host). The prints below stay limited to 2 points.
+PUBLISH = False
+publisher = shm_publisher() if PUBLISH else None
+
+# Set True to keep cam2's pose tuned from the live points (small mount sag) and
+# print a warning when the ray gaps grow past what that can follow (a bumped mount)
+REFINE = False
+refiner = extrinsic_refiner(cam1, cam2) if REFINE else None
+
+# Set True for blink-coded LEDs: LED i repeats the printed pattern, one bit per
+# camera frame. Markers are then matched across cameras by ID (no epipolar
+# ambiguity) and keep that ID; only undecoded blobs are matched geometrically.
+BLINK = False
+N_LEDS = 4
+blink = None
+if BLINK:
+    codes = blink_codes(N_LEDS)
+    blink = blink_tracker(cam1, cam2, codes)
+    for i, code in enumerate(codes):
+        print(f"LED {i}: {int(code):08b}")
+
+def solve(pxs, cams, seqs):
+    # Runs on the pipeline's solver thread, the only one using the cameras, so the
+    # refiner moves cam2 between frames instead of under a running solve. seqs (the
+    # frame numbers) let the blink decoders notice frames dropped on the way.
+    px1, px2 = pxs
+    if blink is not None:
+        pts_g, ids, _ = blink.update(px1, px2, seqs)
+        if refiner is not None:
+            refiner.update(px1, px2)
+        return pts_g, ids
+    if refiner is not None:
+        return refiner.track(px1, px2) # multi_track, and refinement from the same matches
+    return multi_track(px1, px2, cam1, cam2)
+
+# Capture, detection and solve (above) run on their own threads; this thread only
+# prints and draws. Frames from the two cameras are paired by capture timestamp,
+# or with SYNC = "interp" camera 2's detections are interpolated to each camera 1
+# capture time (for unsynced cameras, or ones running at different rates).
+# Frames are read into POOL_SIZE reused buffers per camera (0 = a new array per
+# frame); the loop below draws on them in place and hands them back with recycle().
+SYNC = "nearest"
+POOL_SIZE = 8
+tracker_pipeline = capture_pipeline([cap1, cap2], [cam1, cam2], detect=detect, solve=solve, solve_seqs=True,
+                                    max_skew=1/60, keep_frames=True, sync=SYNC, pool_size=POOL_SIZE)
 
 print("Tracking started. Press 'q' to quit.")
 
 # --- 3. MAIN LOOP ---
+tracker_pipeline.start()
 while True:
-    ret1, frame1 = cap1.read()
-    ret2, frame2 = cap2.read()
-    
-    if not ret1 or not ret2: 
-        print("Frame capture failed")
-        break
-
-    gray1 = cv2.cvtColor(frame1, cv2.COLOR_BGR2GRAY)
-    gray2 = cv2.cvtColor(frame2, cv2.COLOR_BGR2GRAY)
-
-    keypoints1 = detector.detect(gray1)
-    keypoints2 = detector.detect(gray2)
+    result = tracker_pipeline.get(timeout=1.0)
+    if result is None:
+        if not tracker_pipeline.sources_alive:
+            print("Frame capture failed")
+            break
+        continue
+
+    frame1, frame2 = result.frames
+    px1, px2 = result.pxs
+
+    # --- MATH (already solved by the pipeline) ---
+    pts_g, ids = result.pts_g, result.ids
+    if publisher is not None:
+        publisher.publish(result.t, pts_g, ids)
+
+    # Print up to 2 points
+    msg = ""
+    n_pairs = pts_g.shape[1]
+    count_to_print = min(n_pairs, 2)
+    for i in range(count_to_print):
+        # Print X, Y, Z rounded to 3 decimals
+        msg += f"Pt{i}: {np.round(pts_g[:, i], 3)}  "
+    if msg:
+        print(msg)
 
-    # --- FORMAT DATA ---
-    px1 = np.array([kp.pt for kp in keypoints1], dtype=np.float32) if keypoints1 else np.empty((0, 2), dtype=np.float32)
-    px2 = np.array([kp.pt for kp in keypoints2], dtype=np.float32) if keypoints2 else np.empty((0, 2), dtype=np.float32)
+    # --- VIZ ---
+    if view is not None:
+        view.push(pts_g, ids)
+        view.refresh()
 
-    # --- MATH ---
-    if len(px1) > 0 and len(px2) > 0:
-        # solve for the point locations using the lit pixels and camera objects
-        pts_g = multi_track(px1,px2,cam1,cam2)
+    with instrument.stage("draw"):
+        vis1 = draw_blobs(frame1, px1)
+        vis2 = draw_blobs(frame2, px2)
 
-        # Print up to 2 points
-        msg = ""
-        n_pairs = pts_g.shape[1]
-        count_to_print = min(n_pairs, 2)
-        for i in range(count_to_print):
-            # Print X, Y, Z rounded to 3 decimals
-            msg += f"Pt{i}: {np.round(pts_g[:, i], 3)}  "
-        print(msg)
+        cv2.imshow("Cam 1", vis1)
+        cv2.imshow("Cam 2", vis2)
+        key = cv2.waitKey(1) & 0xFF
+    tracker_pipeline.recycle(result)
 
-    # --- VIZ ---
-    vis1 = cv2.drawKeypoints(frame1, keypoints1, None, (0,0,255), cv2.DRAW_MATCHES_FLAGS_DRAW_RICH_KEYPOINTS)
-    vis2 = cv2.drawKeypoints(frame2, keypoints2, None, (0,0,255), cv2.DRAW_MATCHES_FLAGS_DRAW_RICH_KEYPOINTS)
-    
-    cv2.imshow("Cam 1", vis1)
-    cv2.imshow("Cam 2", vis2)
-    
-    if cv2.waitKey(1) & 0xFF == ord('q'):
+    if key == ord('q'):
         break
 
-cap1.release()
-cap2.release()
-cv2.destroyAllWindows()
\ No newline at end of file
+tracker_pipeline.release()
+if publisher is not None:
+    publisher.close()
+cv2.destroyAllWindows()
@@ -0,0 +1,60 @@
+import sys
+import os
+import time
+import argparse
+
+current = os.path.dirname(os.path.realpath(__file__))
+parent = os.path.dirname(current)
+sys.path.append(parent)
+
+import numpy as np
+from cam_math import camera
+from pipeline import process_recording
+
+# Post-processes a recorded stereo session on every core:
+#   python tests/offline_example.py cam1.mp4 cam2.mp4 -o session.npz
+#   python tests/offline_example.py frames_cam1/ frames_cam2/ --fps 60
+
+# --- 1. SETUP MATH OBJECTS (same calibration as example.py) ---
+res = np.array([640, 360])
+fovh_deg = 55
+AR = 9/16
+
+cam1 = camera(np.array([ 0.5661,-2.3785, 2.5925]),
+              np.array([[-0.9917, 0.1237, 0.0359],
+                        [ 0.1147, 0.7216, 0.6827],
+                        [ 0.0585, 0.6812,-0.7298]]),
+              fovh_deg, res, AR)
+
+cam2 = camera(np.array([ 2.1788,-1.201 , 2.9993]),
+              np.array([[-0.1162,-0.7595,-0.64  ],
+                        [-0.9925, 0.065 , 0.1031],
+                        [-0.0367, 0.6472,-0.7614]]),
+              fovh_deg, res, AR)
+
+THRESHOLD = 50
+MIN_AREA = 5
+MAX_AREA = 5000
+
+def show_progress(done, total):
+    print(f"\r{done}/{total} frames", end="", flush=True)
+
+# The __main__ guard matters here: worker processes import this file
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline multi_track over recorded video / image sequences")
+    parser.add_argument("cam1", help="camera 1 video file, image directory or glob")
+    parser.add_argument("cam2", help="camera 2 video file, image directory or glob")
+    parser.add_argument("-o", "--out", default="tracks.npz", help="columnar output file")
+    parser.add_argument("--offset", type=int, default=0, help="frames camera 2 started before camera 1 (negative: after)")
+    parser.add_argument("--fps", type=float, default=None, help="frame rate (default: from the video)")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--chunk", type=int, default=256, help="frames per task")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    n = process_recording([args.cam1, args.cam2], [cam1, cam2], args.out,
+                          detect_kwargs={'threshold': THRESHOLD, 'min_area': MIN_AREA, 'max_area': MAX_AREA},
+                          offsets=[max(-args.offset, 0), max(args.offset, 0)], chunk_frames=args.chunk, n_workers=args.workers,
+                          fps=args.fps, progress=show_progress)
+    dt = time.perf_counter() - t0
+    print(f"\n{n} frames in {dt:.1f} s ({n / max(dt, 1e-9):.0f} fps) -> {args.out}")
@@ -0,0 +1,106 @@
+import sys
+import os
+
+current = os.path.dirname(os.path.realpath(__file__))
+parent = os.path.dirname(current)
+sys.path.append(parent)
+
+import time
+import numpy as np
+from cam_math import synth_rig, project_points
+from pipeline import capture_pipeline, fake_capture, drop_queue
+
+# Hardware-free check of capture_pipeline: fake_capture sources replay synthetic
+# frames (markers drawn where a synthetic rig sees them).
+#   python tests/pipeline_test.py
+
+res = (640, 360)
+cams = synth_rig(2, res=res)
+pts = np.array([[0.3, -0.3, 0.0,  0.3, -0.3], # well apart in both images
+                [0.3,  0.3, 0.0, -0.3, -0.3],
+                [1.0,  1.2, 0.8,  1.3,  0.9]])
+
+
+def render(cam, n_frames):
+    """n_frames gray images with a 3x3 marker at every visible point, and their pixels."""
+    px, visible = project_points(cam, pts)
+    img = np.zeros((res[1], res[0]), dtype=np.uint8)
+    for u, v in px[visible].astype(int):
+        img[max(v - 1, 0):v + 2, max(u - 1, 0):u + 2] = 255
+    return [img.copy() for _ in range(n_frames)], px[visible]
+
+
+def drain(pipe, hold=0.0):
+    """Every result until the sources stop (recycled), optionally sleeping first."""
+    time.sleep(hold)
+    out = []
+    while True:
+        r = pipe.get(timeout=0.5)
+        if r is None:
+            if not pipe.sources_alive:
+                return out
+            continue
+        out.append(r)
+        pipe.recycle(r)
+
+
+def check_pairing():
+    # 60 fps against 30 fps: every camera-2 frame has a partner, half of camera 1's don't
+    max_skew = 1 / 120 # half a 60 fps period: a partner always exists, whatever the phase
+    frames1, px1 = render(cams[0], 60)
+    frames2, _ = render(cams[1], 30)
+    pipe = capture_pipeline([fake_capture(frames1, fps=60), fake_capture(frames2, fps=30)], cams,
+                            max_skew=max_skew, queue_len=8).start()
+    results = drain(pipe)
+    pipe.stop()
+    assert results, "pairing: nothing was paired"
+    skew = max(np.ptp(r.stamps) for r in results)
+    assert skew <= max_skew, f"pairing: frames {skew * 1000:.1f} ms apart (max_skew {max_skew * 1000:.1f} ms)"
+    assert pipe.unpaired > 0, "pairing: the 60 fps camera's extra frames should stay unpaired"
+    assert np.allclose(np.sort(results[0].pxs[0], axis=0), np.sort(px1, axis=0), atol=1.0), \
+        "pairing: detections don't match the rendered markers"
+    assert all(r.pts_g.shape[1] == len(px1) for r in results), "pairing: not every marker solved"
+    print(f"pairing: {len(results)} sets, worst skew {skew * 1000:.2f} ms, {pipe.unpaired} unpaired")
+
+
+def check_drop_oldest():
+    q = drop_queue(2, on_drop=lambda item: dropped.append(item))
+    dropped = []
+    for i in range(5):
+        q.put(i)
+    assert (q.get(0), q.get(0), q.get(0)) == (3, 4, None), "drop_queue: should keep the newest items"
+    assert dropped == [0, 1, 2] and q.dropped == 3, "drop_queue: dropped items not reported"
+
+    # A consumer that doesn't read only ever gets the newest queue_len results
+    frames, _ = render(cams[0], 200)
+    pipe = capture_pipeline([fake_capture(frames), fake_capture(frames)], cams, queue_len=2,
+                            max_skew=1.0).start()
+    results = drain(pipe, hold=1.0)
+    pipe.stop()
+    assert 0 < len(results) <= 2, f"drop-oldest: {len(results)} stale results kept"
+    assert min(r.seqs.min() for r in results) > 100, "drop-oldest: kept old frames instead of new ones"
+    print(f"drop-oldest: kept {len(results)} newest sets (seqs {[r.seqs.tolist() for r in results]}), "
+          f"out queue dropped {pipe.out_q.dropped}")
+
+
+def check_pool(sync):
+    # Every pooled buffer comes back once the results are recycled and the pipeline stops
+    frames, _ = render(cams[0], 120)
+    pipe = capture_pipeline([fake_capture(frames, fps=120), fake_capture(frames, fps=120)], cams,
+                            keep_frames=True, pool_size=8, sync=sync, max_skew=1 / 60).start()
+    results = drain(pipe)
+    pipe.stop()
+    for c, pool in enumerate(pipe.pools):
+        missing = pool.allocated - len(pool._free)
+        assert missing == 0 or (pool.allocated > pool.size and len(pool._free) == pool.size), \
+            f"pool ({sync}): camera {c} has {missing} of {pool.allocated} buffers still out"
+    print(f"pool ({sync}): {len(results)} sets, buffers allocated {[p.allocated for p in pipe.pools]}, "
+          f"all returned")
+
+
+if __name__ == "__main__":
+    check_pairing()
+    check_drop_oldest()
+    check_pool("nearest")
+    check_pool("interp")
+    print("Pipeline OK")
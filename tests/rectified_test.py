@@ -0,0 +1,43 @@
+import sys
+import os
+
+current = os.path.dirname(os.path.realpath(__file__))
+parent = os.path.dirname(current)
+sys.path.append(parent)
+
+import warnings
+import numpy as np
+from cam_math import *
+
+# Regression check: a rectified (side-by-side, same orientation) pair puts the
+# epipole at infinity. correlate has to keep matching instead of dividing by zero.
+#   python tests/rectified_test.py
+
+warnings.simplefilter("error") # any divide-by-zero / invalid warning fails the check
+
+res = np.array([640, 360])
+down = look_at((0.0, 0.0, 3.0), (0.0, 0.0, 0.0))
+cam1 = camera(np.array([0.0, 0.0, 3.0]), down, 70, res, 9/16)
+cam2 = camera(np.array([1.0, 0.0, 3.0]), down, 70, res, 9/16)
+assert cam1.pair_with(cam2).epipole is None, "epipole should be at infinity"
+
+rng = np.random.default_rng(0)
+pts = random_points(40, center=(0.5, 0.0, 0.5), half_size=0.4, rng=rng)
+worst = 0.0
+for method in ("greedy", "optimal"):
+    (px1, px2), (id1, id2) = synth_detections([cam1, cam2], pts, noise_px=0.2, rng=rng)
+    pts_g, err = multi_track(px1, px2, cam1, cam2, return_error=True, method=method)
+    assert pts_g.shape[1] > 0, f"{method}: no points solved"
+    # Each solved point against the nearest true point
+    d = np.linalg.norm(pts_g[:, :, None] - pts[:, None, :], axis=0).min(axis=1)
+    good = np.mean(d < 0.01)
+    print(f"{method}: {pts_g.shape[1]} points from {len(px2)} detections, {100 * good:.0f}% within 1 cm")
+    worst = max(worst, 1 - good)
+
+# Slightly off rectified: a finite but far epipole goes through the angular buckets
+cam2.r_o2cam_g = np.array([1.0, 0.0, 3.0 + 1e-4])
+assert cam1.pair_with(cam2).epipole is not None
+pts_g = multi_track(px1, px2, cam1, cam2)
+print(f"near-rectified: {pts_g.shape[1]} points")
+assert pts_g.shape[1] > 0, "near-rectified: no points solved"
+print("Rectified pair OK" if worst < 0.1 else "Rectified pair: too many wrong matches")
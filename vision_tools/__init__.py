@@ -0,0 +1,3 @@
+from .detect_blobs import detect_blobs, draw_blobs
+from .roi_detect import roi_detector
+from .auto_threshold import auto_threshold
@@ -0,0 +1,107 @@
+import threading
+import cv2
+import numpy as np
+from numpy.typing import NDArray
+
+class auto_threshold:
+    """
+    Keeps the blob threshold in tune at runtime as the ambient light drifts,
+    instead of picking one by hand with calibration/tuner.py.
+
+    Every `every` frames it histograms a decimated view of the frame (every
+    `step`-th pixel each way, ~14k samples at 640x360) and takes the frame's
+    brightest pixel, then:
+      - background = the `bg_percentile` level of the samples (markers are a tiny
+        fraction of the image, so this is the room). The threshold never goes
+        below background + margin: that is where the blob floods come from.
+      - contrast mode (target_blobs=None): the threshold sits `contrast` of the
+        way from the background up to the brightest pixel (smoothed by `alpha`).
+      - count mode: the threshold steps `rate` levels per update towards giving
+        target_blobs blobs (up to target_blobs + slack is fine), judged by the
+        blob count of the last detection passed to update().
+
+    Frames in between cost a counter increment; an update is < 0.1 ms at 640x360.
+
+        auto = auto_threshold(50, target_blobs=4)
+        px = detect_blobs(gray, auto.threshold)
+        auto.update(gray, len(px))
+
+    update() is locked, so one instance can sit behind capture_pipeline's
+    detection workers. Use one per camera (capture_pipeline takes a list of
+    detect functions for that): every camera sees its own lighting.
+    """
+
+    def __init__(self, threshold: int = 50, target_blobs: int = None, slack: int = 0, every: int = 5,
+                 step: int = 4, bg_percentile: float = 99.0, margin: int = 15, contrast: float = 0.5,
+                 alpha: float = 0.3, rate: int = 4, min_threshold: int = 5, max_threshold: int = 250):
+        self.threshold = int(threshold)
+        self.target_blobs = target_blobs
+        self.slack = slack
+        self.every = every # frames between updates
+        self.step = step # decimation of the histogram sample
+        self.bg_percentile = bg_percentile
+        self.margin = margin
+        self.contrast = contrast
+        self.alpha = alpha
+        self.rate = rate
+        self.min_threshold = min_threshold
+        self.max_threshold = max_threshold
+
+        self.background = None # last background level
+        self.peak = None # last brightest pixel
+        self._level = float(threshold) # unrounded contrast-mode threshold
+        self._frame = 0
+        self._lock = threading.Lock()
+
+    def reset(self, threshold: int = None):
+        """Restarts from `threshold` (default: the current one), e.g. after a manual override."""
+        with self._lock:
+            if threshold is not None:
+                self.threshold = int(threshold)
+            self._level = float(self.threshold)
+            self._frame = 0
+
+    @property
+    def floor(self):
+        """Lowest threshold allowed right now (background + margin)."""
+        bg = 0 if self.background is None else self.background
+        return max(self.min_threshold, bg + self.margin)
+
+    def update(self, gray: NDArray, n_blobs: int = None):
+        """
+        Call once per frame with the frame the detector just saw (8-bit, BGR is
+        converted) and, in count mode, how many blobs it found.
+        Returns the threshold to use for the next frame.
+        """
+        with self._lock:
+            self._frame += 1
+            if self._frame < self.every:
+                return self.threshold
+            self._frame = 0
+            if gray.ndim == 3:
+                gray = cv2.cvtColor(gray, cv2.COLOR_BGR2GRAY)
+
+            # 1) Background from a decimated histogram, peak from the full frame
+            # (a decimated sample can step right over a 3 px marker)
+            hist = cv2.calcHist([gray[::self.step, ::self.step]], [0], None, [256], [0, 256]).ravel()
+            cdf = np.cumsum(hist)
+            self.background = int(np.searchsorted(cdf, cdf[-1] * self.bg_percentile / 100.0))
+            self.peak = int(cv2.minMaxLoc(gray)[1])
+            lo = min(self.floor, self.max_threshold)
+            hi = max(lo, min(self.peak - 1, self.max_threshold))
+
+            # 2) Move towards the target blob count, or the contrast point
+            if self.target_blobs is not None and n_blobs is not None:
+                t = self.threshold
+                if n_blobs > self.target_blobs + self.slack:
+                    t += self.rate
+                elif n_blobs < self.target_blobs:
+                    t -= self.rate
+                self._level = t
+            else:
+                t = self.background + self.contrast * (self.peak - self.background)
+                self._level += self.alpha * (t - self._level)
+
+            self._level = min(max(self._level, lo), hi)
+            self.threshold = int(round(self._level))
+            return self.threshold
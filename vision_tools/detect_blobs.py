@@ -0,0 +1,72 @@
+import cv2
+import numpy as np
+from numpy.typing import NDArray
+
+def detect_blobs(gray: NDArray, threshold: int = 50, min_area: int = 5, max_area: int = 5000, weighted: bool = True):
+    """
+    Single-threshold bright blob detector (drop-in for cv2.SimpleBlobDetector with
+    retro-reflective markers / LEDs in a dark room).
+
+    One cv2.threshold, one connected-components pass, then all centroids at once
+    with np.bincount.
+    With weighted=True the centroid is intensity-weighted by (gray - threshold),
+    which gives sub-pixel positions that don't snap to the blob's pixel grid.
+
+    Inputs:
+      gray:      8-bit single channel image (BGR is converted)
+      threshold: pixels > threshold are foreground
+      min_area, max_area: blob area limits in pixels (inclusive)
+
+    Returns:
+      (N, 2) float32 array of (x, y) top-left-origin pixels, ready for multi_track
+    """
+    if gray.ndim == 3:
+        gray = cv2.cvtColor(gray, cv2.COLOR_BGR2GRAY)
+
+    return _blob_centroids(gray, threshold, min_area, max_area, weighted)
+
+
+def _blob_sums(gray, threshold, weighted):
+    """
+    Core of detect_blobs: labels the lit pixels and returns per-label sums
+    (labels, area, sw, sx, sy), or None if nothing is lit. Label 0 is the background.
+    """
+    # 1) Binarize once, label once (labels only; OpenCV's full-frame stats pass
+    # costs more than everything below, and we only need the lit pixels anyway)
+    _, mask = cv2.threshold(gray, threshold, 255, cv2.THRESH_BINARY)
+    n_labels, labels = cv2.connectedComponents(mask, connectivity=8)
+    if n_labels <= 1:
+        return None
+
+    # 2) Per-blob sums over the foreground pixels only
+    xy = cv2.findNonZero(mask).reshape(-1, 2)
+    xs, ys = xy[:, 0], xy[:, 1]
+    lab = labels[ys, xs]
+    w = gray[ys, xs].astype(np.float32) - threshold if weighted else np.ones(lab.size, dtype=np.float32)
+    area = np.bincount(lab, minlength=n_labels)
+    sw = np.bincount(lab, weights=w, minlength=n_labels)
+    sx = np.bincount(lab, weights=w * xs, minlength=n_labels)
+    sy = np.bincount(lab, weights=w * ys, minlength=n_labels)
+    return labels, area, sw, sx, sy
+
+
+def _blob_centroids(gray, threshold, min_area, max_area, weighted):
+    sums = _blob_sums(gray, threshold, weighted)
+    if sums is None:
+        return np.empty((0, 2), dtype=np.float32)
+    _, area, sw, sx, sy = sums
+
+    # 3) Area filter (label 0 is the background), then centroids
+    keep = (area >= min_area) & (area <= max_area)
+    keep[0] = False
+    sw = sw[keep]
+    return np.column_stack((sx[keep] / sw, sy[keep] / sw)).astype(np.float32)
+
+
+def draw_blobs(frame: NDArray, px: NDArray, color=(0, 0, 255), radius: int = 6):
+    """
+    Draws a circle on `frame` (in place) for every (x, y) in px. Returns frame.
+    """
+    for x, y in np.asarray(px).reshape(-1, 2):
+        cv2.circle(frame, (int(round(x)), int(round(y))), radius, color, 1)
+    return frame
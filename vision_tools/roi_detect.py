@@ -0,0 +1,120 @@
+import cv2
+import numpy as np
+from numpy.typing import NDArray
+from scipy.spatial import cKDTree
+from .detect_blobs import _blob_centroids, _blob_sums
+
+class roi_detector:
+    """
+    Windowed blob detector: only looks at small windows around where markers were
+    (or are predicted to be), so the per-frame cost scales with marker count rather
+    than image area. Same idea as find_centroid_in_roi in calibration/localize.py.
+
+    Falls back to a full-frame detect_blobs scan when:
+      - there are no seeds yet (first frame, or everything was lost)
+      - every `full_every` frames (so new markers get picked up)
+      - any seed window comes back empty (marker lost -> rescan THIS frame)
+    """
+
+    def __init__(self, threshold: int = 50, min_area: int = 5, max_area: int = 5000,
+                 window: int = 40, full_every: int = 30, weighted: bool = True):
+        self.threshold = threshold
+        self.min_area = min_area
+        self.max_area = max_area
+        self.window = window # side of the square search window (px)
+        self.full_every = full_every # force a full scan this often (frames); 0 = never
+        self.weighted = weighted
+
+        self.last_px = np.empty((0, 2), dtype=np.float32)
+        self.last_was_full = False
+        self._since_full = 0
+
+    def reset(self):
+        """Forgets the seeds; the next call does a full scan."""
+        self.last_px = np.empty((0, 2), dtype=np.float32)
+        self._since_full = 0
+
+    def _full(self, gray):
+        self._since_full = 0
+        self.last_was_full = True
+        return _blob_centroids(gray, self.threshold, self.min_area, self.max_area, self.weighted)
+
+    def detect(self, gray: NDArray, seeds: NDArray = None):
+        """
+        Detects blobs in `gray` (8-bit, BGR is converted).
+        seeds: (K, 2) top-left pixels to search around (e.g. tracker predictions
+               projected with cam2px + camera.center). Defaults to the last detections.
+
+        Returns (N, 2) float32 pixels, same format as detect_blobs.
+        """
+        if gray.ndim == 3:
+            gray = cv2.cvtColor(gray, cv2.COLOR_BGR2GRAY)
+        seeds = self.last_px if seeds is None else np.asarray(seeds, dtype=np.float32).reshape(-1, 2)
+        seeds = seeds[np.all(np.isfinite(seeds), axis=1)]
+        self._since_full += 1
+
+        if seeds.shape[0] == 0 or (self.full_every and self._since_full >= self.full_every):
+            self.last_px = self._full(gray)
+            return self.last_px
+
+        # 1) Clamp a window around every seed
+        h, w = gray.shape[:2]
+        win = self.window
+        c = np.rint(seeds).astype(np.int64)
+        x1 = np.clip(c[:, 0] - win // 2, 0, w)
+        y1 = np.clip(c[:, 1] - win // 2, 0, h)
+        x2 = np.clip(c[:, 0] - win // 2 + win, 0, w)
+        y2 = np.clip(c[:, 1] - win // 2 + win, 0, h)
+        if np.any((x2 <= x1) | (y2 <= y1)):
+            self.last_px = self._full(gray)
+            return self.last_px
+
+        # 2) Paste every window into one tall mosaic, one dark row between tiles so
+        # blobs can't join across them. One threshold + one labelling pass total,
+        # instead of paying OpenCV call overhead per window.
+        n_win = seeds.shape[0]
+        stride = win + 1
+        mosaic = np.zeros((n_win * stride, win), dtype=gray.dtype)
+        for i in range(n_win):
+            mosaic[i * stride:i * stride + y2[i] - y1[i], :x2[i] - x1[i]] = gray[y1[i]:y2[i], x1[i]:x2[i]]
+        sums = _blob_sums(mosaic, self.threshold, self.weighted)
+        if sums is None:
+            self.last_px = self._full(gray)
+            return self.last_px
+        labels, area, sw, sx, sy = sums
+
+        # 3) Drop blobs touching a window edge that is a cut (not the image border):
+        # only part of them is visible, so their centroid would be biased
+        keep = (area >= self.min_area) & (area <= self.max_area)
+        keep[0] = False
+        r0 = np.arange(n_win) * stride
+        hh, ww = y2 - y1, x2 - x1
+        for i in np.flatnonzero(y1 > 0): keep[labels[r0[i], :ww[i]]] = False
+        for i in np.flatnonzero(y2 < h): keep[labels[r0[i] + hh[i] - 1, :ww[i]]] = False
+        for i in np.flatnonzero(x1 > 0): keep[labels[r0[i]:r0[i] + hh[i], 0]] = False
+        for i in np.flatnonzero(x2 < w): keep[labels[r0[i]:r0[i] + hh[i], ww[i] - 1]] = False
+        keep[0] = False
+
+        # 4) Which tile each blob lives in, and lost-marker check
+        tile = np.zeros(area.size, dtype=np.int64)
+        lit = np.flatnonzero(labels)
+        tile[labels.ravel()[lit]] = lit // (win * stride)
+        kept = np.flatnonzero(keep)
+        if np.unique(tile[kept]).size < n_win:
+            # Lost a marker: rescan the full frame right now
+            self.last_px = self._full(gray)
+            return self.last_px
+
+        # 5) Mosaic centroids -> image pixels
+        t = tile[kept]
+        px = np.column_stack((sx[kept] / sw[kept] + x1[t],
+                              sy[kept] / sw[kept] - r0[t] + y1[t])).astype(np.float32)
+
+        # 6) Overlapping windows see the same blob (same pixels -> same centroid
+        # up to float32 rounding), keep one copy
+        dup = cKDTree(px).query_pairs(0.01, output_type='ndarray')
+        if dup.size:
+            px = np.delete(px, np.unique(dup[:, 1]), axis=0)
+        self.last_was_full = False
+        self.last_px = px
+        return self.last_px